@@ -1,15 +1,24 @@
-from flask import Blueprint, jsonify, request, current_app
-import sqlite3
+from flask import Blueprint, Response, jsonify, request, current_app
 from datetime import datetime
 
+from app.core.database import DatabaseManager
+from app.core.pagination import decode_cursor, keyset_page, page_limit
+from app.core.queries import alerts_query, attendance_query
+
 api_bp = Blueprint('api', __name__)
 
 
+def get_db_manager() -> DatabaseManager:
+    """The app's shared DatabaseManager, from the factory `create_app` registers."""
+    factory = current_app.extensions.get('get_db_manager')
+    if factory is None:
+        raise RuntimeError("The API blueprint needs an app built by app.web.dashboard.create_app")
+    return factory()
+
+
 def get_db_connection():
-    db_path = current_app.config.get('DATABASE_PATH', 'data/attendance.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """This request thread's persistent connection from the app's DatabaseManager."""
+    return get_db_manager().connection()
 
 
 @api_bp.route('/health')
@@ -17,21 +26,63 @@ def health():
     return jsonify({'status': 'ok', 'time': datetime.utcnow().isoformat()})
 
 
+@api_bp.route('/metrics')
+def metrics():
+    """Pipeline counters and per-stage latency summaries in Prometheus text format."""
+    monitor = current_app.extensions.get('metrics')
+    body = monitor.render_prometheus() if monitor is not None else ''
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+@api_bp.route('/cache')
+def cache_stats():
+    """Hit/miss counts of the dashboard and API result cache."""
+    return jsonify(get_db_manager().results.stats())
+
+
+def page_args():
+    """`limit` and decoded `after` from the query string; raises ValueError on bad input."""
+    limit = page_limit(request.args.get('limit'))
+    after = request.args.get('after')
+    return limit, (decode_cursor(after) if after else None)
+
+
 @api_bp.route('/attendance', methods=['GET'])
 def attendance_list():
+    """Attendance for `date` (default today, empty for all dates), newest first.
+
+    Keyset-paginated: pass the response's `next_cursor` back as `after` to
+    get the next `limit` rows; it is null on the last page.
+    """
     date_str = request.args.get('date', datetime.utcnow().strftime('%Y-%m-%d'))
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute('''SELECT ar.*, s.name FROM attendance_records ar LEFT JOIN students s ON ar.student_id = s.student_id WHERE date(ar.timestamp)=?''', (date_str,))
-        rows = [dict(r) for r in cur.fetchall()]
-    return jsonify(rows)
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def load():
+        query, params = attendance_query('ar.*, s.name', date=date_str, after=after, limit=limit + 1)
+        with get_db_connection() as conn:
+            rows = [dict(r) for r in conn.execute(query, params).fetchall()]
+        items, next_cursor = keyset_page(rows, limit)
+        return {'items': items, 'next_cursor': next_cursor}
+
+    return jsonify(get_db_manager().results.get(('api_attendance', date_str, limit, after), load))
 
 
 @api_bp.route('/alerts', methods=['GET'])
 def alerts():
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute('SELECT * FROM alerts ORDER BY timestamp DESC LIMIT 100')
-        rows = [dict(r) for r in cur.fetchall()]
-    return jsonify(rows)
+    """Alerts, newest first, keyset-paginated like /attendance."""
+    try:
+        limit, after = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def load():
+        query, params = alerts_query(after=after, limit=limit + 1)
+        with get_db_connection() as conn:
+            rows = [dict(r) for r in conn.execute(query, params).fetchall()]
+        items, next_cursor = keyset_page(rows, limit)
+        return {'items': items, 'next_cursor': next_cursor}
 
+    return jsonify(get_db_manager().results.get(('api_alerts', limit, after), load))
@@ -1,43 +1,84 @@
 import sqlite3
+import threading
+import time
 from pathlib import Path
 import logging
+from typing import Optional
+
+from app.core.migrations import MIGRATIONS, ROLLUP_REBUILD
+from app.core.result_cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
-    def __init__(self, db_path: str, schema_path: str = "data/schema.sql"):
+    """Owns the SQLite database file and hands out tuned connections.
+
+    Connections are opened once with WAL journaling (readers and the writer
+    no longer block each other), a busy timeout, synchronous=NORMAL, a
+    larger page cache and a prepared-statement cache, and are kept in a
+    bounded pool of `pool_size`. `connection()` checks one out to the
+    calling thread; long-lived service threads simply keep theirs, while the
+    web app hands it back with `release_connection()` after every request.
+    Connections still held by threads that have exited are reclaimed when
+    the pool runs dry.
+
+    The schema is versioned: on startup the migrations in
+    `app.core.migrations` that the file has not seen yet are applied.
+
+    `results` is the ResultCache shared by the dashboard and API reads made
+    through this manager; code that writes through it calls
+    `results.invalidate()` once the write is committed.
+    """
+
+    def __init__(self, db_path: str, schema_path: str = "data/schema.sql",
+                 busy_timeout: float = 5.0, cache_size_kb: int = 16384,
+                 cached_statements: int = 256, journal_mode: str = "WAL",
+                 synchronous: str = "NORMAL", result_cache: Optional[ResultCache] = None,
+                 pool_size: int = 16):
         self.db_path = Path(db_path)
         self.schema_path = Path(schema_path)
+        self.busy_timeout = busy_timeout
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.results = result_cache if result_cache is not None else ResultCache()
+        self.pool_size = max(1, int(pool_size))
+        self._local = threading.local()
+        self._idle = []
+        self._in_use = {}
+        self._opened = 0
+        self._pool_cond = threading.Condition()
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._ensure_database()
 
+    @classmethod
+    def from_config(cls, config: dict, monitor=None) -> 'DatabaseManager':
+        database = config['database']
+        return cls(
+            database['path'],
+            schema_path=database.get('schema_path', "data/schema.sql"),
+            busy_timeout=database.get('busy_timeout', 5.0),
+            cache_size_kb=database.get('cache_size_kb', 16384),
+            cached_statements=database.get('cached_statements', 256),
+            journal_mode=database.get('journal_mode', "WAL"),
+            synchronous=database.get('synchronous', "NORMAL"),
+            result_cache=ResultCache.from_config(config, monitor=monitor),
+            pool_size=database.get('pool_size', 16)
+        )
+
     def _ensure_database(self):
-        """Create the database file and initialize schema if missing."""
+        """Create the database file if missing and bring its schema up to date."""
         if not self.db_path.exists():
             logger.info(f"Creating new database at {self.db_path}")
-            self._run_schema()
-        else:
-            # If schema file exists and DB is empty, try to run schema
-            try:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='students'")
-                    if cursor.fetchone() is None and self.schema_path.exists():
-                        logger.info("Database appears uninitialized; applying schema.sql")
-                        self._run_schema()
-            except Exception:
-                logger.exception("Error checking database schema; attempting to apply schema")
+            # A custom schema file, if present, seeds a new database; the
+            # baseline migration only creates tables that are still missing
+            if self.schema_path.exists():
                 self._run_schema()
+        self.migrate()
 
     def _run_schema(self):
-        if not self.schema_path.exists():
-            logger.warning(f"Schema file not found at {self.schema_path}; skipping schema creation")
-            # create empty DB file
-            with sqlite3.connect(self.db_path) as conn:
-                pass
-            return
-
         try:
             with open(self.schema_path, 'r', encoding='utf-8') as f:
                 sql = f.read()
@@ -48,5 +89,206 @@ class DatabaseManager:
         except Exception:
             logger.exception("Failed to apply database schema")
 
+    def migrate(self) -> int:
+        """Apply pending migrations in order and return the resulting schema version.
+
+        Each migration runs in its own transaction together with the
+        `user_version` bump. A failing migration is rolled back and logged,
+        and later ones are not attempted, leaving the database at the last
+        version that applied cleanly.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, description, statements in MIGRATIONS:
+                if target <= version:
+                    continue
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    # Another process may have migrated while we waited for the lock
+                    version = conn.execute("PRAGMA user_version").fetchone()[0]
+                    if target <= version:
+                        conn.execute("COMMIT")
+                        continue
+                    for sql in statements:
+                        conn.execute(sql)
+                    conn.execute(f"PRAGMA user_version = {int(target)}")
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    logger.exception("Migration %d (%s) failed; database left at version %d",
+                                     target, description, version)
+                    break
+                version = target
+                logger.info("Applied database migration %d: %s", target, description)
+            return version
+        finally:
+            conn.close()
+
+    def rebuild_rollups(self):
+        """Recompute attendance_daily and attendance_day_summary from raw attendance.
+
+        The insert/delete triggers keep the rollups current; a rebuild is only
+        needed after rows were updated in place or the tables were edited by hand.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql in ROLLUP_REBUILD:
+                    conn.execute(sql)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            self.results.invalidate()
+            days = conn.execute("SELECT COUNT(*), COALESCE(SUM(records), 0) FROM attendance_day_summary").fetchone()
+            logger.info("Rebuilt attendance rollups: %d days, %d records", days[0], days[1])
+            return days
+        finally:
+            conn.close()
+
+    def connection(self) -> sqlite3.Connection:
+        """The connection checked out to this thread (rows are `sqlite3.Row`).
+
+        The first call on a thread checks a connection out of the pool; it
+        stays bound to the thread until `release_connection()`. Use it as
+        `with db.connection() as conn:` to commit or roll back a transaction.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.acquire()
+            self._local.conn = conn
+        return conn
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return self.connection()
+
+    def release_connection(self):
+        """Return this thread's connection to the pool, e.g. at the end of a web request."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            self.release(conn)
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection taken with `acquire()` to the pool."""
+        with self._pool_cond:
+            if self._in_use.pop(id(conn), None) is None:
+                return  # closed by close_all() in the meantime
+            self._reset(conn)
+            self._idle.append(conn)
+            self._pool_cond.notify()
+
+    def close_connection(self):
+        """Close the calling thread's connection, e.g. when a worker thread exits."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._pool_cond:
+                if self._in_use.pop(id(conn), None) is not None:
+                    self._opened -= 1
+                    self._pool_cond.notify()
+            conn.close()
+
+    def close_all(self):
+        with self._pool_cond:
+            connections = self._idle + [conn for _, conn in self._in_use.values()]
+            self._idle, self._in_use, self._opened = [], {}, 0
+            self._pool_cond.notify_all()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool without binding it to this thread.
+
+        For work that outlives the current call, such as a streamed response;
+        hand it back with `release()`. Waits up to `busy_timeout` for a free
+        connection.
+        """
+        deadline = time.monotonic() + self.busy_timeout
+        with self._pool_cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._opened < self.pool_size:
+                    self._opened += 1
+                    conn = None
+                    break
+                if self._reclaim_dead_threads():
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"No database connection available (pool of {self.pool_size} in use)")
+                self._pool_cond.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._pool_cond:
+                    self._opened -= 1
+                    self._pool_cond.notify()
+                raise
+        with self._pool_cond:
+            self._in_use[id(conn)] = (threading.current_thread(), conn)
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        # One thread uses it at a time; check_same_thread is off so pooled
+        # connections can move between threads
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        if self.journal_mode:
+            self._set_journal_mode(conn)
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        if self.cache_size_kb:
+            # Negative values are in KiB rather than pages
+            conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        return conn
+
+    def _set_journal_mode(self, conn: sqlite3.Connection):
+        """Switch the journal mode unless the file already uses it (WAL persists).
+
+        The switch needs the database to itself and fails at once rather than
+        waiting on the busy timeout, e.g. while another manager migrates, so
+        it is retried until `busy_timeout`.
+        """
+        deadline = time.monotonic() + self.busy_timeout
+        while True:
+            try:
+                current = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                if current.lower() != self.journal_mode.lower():
+                    conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+                return
+            except sqlite3.OperationalError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _reclaim_dead_threads(self) -> bool:
+        """Return connections of exited threads that never released them; caller holds the lock."""
+        reclaimed = False
+        for key, (thread, conn) in list(self._in_use.items()):
+            if not thread.is_alive():
+                del self._in_use[key]
+                self._reset(conn)
+                self._idle.append(conn)
+                reclaimed = True
+        return reclaimed
+
+    @staticmethod
+    def _reset(conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
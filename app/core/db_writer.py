@@ -0,0 +1,150 @@
+import queue
+import sqlite3
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from app.core.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedWriter:
+    """Write-behind queue for SQLite inserts.
+
+    Callers `submit` statements and return immediately; one writer thread
+    drains the queue and commits everything that arrived within
+    `flush_interval` (up to `batch_size` statements) as one transaction, so
+    a slow disk delays the rows rather than the camera threads. If a batch
+    fails, its statements are retried one by one so a single bad row does
+    not lose the rest; a statement that still fails runs its `on_failure`
+    callback. `flush` waits for everything submitted so far to be
+    committed; `stop` flushes before exiting.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.5, batch_size: int = 200,
+                 max_queue: int = 10000, monitor=None, db_manager=None):
+        self.db_path = str(db_path)
+        self.db = db_manager
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, int(batch_size))
+        self.monitor = monitor
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, db_path: str, config: dict, monitor=None, db_manager=None) -> Optional['BatchedWriter']:
+        write_behind = config.get('database', {}).get('write_behind', {}) or {}
+        if not write_behind.get('enabled', True):
+            return None
+        return cls(
+            db_path,
+            flush_interval=write_behind.get('flush_interval', 0.5),
+            batch_size=write_behind.get('batch_size', 200),
+            max_queue=write_behind.get('max_queue', 10000),
+            monitor=monitor,
+            db_manager=db_manager
+        )
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, sql: str, params: tuple = (), timeout: float = 1.0,
+               on_failure: Optional[Callable[[], None]] = None) -> bool:
+        """Queue a statement; returns False if the queue stayed full for `timeout` seconds.
+
+        `on_failure` is called from the writer thread if the statement is
+        later rejected by the database.
+        """
+        try:
+            self._queue.put((sql, params, on_failure), timeout=timeout)
+            return True
+        except queue.Full:
+            logger.error("Database write queue is full; dropping write")
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every statement submitted before this call is committed."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Database writer did not finish within %.1fs", timeout)
+        self._thread = None
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        if self.db is None:
+            self.db = DatabaseManager(self.db_path)
+        conn = self.db.connection()
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                statements, markers = [], []
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    if isinstance(item, threading.Event):
+                        markers.append(item)
+                        break
+                    statements.append(item)
+                    if len(statements) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+
+                if statements:
+                    self._write(conn, statements)
+                for marker in markers:
+                    marker.set()
+        finally:
+            self.db.close_connection()
+
+    def _write(self, conn: sqlite3.Connection, statements: list):
+        start = time.perf_counter()
+        try:
+            with conn:
+                for sql, params, _ in statements:
+                    conn.execute(sql, params)
+            self.written += len(statements)
+            self.db.results.invalidate()
+        except sqlite3.Error:
+            logger.exception("Batched write of %d statements failed; retrying individually", len(statements))
+            for sql, params, on_failure in statements:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    self.written += 1
+                    self.db.results.invalidate()
+                except sqlite3.Error:
+                    self.failed += 1
+                    logger.exception("Failed to write: %s", sql)
+                    if on_failure is not None:
+                        try:
+                            on_failure()
+                        except Exception:
+                            logger.exception("Write failure callback raised")
+
+        if self.monitor is not None:
+            self.monitor.record_stage_time('db_flush', time.perf_counter() - start)
+            self.monitor.observe('attendance_db_batch_size', len(statements))
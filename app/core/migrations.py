@@ -0,0 +1,147 @@
+"""Versioned schema migrations applied by DatabaseManager.
+
+Each entry is (version, description, statements). The database records the
+last applied version in `PRAGMA user_version`; pending migrations run in
+order, each in its own transaction. Append new migrations; never edit one
+that has shipped.
+"""
+
+# Recompute the attendance rollups from raw history. Used by migration 3 to
+# backfill and by DatabaseManager.rebuild_rollups after manual edits
+ROLLUP_REBUILD = [
+    "DELETE FROM attendance_daily",
+    "DELETE FROM attendance_day_summary",
+    """
+    INSERT INTO attendance_daily (day, student_id, status, location, count)
+    SELECT date(timestamp), student_id, COALESCE(status, ''), COALESCE(location, ''), COUNT(*)
+    FROM attendance_records
+    WHERE timestamp IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    """,
+    """
+    INSERT INTO attendance_day_summary (day, records, students, confidence_sum, confidence_count)
+    SELECT date(timestamp), COUNT(*), COUNT(DISTINCT student_id), TOTAL(confidence), COUNT(confidence)
+    FROM attendance_records
+    WHERE timestamp IS NOT NULL
+    GROUP BY 1
+    """,
+]
+
+MIGRATIONS = [
+    (1, "baseline schema", [
+        """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE,
+            role TEXT DEFAULT 'student',
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS attendance_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT NOT NULL REFERENCES students(student_id),
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            confidence REAL,
+            location TEXT,
+            device_id TEXT,
+            image_path TEXT,
+            status TEXT DEFAULT 'present'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS unknown_faces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            face_encoding BLOB,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            location TEXT,
+            image_path TEXT,
+            processed BOOLEAN DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            message TEXT,
+            severity TEXT DEFAULT 'info',
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            resolved BOOLEAN DEFAULT 0
+        )
+        """,
+    ]),
+    (2, "timestamp indexes for range queries", [
+        "CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance_records(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_student_timestamp ON attendance_records(student_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_type_timestamp ON alerts(type, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts(timestamp)",
+    ]),
+    (3, "daily attendance rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS attendance_daily (
+            day TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            location TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, student_id, status, location)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS attendance_day_summary (
+            day TEXT PRIMARY KEY,
+            records INTEGER NOT NULL,
+            students INTEGER NOT NULL,
+            confidence_sum REAL NOT NULL,
+            confidence_count INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        # The summary is updated first: `students` only grows when this is
+        # the student's first row of the day in attendance_daily
+        """
+        CREATE TRIGGER IF NOT EXISTS attendance_rollup_insert
+        AFTER INSERT ON attendance_records
+        WHEN NEW.timestamp IS NOT NULL
+        BEGIN
+            INSERT INTO attendance_day_summary (day, records, students, confidence_sum, confidence_count)
+            VALUES (
+                date(NEW.timestamp), 1,
+                NOT EXISTS (SELECT 1 FROM attendance_daily
+                            WHERE day = date(NEW.timestamp) AND student_id = NEW.student_id),
+                COALESCE(NEW.confidence, 0), NEW.confidence IS NOT NULL
+            )
+            ON CONFLICT (day) DO UPDATE SET
+                records = records + 1,
+                students = students + excluded.students,
+                confidence_sum = confidence_sum + excluded.confidence_sum,
+                confidence_count = confidence_count + excluded.confidence_count;
+            INSERT INTO attendance_daily (day, student_id, status, location, count)
+            VALUES (date(NEW.timestamp), NEW.student_id, COALESCE(NEW.status, ''), COALESCE(NEW.location, ''), 1)
+            ON CONFLICT (day, student_id, status, location) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS attendance_rollup_delete
+        AFTER DELETE ON attendance_records
+        WHEN OLD.timestamp IS NOT NULL
+        BEGIN
+            UPDATE attendance_daily SET count = count - 1
+            WHERE day = date(OLD.timestamp) AND student_id = OLD.student_id
+              AND status = COALESCE(OLD.status, '') AND location = COALESCE(OLD.location, '');
+            DELETE FROM attendance_daily
+            WHERE day = date(OLD.timestamp) AND student_id = OLD.student_id AND count <= 0;
+            UPDATE attendance_day_summary SET
+                records = records - 1,
+                students = students - NOT EXISTS (SELECT 1 FROM attendance_daily
+                                                  WHERE day = date(OLD.timestamp) AND student_id = OLD.student_id),
+                confidence_sum = confidence_sum - COALESCE(OLD.confidence, 0),
+                confidence_count = confidence_count - (OLD.confidence IS NOT NULL)
+            WHERE day = date(OLD.timestamp);
+        END
+        """,
+    ] + ROLLUP_REBUILD),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
@@ -0,0 +1,46 @@
+import base64
+import binascii
+from typing import List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Newest first. With the `after` predicate below, every page is an index
+# range seek on (timestamp, id), so deep pages cost the same as the first
+KEYSET_ORDER = "ORDER BY {t}.timestamp DESC, {t}.id DESC"
+KEYSET_AFTER = "({t}.timestamp, {t}.id) < (?, ?)"
+
+
+def encode_cursor(timestamp: str, row_id: int) -> str:
+    """Opaque page token for the row (timestamp, id); clients pass it back as `after`."""
+    raw = f"{timestamp}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        timestamp, row_id = raw.rsplit('|', 1)
+        return timestamp, int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+
+
+def page_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Parse a `limit` argument, clamped to 1..maximum; raises ValueError if not an integer."""
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit: {value!r}")
+    return max(1, min(limit, maximum))
+
+
+def keyset_page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """Split `limit + 1` fetched rows into the page and the cursor for the next one."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last['timestamp'], last['id'])
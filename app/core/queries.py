@@ -0,0 +1,97 @@
+"""SQL for the dashboard, API and service reads that touch large tables.
+
+Routes and services build their queries from here, and the query-plan test
+in test_database.py explains every one of them, so a change that stops a
+query from using its index fails the tests instead of slowing down
+production.
+"""
+from typing import List, Optional, Tuple
+
+from app.core.pagination import KEYSET_AFTER, KEYSET_ORDER
+
+# One calendar day of {t}.timestamp; comparing the raw column keeps its index usable
+DAY_RANGE = "{t}.timestamp >= date(?) AND {t}.timestamp < date(?, '+1 day')"
+
+DAY_STATUS_COUNTS = "SELECT status, SUM(count) FROM attendance_daily WHERE day = date(?) GROUP BY status"
+DAY_UNKNOWN_FACE_ALERTS = "SELECT COUNT(*) FROM alerts WHERE type='unknown_face' AND " + DAY_RANGE.format(t='alerts')
+DAY_RECENT_ATTENDANCE = (
+    "SELECT ar.*, s.name, s.email FROM attendance_records ar "
+    "LEFT JOIN students s ON ar.student_id = s.student_id "
+    "WHERE " + DAY_RANGE.format(t='ar') + " ORDER BY ar.timestamp DESC LIMIT 10"
+)
+DAY_RECORD_TOTAL = "SELECT COALESCE(SUM(records), 0) FROM attendance_day_summary WHERE day = date(?)"
+
+# Date-range analytics, answered from the rollup tables
+RANGE_RECORD_TOTAL = "SELECT COALESCE(SUM(records), 0) FROM attendance_day_summary WHERE day BETWEEN date(?) AND date(?)"
+RANGE_UNIQUE_STUDENTS = "SELECT COUNT(DISTINCT student_id) FROM attendance_daily WHERE day BETWEEN date(?) AND date(?)"
+RANGE_DAILY_COUNTS = (
+    "SELECT day, records as count FROM attendance_day_summary "
+    "WHERE day BETWEEN date(?) AND date(?) ORDER BY day"
+)
+RANGE_TOP_STUDENTS = (
+    "SELECT s.name, ad.student_id, SUM(ad.count) as count FROM attendance_daily ad "
+    "LEFT JOIN students s ON ad.student_id = s.student_id "
+    "WHERE ad.day BETWEEN date(?) AND date(?) "
+    "GROUP BY ad.student_id ORDER BY count DESC LIMIT 10"
+)
+
+# Check-ins by one student within a time window (duplicate detection)
+STUDENT_CHECKINS_BETWEEN = (
+    "SELECT COUNT(*) FROM attendance_records WHERE student_id = ? AND timestamp > ? AND timestamp < ?"
+)
+
+# Per-student totals for active students between two ISO dates
+ATTENDANCE_REPORT = """
+    SELECT s.student_id, s.name, s.email,
+           COUNT(ar.id) as total_classes,
+           SUM(CASE WHEN ar.status = 'present' THEN 1 ELSE 0 END) as present_count,
+           SUM(CASE WHEN ar.status = 'late' THEN 1 ELSE 0 END) as late_count,
+           SUM(CASE WHEN ar.status = 'absent' THEN 1 ELSE 0 END) as absent_count
+    FROM students s
+    LEFT JOIN attendance_records ar ON s.student_id = ar.student_id
+        AND ar.timestamp >= date(?) AND ar.timestamp < date(?, '+1 day')
+    WHERE s.is_active = 1
+    GROUP BY s.student_id, s.name, s.email
+    ORDER BY s.student_id
+"""
+
+
+def attendance_query(columns: str = 'ar.*, s.name, s.email', date: Optional[str] = None,
+                     student: Optional[str] = None, after: Optional[Tuple[str, int]] = None,
+                     limit: Optional[int] = None) -> Tuple[str, List]:
+    """Attendance rows joined to students, newest first, and their parameters.
+
+    `date` keeps one day, `student` matches student ids containing it,
+    `after` is a decoded keyset cursor and `limit` caps the rows.
+    """
+    sql = (f"SELECT {columns} FROM attendance_records ar "
+           "LEFT JOIN students s ON ar.student_id = s.student_id WHERE 1=1")
+    params = []
+    if date:
+        sql += ' AND ' + DAY_RANGE.format(t='ar')
+        params.extend([date, date])
+    if student:
+        sql += ' AND ar.student_id LIKE ?'
+        params.append(f'%{student}%')
+    if after:
+        sql += ' AND ' + KEYSET_AFTER.format(t='ar')
+        params.extend(after)
+    sql += ' ' + KEYSET_ORDER.format(t='ar')
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def alerts_query(after: Optional[Tuple[str, int]] = None, limit: Optional[int] = None) -> Tuple[str, List]:
+    """Alerts newest first, from the keyset cursor `after` when given."""
+    sql = 'SELECT * FROM alerts'
+    params = []
+    if after:
+        sql += ' WHERE ' + KEYSET_AFTER.format(t='alerts')
+        params.extend(after)
+    sql += ' ' + KEYSET_ORDER.format(t='alerts')
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
@@ -0,0 +1,72 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Short-lived cache of query results for the dashboard and API.
+
+    `get(key, compute)` returns the cached value for `key` while it is younger
+    than `ttl` seconds and otherwise runs `compute` and stores the result, so
+    identical requests within the window do no database work. Writers call
+    `invalidate()` after committing; a result computed while an invalidation
+    happened is returned but not stored, so it cannot outlive the write.
+    Cached values are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 256, monitor=None):
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self.monitor = monitor
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, monitor=None) -> 'ResultCache':
+        cache = config.get('database', {}).get('result_cache', {}) or {}
+        ttl = cache.get('ttl', 5.0) if cache.get('enabled', True) else 0.0
+        return cls(ttl=ttl, max_entries=cache.get('max_entries', 256), monitor=monitor)
+
+    def get(self, key: Hashable, compute: Callable[[], object]):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._count('hit')
+                return entry[1]
+            self.misses += 1
+            self._count('miss')
+            generation = self._generation
+
+        value = compute()
+        if self.ttl <= 0:
+            return value
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def _count(self, result: str):
+        if self.monitor is not None:
+            self.monitor.increment('attendance_result_cache_total', result=result)
@@ -1,6 +1,8 @@
+import os
 import time
 import logging
 import threading
+from typing import Optional
 import yaml
 import numpy as np
 
@@ -9,7 +11,14 @@ import cv2
 from app.services.face_recognition import FaceRecognitionService
 from app.services.attendance_service import AttendanceService
 from app.services.alert_service import AlertService
+from app.services.gallery_watcher import GalleryWatcher
+from app.services.face_tracker import FaceTracker
+from app.services.frame_pool import FrameProcessingPool
+from app.services.camera_scheduler import FairFrameScheduler, load_camera_configs
 from app.core.database import DatabaseManager
+from app.core.db_writer import BatchedWriter
+from app.utils.face_quality import FaceQualityGate
+from app.utils.performance import AdaptiveFrameSkipper, MotionDetector, PerformanceMonitor
 from app.web.dashboard import create_app
 
 logger = logging.getLogger(__name__)
@@ -20,23 +29,88 @@ class SmartAttendanceSystem:
         self.config = self._load_config(config_path)
         self.setup_logging()
 
+        # Shared by the pipeline and the /api/metrics endpoint
+        self.monitor = PerformanceMonitor(
+            summary_window=self.config.get('metrics', {}).get('window', 1024)
+        )
+
         # Initialize services
-        self.db_manager = DatabaseManager(self.config['database']['path'])
-        self.face_service = FaceRecognitionService(self.config)
+        self.db_manager = DatabaseManager.from_config(self.config, monitor=self.monitor)
+        self.face_service = FaceRecognitionService(self.config, monitor=self.monitor)
+        self.gallery_watcher = GalleryWatcher(
+            self.face_service,
+            self.config['face_recognition'].get('reload_interval', 2.0),
+            monitor=self.monitor
+        )
+        # Attendance and alert inserts are committed in batches off the camera threads
+        self.db_writer = BatchedWriter.from_config(
+            self.config['database']['path'], self.config, monitor=self.monitor, db_manager=self.db_manager
+        )
+        if self.db_writer is not None:
+            self.db_writer.start()
         self.attendance_service = AttendanceService(
             self.config['database']['path'],
-            self.config
+            self.config,
+            writer=self.db_writer,
+            db_manager=self.db_manager
         )
         self.alert_service = AlertService(
             self.config['database']['path'],
-            self.config
+            self.config,
+            writer=self.db_writer,
+            db_manager=self.db_manager
         )
 
+        # Every camera shares the gallery, services and writers above; each
+        # keeps its own tracker since tracks are per view
+        self.cameras = {c.camera_id: c for c in load_camera_configs(self.config)}
+        self.trackers = {cid: FaceTracker.from_config(self.config) for cid in self.cameras}
+        self.quality_gate = FaceQualityGate.from_config(self.config)
+        processing = self.config.get('processing', {}) or {}
+        self.scheduler = FairFrameScheduler(list(self.cameras), processing.get('per_camera_queue', 1))
+        # Skip rate per camera follows how long its frames take to process,
+        # given the camera's fps and how many cameras share each thread/worker
+        if processing.get('mode', 'thread') == 'process':
+            processors = processing.get('workers') or os.cpu_count() or 1
+        else:
+            processors = max(1, int(processing.get('threads', 1)))
+        self.skippers = {
+            cid: AdaptiveFrameSkipper(
+                target_fps=processing.get('target_fps', camera.fps),
+                max_skip=processing.get('max_skip', 5),
+                camera_fps=camera.fps,
+                cameras_per_worker=len(self.cameras) / processors
+            )
+            for cid, camera in self.cameras.items()
+        }
+        # Frames without motion never reach detection, unless a face is being tracked
+        motion = self.config.get('motion', {}) or {}
+        self.motion_detectors = {
+            cid: MotionDetector(
+                threshold=camera.motion_threshold,
+                pixel_delta=motion.get('pixel_delta', 25),
+                learning_rate=motion.get('learning_rate', 0.05),
+                width=motion.get('width', 160)
+            )
+            for cid, camera in self.cameras.items() if camera.motion_enabled
+        }
+        self.motion_max_idle = motion.get('max_idle_seconds', 5.0)
+
+        # In 'process' mode frames are analyzed by a worker pool and a single
+        # result thread records attendance; 'thread' analyzes in-process
+        self.processing_mode = processing.get('mode', 'thread')
+        self.processing_threads = max(1, int(processing.get('threads', 1)))
+        self.frame_pool = None
+        self.result_thread = None
+
         self.is_running = False
-        self.capture_thread = None
+        self.capture_threads = []
+        self.worker_threads = []
         self.web_thread = None
-        # Pass the full config to Flask app so FaceRecognitionService can access it
-        self.flask_app = create_app(self.config)
+        # Pass the full config and the live face service so web registration
+        # updates the same in-memory gallery the camera pipeline matches against
+        self.flask_app = create_app(self.config, face_service=self.face_service, metrics=self.monitor,
+                                    db_manager=self.db_manager)
 
     def _load_config(self, config_path: str) -> dict:
         with open(config_path, 'r', encoding='utf-8') as f:
@@ -52,15 +126,41 @@ class SmartAttendanceSystem:
             ]
         )
 
-    def start_camera_capture(self, camera_index: int = 0):
+    def start_camera_capture(self, camera_index=None):
+        """Start capture for every configured camera plus the processing threads.
+
+        `camera_index` overrides the source when a single camera is configured.
+        """
+        if camera_index is not None and len(self.cameras) == 1:
+            next(iter(self.cameras.values())).source = camera_index
+
         self.is_running = True
-        self.capture_thread = threading.Thread(
-            target=self._camera_loop,
-            args=(camera_index,),
-            daemon=True
-        )
-        self.capture_thread.start()
-        logger.info("Camera capture started")
+        self.gallery_watcher.start()
+        if self.processing_mode == 'process':
+            self.frame_pool = FrameProcessingPool.from_config(self.config)
+            self.frame_pool.start()
+            self.result_thread = threading.Thread(target=self._result_loop, daemon=True)
+            self.result_thread.start()
+            self.worker_threads = [threading.Thread(target=self._dispatch_loop, daemon=True)]
+        else:
+            self.worker_threads = [
+                threading.Thread(target=self._processing_loop, daemon=True)
+                for _ in range(self.processing_threads)
+            ]
+        for thread in self.worker_threads:
+            thread.start()
+
+        self.capture_threads = []
+        for camera in self.cameras.values():
+            thread = threading.Thread(
+                target=self._camera_loop,
+                args=(camera,),
+                name=f'capture-{camera.camera_id}',
+                daemon=True
+            )
+            thread.start()
+            self.capture_threads.append(thread)
+        logger.info("Camera capture started for %d camera(s)", len(self.cameras))
 
     def start_web_server(self):
         self.web_thread = threading.Thread(
@@ -79,67 +179,229 @@ class SmartAttendanceSystem:
             use_reloader=False
         )
 
-    def _camera_loop(self, camera_index: int):
-        cap = cv2.VideoCapture(camera_index)
+    def _camera_loop(self, camera):
+        """Grab frames as fast as the camera delivers them.
 
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config['camera']['width'])
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config['camera']['height'])
-        cap.set(cv2.CAP_PROP_FPS, self.config['camera']['fps'])
+        Reading continuously keeps OpenCV's buffer drained, and the scheduler
+        keeps only the newest frame per camera, so processing always works on
+        a current frame. Frames the skipper passes over are grabbed but never
+        decoded.
+        """
+        cap = cv2.VideoCapture(camera.source)
+
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera.height)
+        cap.set(cv2.CAP_PROP_FPS, camera.fps)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
         if not cap.isOpened():
-            logger.error(f"Could not open camera {camera_index}")
+            logger.error(f"Could not open camera {camera.camera_id} ({camera.source})")
             return
 
-        logger.info("Camera initialized successfully")
+        logger.info(f"Camera {camera.camera_id} initialized successfully")
 
+        skipper = self.skippers[camera.camera_id]
+        motion_detector = self.motion_detectors.get(camera.camera_id)
+        tracker = self.trackers[camera.camera_id]
+        last_forwarded = time.monotonic()
+        frame_count = 0
         while self.is_running:
-            ret, frame = cap.read()
-            if not ret:
-                logger.error("Failed to capture frame")
+            if not cap.grab():
+                logger.error(f"Failed to capture frame from {camera.camera_id}")
                 break
 
-            self._process_frame(frame)
-            time.sleep(1 / max(1, int(self.config['camera'].get('fps', 10))))
+            frame_count += 1
+            if not skipper.should_process(frame_count):
+                self.monitor.increment('attendance_frames_dropped_total', camera=camera.camera_id, reason='skipped')
+                continue
+
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+
+            if motion_detector is not None:
+                now = time.monotonic()
+                moving = motion_detector.has_motion(frame)
+                tracking = tracker is not None and bool(tracker.tracks)
+                idle_expired = self.motion_max_idle and now - last_forwarded >= self.motion_max_idle
+                if not (moving or tracking or idle_expired):
+                    self.monitor.increment('attendance_motion_skipped_total', camera=camera.camera_id)
+                    continue
+                last_forwarded = now
+
+            if self.scheduler.put(camera.camera_id, frame):
+                self.monitor.increment('attendance_frames_dropped_total', camera=camera.camera_id, reason='stale')
 
         cap.release()
-        logger.info("Camera capture stopped")
+        logger.info(f"Camera {camera.camera_id} capture stopped")
 
-    def _process_frame(self, frame: np.ndarray):
+    def _frame_done(self, camera_id: str, duration: Optional[float]):
+        """Feed the time spent processing a frame back into the camera's skipper.
+
+        Not the gap between processed frames: that gap already includes the
+        skipping and motion-gate idling, so it would only ever push the skip
+        rate up.
+        """
+        if duration and duration > 0:
+            self.skippers[camera_id].update_duration(duration)
+
+    def _processing_loop(self):
+        """Analyze frames in-process, taking cameras in turn from the scheduler."""
+        while self.is_running:
+            item = self.scheduler.get(timeout=0.5)
+            if item is None:
+                continue
+            camera_id, frame, captured_at = item
+            self.monitor.observe('attendance_frame_wait_seconds', time.monotonic() - captured_at, camera=camera_id)
+            start = time.perf_counter()
+            try:
+                self._process_frame(frame, self.cameras[camera_id])
+            finally:
+                self.scheduler.task_done(camera_id)
+                self._frame_done(camera_id, time.perf_counter() - start)
+
+    def _dispatch_loop(self):
+        """Feed the frame pool from the scheduler, waiting for free slots."""
+        while self.is_running:
+            item = self.scheduler.get(timeout=0.5)
+            if item is None:
+                continue
+            camera_id, frame, timestamp = item
+            try:
+                meta = {'camera_id': camera_id, 'timestamp': timestamp}
+                if not self.frame_pool.submit(frame, meta, timeout=1.0):
+                    self.monitor.increment('attendance_frames_dropped_total', camera=camera_id, reason='pool_full')
+            finally:
+                self.scheduler.task_done(camera_id)
+
+    def _process_frame(self, frame: np.ndarray, camera=None):
+        camera = camera or next(iter(self.cameras.values()))
+        tracker = self.trackers[camera.camera_id]
+        monitor = self.monitor
+        start = time.perf_counter()
         try:
-            # Check for updates to known faces (hot-reload)
-            self.face_service._load_known_faces()
-            
-            face_locations = self.face_service.detect_faces(frame)
-
-            for face_location in face_locations:
-                encoding = self.face_service.encode_face(frame, face_location)
-                if encoding is not None:
-                    student_id, confidence = self.face_service.recognize_face(encoding)
-
-                    if student_id:
-                        self.attendance_service.record_attendance(
-                            student_id=student_id,
-                            confidence=confidence,
-                            location=self.config.get('camera', {}).get('location', 'Main Entrance'),
-                            device_id=self.config.get('camera', {}).get('device_id', 'CAM_001')
-                        )
-                    else:
-                        # Save small crop for unknown face alert
-                        try:
-                            top, right, bottom, left = face_location
-                            face_img = frame[top:bottom, left:right]
-                        except Exception:
-                            face_img = frame
-
-                        self.alert_service.handle_unknown_face(encoding, face_img, self.config.get('camera', {}).get('location'))
+            with monitor.time_stage('detection'):
+                face_locations = self.face_service.detect_faces(frame)
+            monitor.observe('attendance_faces_per_frame', len(face_locations), camera=camera.camera_id)
+
+            # Only new or unconfirmed tracks are encoded; confirmed tracks reuse their identity
+            with monitor.time_stage('tracking'):
+                if tracker is not None:
+                    tracks = tracker.update(face_locations)
+                    pending = [i for i, track in enumerate(tracks) if tracker.needs_recognition(track)]
+                else:
+                    tracks = [None] * len(face_locations)
+                    pending = list(range(len(face_locations)))
+
+            # Faces too small, blurry or badly lit to match are retried on a later frame
+            if self.quality_gate is not None and pending:
+                with monitor.time_stage('quality'):
+                    pending, rejected = self.quality_gate.filter(frame, face_locations, pending)
+                for reason, count in rejected.items():
+                    monitor.increment('attendance_faces_rejected_total', count,
+                                      camera=camera.camera_id, reason=reason)
+
+            if not pending:
+                return
+
+            # Encode and match every pending face in the frame as one batch
+            with monitor.time_stage('encoding'):
+                encodings = self.face_service.encode_faces(frame, [face_locations[i] for i in pending])
+            with monitor.time_stage('matching'):
+                matches = self.face_service.recognize_faces(encodings)
+
+            for i, encoding, (student_id, confidence) in zip(pending, encodings, matches):
+                if encoding is None:
+                    continue
+                if tracks[i] is not None and not tracker.observe(tracks[i], student_id, confidence):
+                    continue
+                face_img = None
+                if not student_id:
+                    # Save small crop for unknown face alert
+                    top, right, bottom, left = face_locations[i]
+                    face_img = frame[top:bottom, left:right]
+                self._handle_match(camera, encoding, student_id, confidence, face_img)
 
         except Exception:
+            monitor.increment('attendance_frame_errors_total', camera=camera.camera_id)
             logger.exception("Error processing frame")
+        finally:
+            monitor.record_frame_time(time.perf_counter() - start)
+            monitor.increment('attendance_frames_processed_total', camera=camera.camera_id)
+
+    def _result_loop(self):
+        """Single writer for results coming back from the frame pool."""
+        while self.is_running:
+            try:
+                result = self.frame_pool.get_result(timeout=0.5)
+            except RuntimeError:
+                logger.critical("Frame processing pool has no workers left; stopping", exc_info=True)
+                self.is_running = False
+                break
+            if result is None:
+                continue
+            camera_id = result.meta['camera_id']
+            self.monitor.increment('attendance_frames_processed_total', camera=camera_id)
+            if result.error:
+                self.monitor.increment('attendance_frame_errors_total', camera=camera_id)
+                continue
+            for stage, duration in result.timings.items():
+                self.monitor.record_stage_time(stage, duration)
+            for outcome, count in result.cache_counts.items():
+                self.monitor.increment('attendance_recognition_cache_total', count, result=outcome)
+            for reason, count in result.rejected.items():
+                self.monitor.increment('attendance_faces_rejected_total', count, camera=camera_id, reason=reason)
+            self.monitor.observe('attendance_faces_per_frame', result.face_count, camera=camera_id)
+            try:
+                camera = self.cameras[camera_id]
+                self._frame_done(camera.camera_id, result.timings.get('frame'))
+                self._apply_face_results(camera, result.faces, result.meta.get('timestamp'))
+            except Exception:
+                logger.exception("Error handling frame results")
+
+    def _apply_face_results(self, camera, faces, timestamp=None):
+        """Record results analyzed out of process; the tracker suppresses repeats."""
+        tracker = self.trackers[camera.camera_id]
+        if tracker is not None:
+            tracks = tracker.update([face.location for face in faces], now=timestamp)
+        else:
+            tracks = [None] * len(faces)
+
+        for face, track in zip(faces, tracks):
+            if track is not None:
+                if not tracker.needs_recognition(track, now=timestamp):
+                    continue
+                if not tracker.observe(track, face.student_id, face.confidence, now=timestamp):
+                    continue
+            self._handle_match(camera, face.encoding, face.student_id, face.confidence, face.crop)
+
+    def _handle_match(self, camera, encoding: np.ndarray, student_id, confidence: float, face_img=None):
+        if student_id:
+            with self.monitor.time_stage('db_write'):
+                self.attendance_service.record_attendance(
+                    student_id=student_id,
+                    confidence=confidence,
+                    location=camera.location,
+                    device_id=camera.device_id
+                )
+        else:
+            with self.monitor.time_stage('alerts'):
+                self.alert_service.handle_unknown_face(encoding, face_img, camera.location)
 
     def stop(self):
         self.is_running = False
-        if self.capture_thread:
-            self.capture_thread.join(timeout=5.0)
+        for thread in self.capture_threads + self.worker_threads:
+            thread.join(timeout=5.0)
+        if self.frame_pool is not None:
+            if self.result_thread:
+                self.result_thread.join(timeout=5.0)
+            self.frame_pool.stop()
+            self.frame_pool = None
+        self.gallery_watcher.stop()
+        if self.db_writer is not None:
+            # Pipeline threads are joined above, so nothing is submitted after this flush
+            self.db_writer.stop()
+        self.db_manager.close_all()
         logger.info("Smart Attendance System stopped")
 
 
@@ -152,9 +414,9 @@ def main():
         system.start_web_server()
         
         # Start camera
-        system.start_camera_capture(system.config['camera'].get('source', 0))
+        system.start_camera_capture()
         
-        while True:
+        while system.is_running:
             time.sleep(1)
     except KeyboardInterrupt:
         logger.info("Shutdown signal received")
@@ -1,4 +1,3 @@
-import sqlite3
 import logging
 from pathlib import Path
 import time
@@ -7,22 +6,32 @@ from typing import Optional
 import numpy as np
 import pickle
 
+from app.core.database import DatabaseManager
+
 logger = logging.getLogger(__name__)
 
 
 class AlertService:
-    def __init__(self, db_path: str, config: dict):
+    def __init__(self, db_path: str, config: dict, writer=None, db_manager=None):
         self.db_path = db_path
         self.config = config
+        self.db = db_manager or DatabaseManager(db_path)
+        # Optional BatchedWriter; inserts are then queued instead of committed inline
+        self.writer = writer
         # ensure data directories
         Path('data/unknown_faces').mkdir(parents=True, exist_ok=True)
         Path(self.config.get('face_recognition', {}).get('known_faces_path', 'data/known_faces')).mkdir(parents=True, exist_ok=True)
 
-    def _execute(self, sql: str, params: tuple = ()): 
-        with sqlite3.connect(self.db_path) as conn:
+    def _execute(self, sql: str, params: tuple = ()):
+        if self.writer is not None:
+            if not self.writer.submit(sql, params):
+                raise RuntimeError("Database write queue is full")
+            return
+        with self.db.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(sql, params)
             conn.commit()
+        self.db.results.invalidate()
 
     def create_alert(self, alert_type: str, message: str, severity: str = 'info'):
         try:
@@ -66,13 +75,10 @@ class AlertService:
                 except Exception:
                     encoding_blob = None
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO unknown_faces (face_encoding, location, image_path, processed)
-                    VALUES (?, ?, ?, 0)
-                ''', (encoding_blob, location, image_path))
-                conn.commit()
+            self._execute('''
+                INSERT INTO unknown_faces (face_encoding, location, image_path, processed)
+                VALUES (?, ?, ?, 0)
+            ''', (encoding_blob, location, image_path))
 
             self.create_alert('unknown_face', f'Unknown face seen at {location or "unknown"}', 'warning')
 
@@ -1,28 +1,90 @@
 import sqlite3
 import logging
+import threading
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+from app.core.database import DatabaseManager
+from app.core.queries import ATTENDANCE_REPORT, STUDENT_CHECKINS_BETWEEN
+from app.services.checkin_window import CheckinWindow
 
 logger = logging.getLogger(__name__)
 
 
 class AttendanceService:
-    """Minimal attendance service for recording and reporting attendance."""
+    """Minimal attendance service for recording and reporting attendance.
+
+    Duplicate check-ins are caught by an in-memory CheckinWindow shared by
+    every camera that uses this service; the database is only queried for
+    back-dated check-ins older than the window. With a `writer`
+    (BatchedWriter), rows are queued and committed in batches off the
+    caller's thread. Only check-ins claimed in the window are queued: a
+    database duplicate check cannot see queued rows, so the others are
+    inserted directly, and a queued row the database rejects releases its
+    claim.
+    """
 
-    def __init__(self, db_path: str, config: Optional[dict] = None):
+    def __init__(self, db_path: str, config: Optional[dict] = None, writer=None, db_manager=None):
         self.db_path = db_path
         self.config = config or {}
+        # Shared connection manager; a private one is opened when none is passed
+        self.db = db_manager or DatabaseManager(db_path)
+        self.writer = writer
+        self._checkin_lock = threading.Lock()
+        attendance = self.config.get("attendance", {})
+        self.checkins = None
+        if attendance.get("checkin_window", True):
+            self.checkins = CheckinWindow(
+                attendance.get("duplicate_threshold", 300),
+                attendance.get("checkin_evict_interval", 60)
+            )
+            try:
+                with self.db.connection() as conn:
+                    self.checkins.warm(conn)
+            except sqlite3.Error:
+                logger.warning("Could not warm the check-in window; starting empty", exc_info=True)
+        elif writer is not None:
+            logger.warning("attendance.checkin_window is disabled; check-ins bypass the write-behind queue")
 
     def record_attendance(self, student_id: str, confidence: float,
                           location: Optional[str] = None,
                           device_id: Optional[str] = None,
-                          image_path: Optional[str] = None) -> bool:
-        """Record an attendance row. Returns True on success."""
-        try:
-            if self._is_duplicate_checkin(student_id):
+                          image_path: Optional[str] = None,
+                          timestamp: Optional[datetime] = None) -> bool:
+        """Record an attendance row. Returns True on success (or once queued).
+
+        `timestamp` back-dates the row (naive values are local time); the
+        duplicate check is then made around that time instead of now.
+        """
+        # Stamp at recognition time, not when a queued row is committed
+        timestamp = (timestamp or datetime.now()).astimezone(timezone.utc)
+        sql = (
+            "INSERT INTO attendance_records "
+            "(student_id, confidence, location, device_id, image_path, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        params = (student_id, confidence, location, device_id, image_path, _db_timestamp(timestamp))
+
+        claimed = self.checkins is not None and self.checkins.covers(timestamp)
+        if claimed:
+            if not self.checkins.claim(student_id, timestamp):
+                logger.debug("Duplicate check-in for %s", student_id)
+                return False
+            return self._write_checkin(student_id, sql, params, location, device_id, timestamp)
+
+        # Back-dated or uncached: check and insert together so two threads can't both pass
+        with self._checkin_lock:
+            if self._is_duplicate_checkin(student_id, timestamp):
                 logger.warning("Duplicate check-in for %s", student_id)
                 return False
+            return self._write_checkin(student_id, sql, params, location, device_id)
 
+    def _write_checkin(self, student_id: str, sql: str, params: tuple,
+                       location: Optional[str], device_id: Optional[str],
+                       claimed_at: Optional[datetime] = None) -> bool:
+        """Insert a check-in that passed the duplicate check; releases the claim if it isn't written."""
+        written = False
+        try:
             if self.config.get("attendance", {}).get("proxy_detection"):
                 if self._detect_proxy_attempt(student_id, location, device_id):
                     self._create_alert("proxy_attempt",
@@ -30,33 +92,42 @@ class AttendanceService:
                                        "warning")
                     return False
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                sql = (
-                    "INSERT INTO attendance_records "
-                    "(student_id, confidence, location, device_id, image_path) "
-                    "VALUES (?, ?, ?, ?, ?)"
+            if self.writer is not None and claimed_at is not None:
+                written = self.writer.submit(
+                    sql, params,
+                    on_failure=lambda: self.checkins.release(student_id, claimed_at)
                 )
-                cursor.execute(sql, (student_id, confidence, location, device_id, image_path))
-                conn.commit()
-
-            logger.info("Recorded attendance for %s", student_id)
-            return True
+            else:
+                with self.db.connection() as conn:
+                    conn.execute(sql, params)
+                    conn.commit()
+                self.db.results.invalidate()
+                written = True
 
         except sqlite3.Error:
             logger.exception("Failed to record attendance")
-            return False
+        finally:
+            if not written and claimed_at is not None:
+                self.checkins.release(student_id, claimed_at)
+
+        if written:
+            logger.info("Recorded attendance for %s", student_id)
+        return written
+
+    def _is_duplicate_checkin(self, student_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Return True if the student checked in within the duplicate threshold of `timestamp`.
 
-    def _is_duplicate_checkin(self, student_id: str) -> bool:
-        """Return True if the student checked in within the duplicate threshold."""
-        threshold = self.config.get("attendance", {}).get("duplicate_threshold", 300)
-        cutoff = datetime.now() - timedelta(seconds=threshold)
+        Rows after `timestamp` count too, since back-filled footage may be
+        written out of order with live check-ins.
+        """
+        threshold = timedelta(seconds=self.config.get("attendance", {}).get("duplicate_threshold", 300))
+        reference = (timestamp or datetime.now()).astimezone(timezone.utc)
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT COUNT(*) FROM attendance_records WHERE student_id = ? AND timestamp > ?",
-                    (student_id, cutoff),
+                    STUDENT_CHECKINS_BETWEEN,
+                    (student_id, _db_timestamp(reference - threshold), _db_timestamp(reference + threshold)),
                 )
                 row = cursor.fetchone()
                 return (row[0] if row else 0) > 0
@@ -68,36 +139,30 @@ class AttendanceService:
         return False
 
     def _create_alert(self, alert_type: str, message: str, severity: str = "info") -> None:
+        if self.writer is not None:
+            self.writer.submit("INSERT INTO alerts (type, message, severity) VALUES (?, ?, ?)",
+                               (alert_type, message, severity))
+            return
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "INSERT INTO alerts (type, message, severity) VALUES (?, ?, ?)",
                     (alert_type, message, severity),
                 )
                 conn.commit()
+            self.db.results.invalidate()
         except sqlite3.Error:
             logger.exception("Failed to create alert")
 
     def get_attendance_report(self, start_date: str, end_date: str) -> List[Dict]:
         """Return a simple attendance report between two ISO dates."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self.db.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT s.student_id, s.name, s.email,
-                       COUNT(ar.id) as total_classes,
-                       SUM(CASE WHEN ar.status = 'present' THEN 1 ELSE 0 END) as present_count,
-                       SUM(CASE WHEN ar.status = 'late' THEN 1 ELSE 0 END) as late_count,
-                       SUM(CASE WHEN ar.status = 'absent' THEN 1 ELSE 0 END) as absent_count
-                FROM students s
-                LEFT JOIN attendance_records ar ON s.student_id = ar.student_id
-                    AND date(ar.timestamp) BETWEEN ? AND ?
-                WHERE s.is_active = 1
-                GROUP BY s.student_id, s.name, s.email
-                ORDER BY s.student_id
-                """,
-                (start_date, end_date),
-            )
+            cursor.execute(ATTENDANCE_REPORT, (start_date, end_date))
             return [dict(r) for r in cursor.fetchall()]
+
+
+def _db_timestamp(value: datetime) -> str:
+    """Format like SQLite's CURRENT_TIMESTAMP (UTC); naive values are local time."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
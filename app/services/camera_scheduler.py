@@ -0,0 +1,126 @@
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Settings a `cameras:` entry takes from the `camera:` block when it leaves them unset
+INHERITED_CAMERA_KEYS = ('width', 'height', 'fps', 'rotation')
+
+
+@dataclass
+class CameraConfig:
+    camera_id: str
+    source: object = 0
+    location: str = 'Main Entrance'
+    device_id: str = 'CAM_001'
+    width: int = 640
+    height: int = 480
+    fps: int = 10
+    rotation: int = 0
+    motion_enabled: bool = True
+    motion_threshold: float = 0.01
+
+
+def load_camera_configs(config: dict) -> List[CameraConfig]:
+    """Read the `cameras:` list, falling back to the single `camera:` block.
+
+    Per-camera entries inherit only width/height/fps/rotation from `camera:`
+    and the motion gate settings from `motion:` when unset. Raises
+    ValueError when two cameras end up with the same id.
+    """
+    defaults = config.get('camera', {}) or {}
+    motion = config.get('motion', {}) or {}
+    entries = config.get('cameras')
+    if entries:
+        inherited = {k: defaults[k] for k in INHERITED_CAMERA_KEYS if k in defaults}
+        entries = [{**inherited, **entry} for entry in entries]
+    else:
+        entries = [defaults]
+
+    cameras = []
+    for i, entry in enumerate(entries):
+        device_id = entry.get('device_id', f'CAM_{i + 1:03d}')
+        camera_id = str(entry.get('id', device_id))
+        if any(c.camera_id == camera_id for c in cameras):
+            raise ValueError(f"Duplicate camera id {camera_id!r}; give each camera a unique id or device_id")
+        cameras.append(CameraConfig(
+            camera_id=camera_id,
+            source=entry.get('source', 0),
+            location=entry.get('location', 'Main Entrance'),
+            device_id=device_id,
+            width=int(entry.get('width', 640)),
+            height=int(entry.get('height', 480)),
+            fps=int(entry.get('fps', 10)),
+            rotation=int(entry.get('rotation', 0)),
+            motion_enabled=bool(entry.get('motion_enabled', motion.get('enabled', True))),
+            motion_threshold=float(entry.get('motion_threshold', motion.get('threshold', 0.01)))
+        ))
+    return cameras
+
+
+class FairFrameScheduler:
+    """Shares processing capacity fairly between camera streams.
+
+    Each camera has a small bounded queue that drops its oldest frame when
+    full, so a busy door never backs up behind stale frames. `get` hands out
+    frames round-robin across cameras that have one waiting. A camera whose
+    frame is being processed is skipped until `task_done` is called for it,
+    which keeps per-camera state (such as its tracker) single-threaded and
+    stops one busy stream from occupying every processing thread.
+    """
+
+    def __init__(self, camera_ids: List[str], max_pending: int = 2):
+        self.camera_ids = list(camera_ids)
+        self._queues: Dict[str, deque] = {cid: deque(maxlen=max(1, max_pending)) for cid in self.camera_ids}
+        self._in_flight = set()
+        self._next = 0
+        self._cond = threading.Condition()
+        self.dropped_frames = {cid: 0 for cid in self.camera_ids}
+
+    def put(self, camera_id: str, frame: np.ndarray, timestamp: Optional[float] = None) -> bool:
+        """Queue a frame; returns True if an older frame was dropped to make room."""
+        with self._cond:
+            pending = self._queues[camera_id]
+            dropped = len(pending) == pending.maxlen
+            if dropped:
+                self.dropped_frames[camera_id] += 1
+            pending.append((frame, time.monotonic() if timestamp is None else timestamp))
+            self._cond.notify()
+            return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, np.ndarray, float]]:
+        """Return (camera_id, frame, timestamp) for the next camera in turn, or None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                item = self._pop_next()
+                if item is not None:
+                    return item
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def task_done(self, camera_id: str):
+        with self._cond:
+            self._in_flight.discard(camera_id)
+            self._cond.notify()
+
+    def _pop_next(self):
+        count = len(self.camera_ids)
+        for step in range(count):
+            camera_id = self.camera_ids[(self._next + step) % count]
+            pending = self._queues[camera_id]
+            if pending and camera_id not in self._in_flight:
+                self._next = (self._next + step + 1) % count
+                self._in_flight.add(camera_id)
+                frame, timestamp = pending.popleft()
+                return camera_id, frame, timestamp
+        return None
@@ -0,0 +1,79 @@
+import sqlite3
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DB_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class CheckinWindow:
+    """In-memory last check-in time per student over the duplicate window.
+
+    `claim` is an O(1) dictionary check that also marks the student, so
+    only the first sighting per window reaches the database. The map is
+    warmed from recent attendance rows at startup and is authoritative for
+    times after the warm-up horizon (startup minus the window), as long as
+    this process records all check-ins; older, back-dated times must be
+    checked against the database instead. Expired entries are evicted every
+    `evict_interval` seconds.
+    """
+
+    def __init__(self, threshold: float = 300.0, evict_interval: float = 60.0):
+        self.threshold = float(threshold)
+        self.evict_interval = evict_interval
+        self.horizon = time.time() - self.threshold
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_eviction = time.monotonic() + evict_interval
+
+    def warm(self, conn: sqlite3.Connection):
+        """Load each student's latest check-in within the window from the database."""
+        self.horizon = time.time() - self.threshold
+        cutoff = datetime.fromtimestamp(self.horizon, timezone.utc).strftime(DB_TIME_FORMAT)
+        rows = conn.execute(
+            "SELECT student_id, MAX(timestamp) FROM attendance_records WHERE timestamp > ? GROUP BY student_id",
+            (cutoff,)
+        ).fetchall()
+        with self._lock:
+            for student_id, last in rows:
+                seen = datetime.strptime(str(last)[:19], DB_TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+                self._last_seen[student_id] = max(seen, self._last_seen.get(student_id, seen))
+        logger.info("Check-in window warmed with %d recent check-ins", len(rows))
+
+    def covers(self, timestamp: datetime) -> bool:
+        return timestamp.timestamp() >= self.horizon
+
+    def claim(self, student_id: str, timestamp: datetime) -> bool:
+        """Mark a check-in; returns False if one falls within the window of `timestamp`."""
+        seen = timestamp.timestamp()
+        with self._lock:
+            self._maybe_evict()
+            last = self._last_seen.get(student_id)
+            if last is not None and abs(seen - last) < self.threshold:
+                return False
+            # A back-dated claim must not hide a newer check-in
+            self._last_seen[student_id] = seen if last is None else max(last, seen)
+            return True
+
+    def release(self, student_id: str, timestamp: datetime):
+        """Undo a claim whose row was never written."""
+        with self._lock:
+            if self._last_seen.get(student_id) == timestamp.timestamp():
+                del self._last_seen[student_id]
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def _maybe_evict(self):
+        now = time.monotonic()
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + self.evict_interval
+        cutoff = time.time() - self.threshold
+        expired = [sid for sid, seen in self._last_seen.items() if seen < cutoff]
+        for sid in expired:
+            del self._last_seen[sid]
@@ -0,0 +1,248 @@
+import copy
+import logging
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FaceIndex:
+    """Exact nearest-neighbour index over the enrolled face gallery.
+
+    Encodings are kept in one contiguous float32 matrix alongside a parallel
+    array of student ids. Squared row norms are cached at build time so a
+    search is a single matrix product:
+
+        ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x
+
+    Rows are not unit-normalised because `tolerance` is a Euclidean distance
+    on the raw embeddings (the same metric `face_recognition.face_distance`
+    uses), and rescaling would change its meaning.
+
+    `extended()` adds one enrolled row without copying or re-processing the
+    existing ones: rows live in buffers with spare capacity that the
+    extended index shares, so only the newest index may be extended.
+    """
+
+    def __init__(self, encodings: Sequence[np.ndarray], student_ids: Sequence[str]):
+        if len(encodings) != len(student_ids):
+            raise ValueError("encodings and student_ids must have the same length")
+
+        if len(encodings):
+            matrix = np.asarray(encodings, dtype=np.float32)
+            self.matrix = np.ascontiguousarray(matrix.reshape(len(student_ids), -1))
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.student_ids = np.asarray(list(student_ids), dtype=object)
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def extended(self, encoding: np.ndarray, student_id: str) -> 'FaceIndex':
+        """Return a new index with one more row; amortised O(dim) on a non-empty index."""
+        row = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        if row.size != self.dim:
+            raise ValueError(f"Encoding has {row.size} values, index expects {self.dim}")
+        n = len(self)
+        matrix, sq_norms, student_ids = getattr(self, '_buffers', (self.matrix, self.sq_norms, self.student_ids))
+        index = copy.copy(self)
+        index._buffers = (
+            _put_row(matrix, n, row),
+            _put_row(sq_norms, n, np.dot(row, row)),
+            _put_row(student_ids, n, student_id)
+        )
+        index.matrix, index.sq_norms, index.student_ids = (buffer[:n + 1] for buffer in index._buffers)
+        return index
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best gallery row and its distance for each query row.
+
+        `queries` may be a single encoding or a (k, dim) batch; the result is
+        always a pair of length-k arrays (indices, euclidean distances).
+        """
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if len(self) == 0:
+            return np.full(len(q), -1, dtype=np.intp), np.full(len(q), np.inf, dtype=np.float32)
+
+        d2 = q @ self.matrix.T
+        d2 *= -2.0
+        d2 += self.sq_norms[None, :]
+        d2 += np.einsum('ij,ij->i', q, q)[:, None]
+
+        best = np.argmin(d2, axis=1)
+        best_d2 = d2[np.arange(len(q)), best]
+        return best, np.sqrt(np.maximum(best_d2, 0.0))
+
+
+class IVFFaceIndex(FaceIndex):
+    """Approximate index using inverted-file (IVF) coarse quantization.
+
+    The gallery is partitioned with k-means into `nlist` cells and rows are
+    stored grouped by cell, so each cell is a contiguous slice of `matrix`.
+    A search only scans the `nprobe` cells whose centroids are closest to the
+    query, trading a little recall for a large cut in distance computations.
+    Passing `centroids` from a previous build skips k-means and only
+    re-assigns rows, which keeps enrollment cheap on large galleries.
+    Rows added with `extended()` go after the last cell with their cell
+    recorded in `tail_cells`, and are scanned when that cell is probed.
+    """
+
+    def __init__(self, encodings: Sequence[np.ndarray], student_ids: Sequence[str],
+                 nlist: int = 0, nprobe: int = 8, centroids: np.ndarray = None,
+                 kmeans_iterations: int = 10, seed: int = 0):
+        super().__init__(encodings, student_ids)
+        n = len(self)
+        self.nprobe = max(1, int(nprobe))
+        self.tail_cells = np.empty(0, dtype=np.intp)
+
+        if n == 0:
+            self.centroids = np.empty((0, 0), dtype=np.float32)
+            self.offsets = np.zeros(1, dtype=np.intp)
+            return
+
+        if centroids is None or centroids.shape[1] != self.dim:
+            nlist = int(nlist) if nlist else int(np.sqrt(n))
+            centroids = _train_kmeans(self.matrix, max(1, min(nlist, n)), kmeans_iterations, seed)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+
+        assignments = _nearest_centroid(self.matrix, self.centroids)
+        order = np.argsort(assignments, kind='stable')
+        self.matrix = np.ascontiguousarray(self.matrix[order])
+        self.student_ids = self.student_ids[order]
+        self.sq_norms = self.sq_norms[order]
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.intp)
+
+    def extended(self, encoding: np.ndarray, student_id: str) -> 'IVFFaceIndex':
+        index = super().extended(encoding, student_id)
+        cell = _nearest_centroid(index.matrix[-1:], self.centroids)
+        index.tail_cells = np.concatenate((self.tail_cells, cell))
+        return index
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        best = np.full(len(q), -1, dtype=np.intp)
+        best_dist = np.full(len(q), np.inf, dtype=np.float32)
+        if len(self) == 0:
+            return best, best_dist
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_d2 = _sq_distances(q, self.centroids)
+        probes = np.argpartition(centroid_d2, nprobe - 1, axis=1)[:, :nprobe]
+
+        q_sq = np.einsum('ij,ij->i', q, q)
+        for i, cells in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+            if self.tail_cells.size:
+                tail = np.flatnonzero(np.isin(self.tail_cells, cells)) + self.offsets[-1]
+                rows = np.concatenate((rows, tail))
+            if rows.size == 0:
+                continue
+            d2 = self.sq_norms[rows] - 2.0 * (self.matrix[rows] @ q[i]) + q_sq[i]
+            j = int(np.argmin(d2))
+            best[i] = rows[j]
+            best_dist[i] = np.sqrt(max(float(d2[j]), 0.0))
+        return best, best_dist
+
+
+def build_face_index(encodings: Sequence[np.ndarray], student_ids: Sequence[str],
+                     config: dict, previous: FaceIndex = None) -> FaceIndex:
+    """Build the index type selected by `face_recognition.index` in config.
+
+    `exact` (the default) scans the whole gallery. `ann` builds an
+    IVFFaceIndex once the gallery reaches `ann.min_gallery_size`; below that
+    an exact scan is already fast and always correct.
+    """
+    fr_config = config.get('face_recognition', {})
+    kind = fr_config.get('index', 'exact')
+    if kind == 'exact':
+        return FaceIndex(encodings, student_ids)
+    if kind != 'ann':
+        raise ValueError(f"Unsupported face index: {kind}")
+
+    ann_config = fr_config.get('ann', {}) or {}
+    if len(encodings) < ann_config.get('min_gallery_size', 10000):
+        return FaceIndex(encodings, student_ids)
+
+    centroids = None
+    if isinstance(previous, IVFFaceIndex) and len(previous) >= 0.9 * len(encodings):
+        centroids = previous.centroids
+    return IVFFaceIndex(
+        encodings,
+        student_ids,
+        nlist=ann_config.get('nlist', 0),
+        nprobe=ann_config.get('nprobe', 8),
+        centroids=centroids
+    )
+
+
+def extend_face_index(index: FaceIndex, encoding: np.ndarray, student_id: str,
+                      config: dict) -> Optional[FaceIndex]:
+    """Add one enrollment to `index`, or return None when it needs a full rebuild.
+
+    A rebuild is needed for the first row, when the gallery grows into the
+    ANN size range, and once an IVF index has 10% of its rows outside the
+    cells (the rebuild keeps the trained centroids).
+    """
+    if len(index) == 0:
+        return None
+    fr_config = config.get('face_recognition', {})
+    if fr_config.get('index', 'exact') == 'ann' and not isinstance(index, IVFFaceIndex):
+        ann_config = fr_config.get('ann', {}) or {}
+        if len(index) + 1 >= ann_config.get('min_gallery_size', 10000):
+            return None
+    if isinstance(index, IVFFaceIndex) and len(index.tail_cells) + 1 > 0.1 * len(index):
+        return None
+    return index.extended(encoding, student_id)
+
+
+def _put_row(buffer: np.ndarray, n: int, value) -> np.ndarray:
+    """Store `value` at row `n` of `buffer`, doubling it when full; returns the buffer."""
+    if n == len(buffer):
+        grown = np.empty((max(16, 2 * n),) + buffer.shape[1:], dtype=buffer.dtype)
+        grown[:n] = buffer
+        buffer = grown
+    buffer[n] = value
+    return buffer
+
+
+def _sq_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    d2 = a @ b.T
+    d2 *= -2.0
+    d2 += np.einsum('ij,ij->i', b, b)[None, :]
+    d2 += np.einsum('ij,ij->i', a, a)[:, None]
+    return d2
+
+
+def _nearest_centroid(matrix: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    assignments = np.empty(len(matrix), dtype=np.intp)
+    for start in range(0, len(matrix), chunk):
+        block = matrix[start:start + chunk]
+        assignments[start:start + chunk] = np.argmin(_sq_distances(block, centroids), axis=1)
+    return assignments
+
+
+def _train_kmeans(matrix: np.ndarray, k: int, iterations: int, seed: int) -> np.ndarray:
+    """Lloyd's k-means on a bounded sample of the gallery."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), 256 * k)
+    sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest_centroid(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+
+    logger.debug("Trained IVF quantizer with %d cells on %d rows", k, sample_size)
+    return centroids
@@ -1,24 +1,54 @@
 import os
-import pickle
 import logging
+import threading
 import numpy as np
 from typing import List, Tuple, Optional, Dict
 import cv2
 from pathlib import Path
 
+from app.services.face_index import FaceIndex, build_face_index, extend_face_index
+from app.services.gallery_store import GalleryStore
+from app.services.recognition_cache import RecognitionCache
+from app.utils.performance import optimize_frame_for_detection, scale_face_locations
+
 logger = logging.getLogger(__name__)
 
 class FaceRecognitionService:
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, monitor=None):
         self.config = config
-        self.known_face_encodings = []
+        # Optional PerformanceMonitor that receives recognition cache hit/miss counts
+        self.monitor = monitor
+        self.recognition_cache = RecognitionCache.from_config(config)
         self.known_face_metadata = []
+        self._encodings = np.empty((0, 0), dtype=np.float32)
+        self._index = FaceIndex([], [])
+        self._lock = threading.Lock()
+        # dlib's encoder network is not safe to run from several threads at once
+        self._encoder_lock = threading.Lock()
         self.model_backend = config['face_recognition']['model_backend']
-        self.last_loaded_time = 0
+        self.known_faces_path = Path(config['face_recognition']['known_faces_path'])
+        self.store = GalleryStore(self.known_faces_path)
+        self._loaded_version = 0
         self._load_model_backend()
+        self._migrate_legacy_gallery()
         self._load_known_faces()
 
+        # Matching or enrolling would fail on every frame; refuse to start instead
+        embedding_dim = getattr(self.face_recognition_lib, 'embedding_dim', None)
+        if embedding_dim and self.store.dim not in (None, embedding_dim):
+            raise ValueError(f"Gallery at {self.known_faces_path} holds {self.store.dim}-d encodings but "
+                             f"{self.model_backend} produces {embedding_dim}-d; re-enroll faces into an "
+                             f"empty known_faces_path after switching backends")
+
+    @property
+    def known_face_encodings(self) -> List[np.ndarray]:
+        """Gallery rows as a list of read-only views into the mapped store."""
+        with self._lock:
+            if len(self._encodings) != len(self.known_face_metadata):
+                self._encodings = self.store.load()[0][:len(self.known_face_metadata)]
+            return list(self._encodings)
+
     def _load_model_backend(self):
         """Load the selected face recognition backend"""
         try:
@@ -29,61 +59,119 @@ class FaceRecognitionService:
                 import dlib
                 self.face_recognition_lib = dlib
             elif self.model_backend == "insightface":
-                import insightface
-                self.face_recognition_lib = insightface
+                from app.services.onnx_backend import OnnxFaceBackend
+                self.face_recognition_lib = OnnxFaceBackend.from_config(self.config)
             else:
                 raise ValueError(f"Unsupported model backend: {self.model_backend}")
         except ImportError as e:
             logger.error(f"Failed to load {self.model_backend}: {e}")
             raise
 
-    def _load_known_faces(self):
-        """Load known face encodings from database or disk"""
-        known_faces_path = Path(self.config['face_recognition']['known_faces_path'])
-        known_faces_path.mkdir(parents=True, exist_ok=True)
-
-        encodings_file = known_faces_path / "encodings.pkl"
-        if encodings_file.exists():
+    def _migrate_legacy_gallery(self):
+        """Import a pre-existing encodings.pkl into the gallery store once."""
+        legacy_file = self.known_faces_path / "encodings.pkl"
+        if legacy_file.exists() and self.store.version() == 0:
             try:
-                mtime = encodings_file.stat().st_mtime
-                if mtime > self.last_loaded_time:
-                    with open(encodings_file, 'rb') as f:
-                        data = pickle.load(f)
-                        self.known_face_encodings = data['encodings']
-                        self.known_face_metadata = data['metadata']
-                    self.last_loaded_time = mtime
-                    logger.info(f"Loaded {len(self.known_face_encodings)} known faces")
+                self.store.migrate_from_pickle(legacy_file)
             except Exception as e:
-                logger.error(f"Error loading known faces: {e}")
+                logger.error(f"Error migrating {legacy_file}: {e}")
+
+    def _load_known_faces(self) -> bool:
+        """Load known face encodings from the gallery store if it changed.
 
-    def save_known_faces(self):
-        """Save known face encodings to disk"""
-        known_faces_path = Path(self.config['face_recognition']['known_faces_path'])
-        encodings_file = known_faces_path / "encodings.pkl"
+        The new gallery and its index are built before being swapped in, so
+        concurrent recognize calls see either the old or the new gallery.
+        Returns True when a new gallery was loaded.
+        """
+        version = self.store.version()
+        if version == self._loaded_version:
+            return False
 
         try:
-            with open(encodings_file, 'wb') as f:
-                pickle.dump({
-                    'encodings': self.known_face_encodings,
-                    'metadata': self.known_face_metadata
-                }, f)
-            logger.info("Saved known faces to disk")
+            encodings, metadata = self.store.load()
+            index = self._build_index(encodings, metadata)
         except Exception as e:
-            logger.error(f"Error saving known faces: {e}")
+            logger.error(f"Error loading known faces: {e}")
+            return False
+
+        with self._lock:
+            # An enrollment in this process may have swapped in a larger gallery meanwhile
+            if len(metadata) < len(self.known_face_metadata):
+                return False
+            self._encodings, self.known_face_metadata, self._index = encodings, metadata, index
+            self._loaded_version = version
+            self._clear_recognition_cache()
+        logger.info(f"Loaded {len(metadata)} known faces")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Pick up gallery changes written by other processes."""
+        return self._load_known_faces()
+
+    def _build_index(self, encodings: np.ndarray, metadata: List[dict]) -> FaceIndex:
+        return build_face_index(
+            encodings,
+            [m.get('student_id') for m in metadata],
+            self.config,
+            previous=self._index
+        )
 
     def add_known_face(self, encoding: np.ndarray, metadata: dict):
-        """Add a new known face to the system"""
-        self.known_face_encodings.append(encoding)
-        self.known_face_metadata.append(metadata)
-        self.save_known_faces()
+        """Add a new known face to the system.
+
+        Appends a single row to the gallery store and extends the live index
+        by that row. The gallery is reloaded and re-indexed instead when
+        another process enrolled faces this one hasn't loaded yet, or the
+        index has to be rebuilt (see `extend_face_index`).
+        """
+        with self._lock:
+            row, version = self.store.append(encoding, metadata)
+            index = None
+            if row == len(self.known_face_metadata):
+                index = extend_face_index(self._index, encoding, metadata.get('student_id'), self.config)
+            if index is None:
+                encodings, all_metadata = self.store.load()
+                index = self._build_index(encodings, all_metadata)
+                self._encodings, self.known_face_metadata = encodings, all_metadata
+            else:
+                self.known_face_metadata.append(metadata)
+            self._index = index
+            self._loaded_version = version
+            self._clear_recognition_cache()
+
+    def _clear_recognition_cache(self):
+        # A new enrollment can turn a cached unknown into a known student
+        if self.recognition_cache is not None:
+            self.recognition_cache.clear()
 
     def detect_faces(self, image: np.ndarray) -> List[Tuple]:
-        """Detect faces in an image"""
+        """Detect faces in an image.
+
+        With `detection_scale` < 1 the detector runs on a downsized copy (and
+        on grayscale for HOG when `detection_grayscale` is set); boxes are
+        mapped back to full-resolution coordinates so encoding still uses
+        full-quality crops. The insightface backend letterboxes into its own
+        fixed detector input size instead.
+        """
+        if self.model_backend == "insightface":
+            return self.face_recognition_lib.detect([image])[0]
         if self.model_backend == "face_recognition":
+            fr_config = self.config['face_recognition']
+            model = fr_config['detection_model']
+            scale = float(fr_config.get('detection_scale', 1.0))
+            grayscale = bool(fr_config.get('detection_grayscale', False)) and model == 'hog'
+
+            detect_image = image
+            if scale < 1.0 or grayscale:
+                detect_image = optimize_frame_for_detection(image, scale=scale, grayscale=grayscale)
+
             face_locations = self.face_recognition_lib.face_locations(
-                image, 
-                model=self.config['face_recognition']['detection_model']
+                detect_image,
+                number_of_times_to_upsample=fr_config.get('detection_upsample', 1),
+                model=model
             )
+            if detect_image is not image:
+                face_locations = scale_face_locations(face_locations, detect_image.shape, image.shape)
             return face_locations
         else:
             # Implement other backends
@@ -91,34 +179,74 @@ class FaceRecognitionService:
 
     def encode_face(self, image: np.ndarray, face_location: Tuple) -> np.ndarray:
         """Encode a face into a feature vector"""
+        return self.encode_faces(image, [face_location])[0]
+
+    def encode_faces(self, image: np.ndarray, face_locations: List[Tuple]) -> List[Optional[np.ndarray]]:
+        """Encode every face in an image with a single backend call.
+
+        Returns one entry per location, None where no encoding was produced.
+        """
+        if not face_locations:
+            return []
+
         if self.model_backend == "face_recognition":
-            encoding = self.face_recognition_lib.face_encodings(
-                image, 
-                [face_location],
-                num_jitters=self.config['face_recognition']['num_jitters']
-            )
-            return encoding[0] if encoding else None
+            with self._encoder_lock:
+                encodings = self.face_recognition_lib.face_encodings(
+                    image,
+                    list(face_locations),
+                    num_jitters=self.config['face_recognition']['num_jitters']
+                )
+            encodings = list(encodings)
+            return encodings + [None] * (len(face_locations) - len(encodings))
+        elif self.model_backend == "insightface":
+            return self.face_recognition_lib.encode(image, face_locations)
         else:
             # Implement other backends
-            return None
+            return [None] * len(face_locations)
 
     def recognize_face(self, encoding: np.ndarray) -> Tuple[Optional[str], float]:
         """Recognize a face from known encodings"""
-        if not self.known_face_encodings:
-            return None, 0.0
+        return self.recognize_faces([encoding])[0]
 
-        if self.model_backend == "face_recognition":
-            distances = self.face_recognition_lib.face_distance(
-                self.known_face_encodings, 
-                encoding
-            )
-    
-            if len(distances) > 0:
-                min_distance = min(distances)
-                if min_distance < self.config['face_recognition']['tolerance']:
-                    best_match_idx = np.argmin(distances)
-                    student_id = self.known_face_metadata[best_match_idx]['student_id']
-                    confidence = 1 - min_distance
-                    return student_id, confidence
-
-        return None, 0.0
+    def recognize_faces(self, encodings: List[Optional[np.ndarray]]) -> List[Tuple[Optional[str], float]]:
+        """Match a batch of encodings against the gallery in one matrix op.
+
+        Encodings close to one matched in the last few seconds reuse that
+        result from the recognition cache; only the rest are searched.
+        Entries that are None are returned as unknown.
+        """
+        results = [(None, 0.0)] * len(encodings)
+        cache = self.recognition_cache
+        # Read the generation before the index: a gallery swap assigns the
+        # index and then clears the cache, so a stale index implies a stale
+        # generation and its results are not stored
+        generation = cache.generation if cache is not None else None
+        index = self._index
+        present = [i for i, e in enumerate(encodings) if e is not None]
+        if len(index) == 0 or not present:
+            return results
+
+        queries = np.stack([encodings[i] for i in present])
+        if cache is not None:
+            cached = cache.lookup(queries)
+            misses = [k for k, hit in enumerate(cached) if hit is None]
+            for i, hit in zip(present, cached):
+                if hit is not None:
+                    results[i] = hit
+            if self.monitor is not None:
+                self.monitor.increment('attendance_recognition_cache_total', len(present) - len(misses), result='hit')
+                self.monitor.increment('attendance_recognition_cache_total', len(misses), result='miss')
+            if not misses:
+                return results
+            present = [present[k] for k in misses]
+            queries = queries[misses]
+
+        best, distances = index.search(queries)
+        tolerance = self.config['face_recognition']['tolerance']
+        for i, query, row, distance in zip(present, queries, best, distances):
+            distance = float(distance)
+            if distance < tolerance:
+                results[i] = (index.student_ids[row], 1 - distance)
+            if cache is not None:
+                cache.store(query, results[i], generation=generation)
+        return results
@@ -0,0 +1,119 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: Tuple[int, int, int, int]
+    last_seen: float
+    student_id: Optional[str] = None
+    confidence: float = 0.0
+    votes: int = 0
+    confirmed: bool = False
+    last_recognized: Optional[float] = None
+
+
+def box_iou(a: Tuple, b: Tuple) -> float:
+    """IoU of two (top, right, bottom, left) boxes."""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+class FaceTracker:
+    """Associates face detections across frames by box overlap.
+
+    Each detection is greedily matched to the live track with the highest IoU
+    above `iou_threshold`; unmatched detections start new tracks and tracks
+    unseen for `max_age` seconds are dropped. A track needs recognition until
+    `confirm_hits` consecutive results agree on its identity (a student or
+    unknown), and again every `reverify_interval` seconds after that, so a
+    person standing in view is encoded a handful of times instead of on
+    every frame.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: float = 1.0,
+                 confirm_hits: int = 2, reverify_interval: float = 5.0):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.confirm_hits = max(1, int(confirm_hits))
+        self.reverify_interval = reverify_interval
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['FaceTracker']:
+        tracking = config.get('tracking', {}) or {}
+        if not tracking.get('enabled', True):
+            return None
+        return cls(
+            iou_threshold=tracking.get('iou_threshold', 0.3),
+            max_age=tracking.get('max_age', 1.0),
+            confirm_hits=tracking.get('confirm_hits', 2),
+            reverify_interval=tracking.get('reverify_interval', 5.0)
+        )
+
+    def update(self, face_locations: List[Tuple], now: Optional[float] = None) -> List[Track]:
+        """Assign each detection to a track; returns tracks aligned with `face_locations`."""
+        now = time.monotonic() if now is None else now
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+
+        pairs = []
+        for i, box in enumerate(face_locations):
+            for j, track in enumerate(self.tracks):
+                iou = box_iou(box, track.box)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, i, j))
+        pairs.sort(reverse=True)
+
+        assigned: List[Optional[Track]] = [None] * len(face_locations)
+        used_tracks = set()
+        for _, i, j in pairs:
+            if assigned[i] is None and j not in used_tracks:
+                assigned[i] = self.tracks[j]
+                used_tracks.add(j)
+
+        for i, box in enumerate(face_locations):
+            track = assigned[i]
+            if track is None:
+                track = Track(track_id=self._next_id, box=tuple(box), last_seen=now)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[i] = track
+            track.box = tuple(box)
+            track.last_seen = now
+        return assigned
+
+    def needs_recognition(self, track: Track, now: Optional[float] = None) -> bool:
+        if not track.confirmed:
+            return True
+        now = time.monotonic() if now is None else now
+        return self.reverify_interval is not None and now - track.last_recognized >= self.reverify_interval
+
+    def observe(self, track: Track, student_id: Optional[str], confidence: float,
+                now: Optional[float] = None) -> bool:
+        """Record a recognition result; returns True when the track becomes confirmed."""
+        track.last_recognized = time.monotonic() if now is None else now
+        if track.votes and student_id == track.student_id:
+            track.votes += 1
+        else:
+            track.student_id = student_id
+            track.votes = 1
+            track.confirmed = False
+        track.confidence = confidence
+
+        if not track.confirmed and track.votes >= self.confirm_hits:
+            track.confirmed = True
+            logger.debug("Track %d confirmed as %s", track.track_id, student_id or 'unknown')
+            return True
+        return False
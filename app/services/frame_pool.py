@@ -0,0 +1,350 @@
+import time
+import logging
+import queue
+import threading
+import traceback
+import multiprocessing as mp
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FaceResult:
+    location: tuple
+    student_id: Optional[str]
+    confidence: float
+    encoding: Optional[np.ndarray]
+    crop: Optional[np.ndarray] = None
+
+
+@dataclass
+class FrameResult:
+    meta: dict
+    faces: List[FaceResult] = field(default_factory=list)
+    face_count: int = 0
+    timings: dict = field(default_factory=dict)
+    cache_counts: dict = field(default_factory=dict)
+    rejected: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def analyze_frame(face_service, frame: np.ndarray, timings: Optional[dict] = None,
+                  quality_gate=None, rejected: Optional[dict] = None) -> Tuple[List[FaceResult], int]:
+    """Detect, encode and match every face in a frame.
+
+    Returns the analyzed faces and the number of faces detected, counted
+    before the quality gate like the in-process pipeline does.
+
+    Unknown faces carry a copy of their crop so the caller can raise an alert
+    without holding on to the frame. Faces failing `quality_gate` are not
+    encoded and are counted by reason in `rejected`. Per-stage durations are
+    written into `timings` when given.
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    face_locations = face_service.detect_faces(frame)
+    timings['detection'] = time.perf_counter() - start
+    detected = len(face_locations)
+    if quality_gate is not None and face_locations:
+        start = time.perf_counter()
+        passed, reasons = quality_gate.filter(frame, face_locations)
+        face_locations = [face_locations[i] for i in passed]
+        timings['quality'] = time.perf_counter() - start
+        if rejected is not None:
+            rejected.update(reasons)
+    if not face_locations:
+        return [], detected
+
+    start = time.perf_counter()
+    encodings = face_service.encode_faces(frame, face_locations)
+    timings['encoding'] = time.perf_counter() - start
+    start = time.perf_counter()
+    matches = face_service.recognize_faces(encodings)
+    timings['matching'] = time.perf_counter() - start
+
+    faces = []
+    for location, encoding, (student_id, confidence) in zip(face_locations, encodings, matches):
+        if encoding is None:
+            continue
+        crop = None
+        if not student_id:
+            top, right, bottom, left = location
+            crop = frame[top:bottom, left:right].copy()
+        faces.append(FaceResult(tuple(location), student_id, confidence, encoding, crop))
+    return faces, detected
+
+
+class FrameProcessingPool:
+    """Runs face analysis in worker processes fed from a shared-memory frame ring.
+
+    The capture side copies each frame into a free slot of one shared-memory
+    block and queues only the slot number, shape and metadata, so full frames
+    are never pickled. Each worker owns a FaceRecognitionService (kept fresh
+    by its own GalleryWatcher) and sends back small per-face results. A slot
+    returns to the free list when its result is collected, which bounds the
+    number of frames in flight; `submit` drops frames instead of blocking when
+    every slot is busy.
+
+    `start` waits for every worker to load its models and raises if one
+    cannot. Afterwards `get_result` checks on the workers: one that died is
+    logged, the slot it was working on is reclaimed and it is restarted,
+    unless it died again before it was ready. Once no worker is left,
+    `get_result` raises RuntimeError.
+    """
+
+    def __init__(self, config: dict, workers: int = 2, slots: int = 8,
+                 slot_bytes: int = 1920 * 1080 * 3, start_method: str = 'spawn',
+                 start_timeout: float = 120.0, service_factory=None):
+        self.config = config
+        self.workers = max(1, int(workers))
+        self.slots = max(self.workers, int(slots))
+        self.slot_bytes = int(slot_bytes)
+        self.start_timeout = start_timeout
+        # Module-level callable building the face service in each worker; tests pass a stub
+        self.service_factory = service_factory
+        self.dropped_frames = 0
+        self.restarts = 0
+        self._ctx = mp.get_context(start_method)
+        self._shm = None
+        self._processes = []
+        self._ready = []
+        self._current = None
+        self._free_slots = queue.Queue()
+        self._in_flight = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self._oversized = set()
+        self._task_queue = None
+        self._result_queue = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'FrameProcessingPool':
+        from app.services.camera_scheduler import load_camera_configs
+
+        processing = config.get('processing', {}) or {}
+        frame_bytes = max(c.width * c.height * 3 for c in load_camera_configs(config))
+        return cls(
+            config,
+            workers=processing.get('workers') or mp.cpu_count(),
+            slots=processing.get('queue_size', 8),
+            slot_bytes=processing.get('max_frame_bytes', frame_bytes),
+            start_method=processing.get('start_method', 'spawn'),
+            start_timeout=processing.get('worker_start_timeout', 120.0)
+        )
+
+    def start(self):
+        """Start the workers and wait until each has loaded; raises RuntimeError if one can't."""
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._task_queue = self._ctx.Queue(maxsize=self.slots)
+        self._result_queue = self._ctx.Queue()
+        # Sequence number of the task each worker is on, -1 when idle
+        self._current = self._ctx.Array('q', [-1] * self.workers, lock=False)
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+
+        self._processes = [None] * self.workers
+        self._ready = [False] * self.workers
+        for i in range(self.workers):
+            self._spawn(i)
+
+        deadline = time.monotonic() + self.start_timeout
+        while not all(self._ready):
+            error = None
+            try:
+                kind, index, *payload = self._result_queue.get(timeout=0.5)
+                if kind == 'ready':
+                    self._ready[index] = True
+                elif kind == 'failed':
+                    error = f"frame worker {index} failed to start:\n{payload[0]}"
+            except queue.Empty:
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    error = f"{', '.join(dead)} exited during startup"
+                elif time.monotonic() > deadline:
+                    error = f"frame workers not ready after {self.start_timeout:.0f}s"
+            if error:
+                self.stop()
+                raise RuntimeError(f"Frame processing pool could not start: {error}")
+        logger.info("Frame processing pool started with %d workers, %d slots", self.workers, self.slots)
+
+    def _spawn(self, index: int):
+        self._current[index] = -1
+        self._ready[index] = False
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.config, self._shm.name, self.slot_bytes, self._task_queue, self._result_queue,
+                  index, self._current, self.service_factory),
+            name=f'frame-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def submit(self, frame: np.ndarray, meta: Optional[dict] = None,
+               timeout: Optional[float] = 0) -> bool:
+        """Queue a frame for analysis; returns False if it was dropped.
+
+        Waits up to `timeout` seconds for a free slot (0 = don't wait).
+        """
+        meta = meta or {}
+        if frame.nbytes > self.slot_bytes:
+            camera_id = meta.get('camera_id')
+            if camera_id not in self._oversized:
+                # Once per camera: a camera ignoring the requested size does this to every frame
+                self._oversized.add(camera_id)
+                logger.error("Dropping frames from camera %s: %d bytes exceed the pool slot size %d "
+                             "(set processing.max_frame_bytes)", camera_id, frame.nbytes, self.slot_bytes)
+            self.dropped_frames += 1
+            return False
+        try:
+            slot = self._free_slots.get(timeout=timeout) if timeout else self._free_slots.get_nowait()
+        except queue.Empty:
+            self.dropped_frames += 1
+            return False
+
+        offset = slot * self.slot_bytes
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=offset)
+        view[...] = frame
+        del view
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._in_flight[seq] = slot
+        self._task_queue.put((seq, slot, frame.shape, frame.dtype.str, meta))
+        return True
+
+    def get_result(self, timeout: Optional[float] = None) -> Optional[FrameResult]:
+        """Return the next finished frame, or None on timeout.
+
+        Also restarts workers that died; raises RuntimeError once none are left.
+        """
+        self._check_workers()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, *payload = self._result_queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if kind == 'result':
+                seq, result = payload
+                self._release(seq)
+                return result
+            if kind == 'ready':
+                self._ready[payload[0]] = True
+            elif kind == 'failed':
+                logger.error("Frame worker %d failed to start:\n%s", *payload)
+
+    def _release(self, seq: int) -> bool:
+        # A dead worker's slot may have been reclaimed already
+        with self._lock:
+            slot = self._in_flight.pop(seq, None)
+        if slot is None:
+            return False
+        self._free_slots.put(slot)
+        return True
+
+    def _check_workers(self):
+        for i, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            seq = self._current[i]
+            if seq >= 0 and self._release(seq):
+                logger.warning("Reclaimed the frame slot held by %s", process.name)
+            if not self._ready[i]:
+                # Dying again before loading its models; restarting would just loop
+                logger.error("%s exited with code %s before it was ready; not restarting it",
+                             process.name, process.exitcode)
+                self._processes[i] = None
+                continue
+            logger.error("%s exited with code %s; restarting it", process.name, process.exitcode)
+            self.restarts += 1
+            self._spawn(i)
+        if not any(self._processes):
+            raise RuntimeError("No frame workers are running")
+
+    def stop(self):
+        processes = [p for p in self._processes if p is not None]
+        for _ in processes:
+            try:
+                self._task_queue.put(None, timeout=1.0)
+            except queue.Full:
+                break
+        for process in processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        logger.info("Frame processing pool stopped")
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: workers share the parent's resource tracker, so the
+        # duplicate registration is harmless and the parent still unlinks
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(config: dict, shm_name: str, slot_bytes: int, task_queue, result_queue,
+                 index: int = 0, current=None, service_factory=None):
+    from app.services.gallery_watcher import GalleryWatcher
+    from app.utils.face_quality import FaceQualityGate
+
+    try:
+        if service_factory is None:
+            from app.services.face_recognition import FaceRecognitionService
+            service_factory = FaceRecognitionService
+        shm = _attach_shared_memory(shm_name)
+        face_service = service_factory(config)
+        quality_gate = FaceQualityGate.from_config(config)
+    except Exception:
+        result_queue.put(('failed', index, traceback.format_exc()))
+        raise
+    watcher = GalleryWatcher(face_service, config['face_recognition'].get('reload_interval', 2.0))
+    watcher.start()
+    result_queue.put(('ready', index))
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            seq, slot, shape, dtype, meta = task
+            if current is not None:
+                current[index] = seq
+            result = FrameResult(meta=meta)
+            frame = None
+            cache = face_service.recognition_cache
+            hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+            start = time.perf_counter()
+            try:
+                frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=slot * slot_bytes)
+                result.faces, result.face_count = analyze_frame(
+                    face_service, frame, result.timings, quality_gate, result.rejected
+                )
+            except Exception as e:
+                logger.exception("Error processing frame in worker")
+                result.error = str(e)
+            finally:
+                # Release the view so the slot can be reused and shm closed
+                frame = None
+                result.timings['frame'] = time.perf_counter() - start
+                if cache is not None:
+                    result.cache_counts = {'hit': cache.hits - hits, 'miss': cache.misses - misses}
+            result_queue.put(('result', seq, result))
+            if current is not None:
+                current[index] = -1
+    finally:
+        watcher.stop()
+        shm.close()
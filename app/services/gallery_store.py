@@ -0,0 +1,174 @@
+import json
+import logging
+import pickle
+import threading
+import numpy as np
+from pathlib import Path
+from typing import List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process append lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class GalleryStore:
+    """Append-only on-disk face gallery.
+
+    Layout inside `known_faces_path`:
+      - embeddings.f32  raw little-endian float32 rows, one per enrolled face
+      - metadata.jsonl  one JSON object per row, in the same order
+      - gallery.json    header with the embedding dimension
+
+    Enrollment appends one row and one metadata line. The metadata line is
+    written last and acts as the commit marker, so readers only expose rows
+    that have a metadata line. Readers map the embeddings with `np.memmap`
+    instead of reading them, and parse only metadata lines appended since the
+    previous load.
+    """
+
+    EMBEDDINGS_FILE = 'embeddings.f32'
+    METADATA_FILE = 'metadata.jsonl'
+    HEADER_FILE = 'gallery.json'
+    LOCK_FILE = '.gallery.lock'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embeddings_file = self.path / self.EMBEDDINGS_FILE
+        self.metadata_file = self.path / self.METADATA_FILE
+        self.header_file = self.path / self.HEADER_FILE
+        self.dim = None
+        self._metadata = []
+        self._metadata_offset = 0
+        self._lock = threading.Lock()
+
+    def version(self) -> int:
+        """Cheap change marker: the committed size of the metadata file."""
+        try:
+            return self.metadata_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def load(self) -> Tuple[np.ndarray, List[dict]]:
+        """Return a read-only (n, dim) memmap of the gallery and its metadata."""
+        with self._lock:
+            self._read_header()
+            self._read_new_metadata()
+            n = len(self._metadata)
+            if n == 0 or self.dim is None:
+                return np.empty((0, self.dim or 0), dtype=np.float32), []
+
+            available = self.embeddings_file.stat().st_size // (4 * self.dim)
+            if available < n:
+                logger.warning("Gallery has %d metadata rows but only %d embeddings", n, available)
+                n = available
+            matrix = np.memmap(self.embeddings_file, dtype='<f4', mode='r', shape=(n, self.dim))
+            return matrix, list(self._metadata[:n])
+
+    def append(self, encoding: np.ndarray, metadata: dict) -> Tuple[int, int]:
+        """Append one enrolled face. O(1) in the gallery size.
+
+        Returns the new row's index and the store version once it is committed.
+        """
+        row = np.ascontiguousarray(encoding, dtype='<f4').reshape(-1)
+        line = (json.dumps(metadata, default=str) + '\n').encode('utf-8')
+
+        with self._lock, self._file_lock():
+            self._read_header()
+            if self.dim is None:
+                self._write_header(row.size)
+            elif row.size != self.dim:
+                raise ValueError(f"Encoding has {row.size} values, gallery expects {self.dim}")
+
+            committed = self._count_committed_rows()
+            with open(self.embeddings_file, 'ab') as f:
+                # Drop a row left behind by an append that died before its metadata line
+                f.truncate(committed * 4 * self.dim)
+                f.write(row.tobytes())
+            with open(self.metadata_file, 'ab') as f:
+                # Likewise drop a partial metadata line, or this one would be glued onto it
+                f.truncate(self._metadata_offset)
+                f.write(line)
+            return committed, self._metadata_offset + len(line)
+
+    def migrate_from_pickle(self, pickle_path) -> int:
+        """One-shot import of a legacy encodings.pkl into an empty store.
+
+        The pickle is renamed to `encodings.pkl.migrated` afterwards so the
+        import never runs twice. Returns the number of faces imported.
+        """
+        pickle_path = Path(pickle_path)
+        with open(pickle_path, 'rb') as f:
+            data = pickle.load(f)
+        encodings, metadata = data['encodings'], data['metadata']
+
+        with self._lock, self._file_lock():
+            if self.version() > 0:
+                raise RuntimeError(f"Gallery store at {self.path} is not empty")
+            if encodings:
+                matrix = np.ascontiguousarray(encodings, dtype='<f4').reshape(len(encodings), -1)
+                self._write_header(matrix.shape[1])
+                with open(self.embeddings_file, 'wb') as f:
+                    f.write(matrix.tobytes())
+                with open(self.metadata_file, 'wb') as f:
+                    f.writelines((json.dumps(m, default=str) + '\n').encode('utf-8') for m in metadata)
+
+        pickle_path.rename(pickle_path.with_name(pickle_path.name + '.migrated'))
+        logger.info("Migrated %d known faces from %s", len(encodings), pickle_path)
+        return len(encodings)
+
+    def _read_header(self):
+        if self.dim is None and self.header_file.exists():
+            self.dim = int(json.loads(self.header_file.read_text(encoding='utf-8'))['dim'])
+
+    def _write_header(self, dim: int):
+        self.header_file.write_text(json.dumps({'dim': int(dim), 'dtype': 'float32'}), encoding='utf-8')
+        self.dim = int(dim)
+
+    def _read_new_metadata(self):
+        size = self.version()
+        if size < self._metadata_offset:
+            # File was replaced; start over
+            self._metadata, self._metadata_offset = [], 0
+        if size == self._metadata_offset:
+            return
+
+        with open(self.metadata_file, 'rb') as f:
+            f.seek(self._metadata_offset)
+            chunk = f.read(size - self._metadata_offset)
+        # Only consume complete lines; a concurrent append may be mid-write
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self._metadata.append(json.loads(line))
+        self._metadata_offset += end
+
+    def _count_committed_rows(self) -> int:
+        self._read_new_metadata()
+        return len(self._metadata)
+
+    def _file_lock(self):
+        return _FileLock(self.path / self.LOCK_FILE)
+
+
+class _FileLock:
+    """Exclusive advisory lock so processes don't interleave appends."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fh = open(self.path, 'a')
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,44 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GalleryWatcher:
+    """Polls the on-disk gallery and hot-swaps changes into a FaceRecognitionService.
+
+    Runs off the frame-processing path so camera loops never touch the
+    filesystem to check gallery freshness. The service builds the new index
+    before swapping it in, so recognition always sees a complete gallery.
+    """
+
+    def __init__(self, face_service, interval: float = 2.0, monitor=None):
+        self.face_service = face_service
+        self.monitor = monitor
+        self.interval = max(0.1, float(interval))
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='gallery-watcher', daemon=True)
+        self._thread.start()
+        logger.info("Gallery watcher started (interval %.1fs)", self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                start = time.perf_counter()
+                if self.face_service.reload_if_changed() and self.monitor is not None:
+                    self.monitor.record_stage_time('gallery_reload', time.perf_counter() - start)
+            except Exception:
+                logger.exception("Gallery reload failed")
@@ -0,0 +1,248 @@
+import os
+import time
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.face_tracker import FaceTracker
+from app.utils.face_quality import FaceQualityGate
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+@dataclass
+class FootageChunk:
+    """A range of frames from one video file or frame directory."""
+    source: str
+    start_frame: int
+    end_frame: Optional[int]  # exclusive; None reads to the end of the video
+    start_time: datetime  # wall-clock time of frame 0 of the source
+    fps: float
+    step: int = 1  # analyze every `step`-th frame
+    location: str = 'Recorded footage'
+    device_id: str = 'OFFLINE'
+
+
+@dataclass
+class Sighting:
+    student_id: str
+    confidence: float
+    timestamp: datetime
+    location: str
+    device_id: str
+
+
+@dataclass
+class ChunkResult:
+    chunk: FootageChunk
+    frames: int = 0
+    faces: int = 0
+    sightings: List[Sighting] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class OfflineSummary:
+    frames: int = 0
+    faces: int = 0
+    sightings: int = 0
+    recorded: int = 0
+    failed_chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.seconds if self.seconds else 0.0
+
+
+def list_frame_files(directory) -> List[Path]:
+    return sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def plan_chunks(source, chunk_seconds: float = 60.0, sample_fps: float = 5.0,
+                start_time: Optional[datetime] = None, frame_rate: float = 10.0,
+                location: str = 'Recorded footage', device_id: str = 'OFFLINE') -> List[FootageChunk]:
+    """Split a video file or frame directory into chunks of `chunk_seconds`.
+
+    Frame times are `start_time` plus the frame offset. Without a start time,
+    a video is assumed to end at its modification time and a frame directory
+    to start at its first frame's modification time. Directories are read at
+    `frame_rate` frames per second; `sample_fps` of 0 analyzes every frame.
+    """
+    path = Path(source)
+    if path.is_dir():
+        files = list_frame_files(path)
+        fps, total = float(frame_rate), len(files)
+        if start_time is None and files:
+            start_time = datetime.fromtimestamp(files[0].stat().st_mtime)
+    else:
+        cap = cv2.VideoCapture(str(path))
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video {source}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or float(frame_rate)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        cap.release()
+        if start_time is None:
+            start_time = datetime.fromtimestamp(path.stat().st_mtime) - timedelta(seconds=(total or 0) / fps)
+
+    step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+    if total is None:
+        return [FootageChunk(str(path), 0, None, start_time, fps, step, location, device_id)]
+
+    # Chunk boundaries sit on sampled frames so each chunk starts on one
+    size = max(step, int(chunk_seconds * fps) // step * step)
+    return [
+        FootageChunk(str(path), start, min(start + size, total), start_time, fps, step, location, device_id)
+        for start in range(0, total, size)
+    ]
+
+
+def iter_chunk_frames(chunk: FootageChunk) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame_number, frame) for every sampled frame in a chunk."""
+    path = Path(chunk.source)
+    if path.is_dir():
+        files = list_frame_files(path)[chunk.start_frame:chunk.end_frame]
+        for offset in range(0, len(files), chunk.step):
+            frame = cv2.imread(str(files[offset]))
+            if frame is not None:
+                yield chunk.start_frame + offset, frame
+        return
+
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if chunk.start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.start_frame)
+        number = chunk.start_frame
+        while chunk.end_frame is None or number < chunk.end_frame:
+            # Skipped frames are grabbed but never decoded into an array
+            if not cap.grab():
+                break
+            if (number - chunk.start_frame) % chunk.step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield number, frame
+            number += 1
+    finally:
+        cap.release()
+
+
+_worker_service = None
+_worker_config = None
+
+
+def _init_worker(config: dict):
+    from app.services.face_recognition import FaceRecognitionService
+
+    global _worker_service, _worker_config
+    _worker_config = config
+    _worker_service = FaceRecognitionService(config)
+
+
+def process_chunk(chunk: FootageChunk, face_service=None, config: Optional[dict] = None) -> ChunkResult:
+    """Analyze one chunk; returns the confirmed sightings with their frame times.
+
+    A tracker keyed on frame time keeps a person who stays in view from being
+    encoded on every sampled frame, exactly as in the live pipeline.
+    """
+    face_service = face_service or _worker_service
+    config = config or _worker_config
+    tracker = FaceTracker.from_config(config)
+    quality_gate = FaceQualityGate.from_config(config)
+    result = ChunkResult(chunk)
+
+    try:
+        for number, frame in iter_chunk_frames(chunk):
+            result.frames += 1
+            offset = number / chunk.fps
+            face_locations = face_service.detect_faces(frame)
+            result.faces += len(face_locations)
+            if not face_locations:
+                continue
+
+            if tracker is not None:
+                tracks = tracker.update(face_locations, now=offset)
+                pending = [i for i, track in enumerate(tracks) if tracker.needs_recognition(track, now=offset)]
+            else:
+                tracks = [None] * len(face_locations)
+                pending = list(range(len(face_locations)))
+            if quality_gate is not None and pending:
+                pending, _ = quality_gate.filter(frame, face_locations, pending)
+            if not pending:
+                continue
+
+            encodings = face_service.encode_faces(frame, [face_locations[i] for i in pending])
+            for i, encoding, (student_id, confidence) in zip(pending, encodings, face_service.recognize_faces(encodings)):
+                if encoding is None:
+                    continue
+                if tracks[i] is not None and not tracker.observe(tracks[i], student_id, confidence, now=offset):
+                    continue
+                if student_id:
+                    result.sightings.append(Sighting(
+                        student_id, confidence, chunk.start_time + timedelta(seconds=offset),
+                        chunk.location, chunk.device_id
+                    ))
+    except Exception as e:
+        logger.exception("Error processing %s from frame %d", chunk.source, chunk.start_frame)
+        result.error = str(e)
+    return result
+
+
+def process_footage(config: dict, sources: Sequence, attendance_service=None,
+                    workers: Optional[int] = None, chunk_seconds: float = 60.0,
+                    sample_fps: float = 5.0, start_time: Optional[datetime] = None,
+                    frame_rate: float = 10.0, location: str = 'Recorded footage',
+                    device_id: str = 'OFFLINE') -> OfflineSummary:
+    """Back-fill attendance from recorded footage as fast as the CPUs allow.
+
+    Chunks are analyzed in parallel processes with no real-time pacing. The
+    sightings are then written in timestamp order through
+    `attendance_service`, so duplicate check-ins are judged against the
+    footage's own clock. `start_time` applies to every source; leave it unset
+    to infer each source's start from its files.
+    """
+    if attendance_service is None:
+        from app.services.attendance_service import AttendanceService
+        attendance_service = AttendanceService(config['database']['path'], config)
+
+    chunks = []
+    for source in sources:
+        chunks.extend(plan_chunks(source, chunk_seconds, sample_fps, start_time, frame_rate, location, device_id))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+    logger.info("Processing %d source(s) as %d chunk(s) on %d worker(s)", len(sources), len(chunks), workers)
+
+    summary = OfflineSummary()
+    sightings = []
+    start = time.perf_counter()
+    start_method = (config.get('processing', {}) or {}).get('start_method', 'spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(start_method),
+                             initializer=_init_worker, initargs=(config,)) as executor:
+        futures = [executor.submit(process_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            result = future.result()
+            summary.frames += result.frames
+            summary.faces += result.faces
+            summary.failed_chunks += result.error is not None
+            sightings.extend(result.sightings)
+
+    sightings.sort(key=lambda s: s.timestamp)
+    for sighting in sightings:
+        if attendance_service.record_attendance(
+            student_id=sighting.student_id,
+            confidence=sighting.confidence,
+            location=sighting.location,
+            device_id=sighting.device_id,
+            timestamp=sighting.timestamp
+        ):
+            summary.recorded += 1
+    summary.sightings = len(sightings)
+    summary.seconds = time.perf_counter() - start
+    return summary
@@ -0,0 +1,290 @@
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Five-point landmark template (eyes, nose, mouth corners) of a 112x112 ArcFace crop
+ARCFACE_TEMPLATE = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float32)
+
+
+def create_session(model_path, intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """Create a CPU ONNX Runtime session; thread counts of 0 keep the runtime default."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1
+                              else ort.ExecutionMode.ORT_SEQUENTIAL)
+    if intra_op_threads:
+        options.intra_op_num_threads = int(intra_op_threads)
+    if inter_op_threads:
+        options.inter_op_num_threads = int(inter_op_threads)
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def _has_dynamic_batch(shape) -> bool:
+    return not isinstance(shape[0], int) or shape[0] < 1
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, threshold: float) -> List[int]:
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.maximum(0.0, xx2 - xx1 + 1) * np.maximum(0.0, yy2 - yy1 + 1)
+        iou = inter / (areas[i] + areas[order[1:]] - inter)
+        order = order[1:][iou <= threshold]
+    return keep
+
+
+class ScrfdDetector:
+    """SCRFD face detector (the insightface detection models) on ONNX Runtime.
+
+    Frames are letterboxed into the fixed `input_size`, so cost does not
+    depend on camera resolution. Models exported with a dynamic batch axis
+    run a list of frames in one call; fixed-batch models run them in turn.
+    Returns (x1, y1, x2, y2, score) boxes and five landmarks per face.
+    """
+
+    def __init__(self, session, input_size: Tuple[int, int] = (640, 640),
+                 threshold: float = 0.5, nms_threshold: float = 0.4):
+        self.session = session
+        self.input_size = tuple(input_size)
+        self.threshold = threshold
+        self.nms_threshold = nms_threshold
+
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batched_input = _has_dynamic_batch(model_input.shape)
+        outputs = session.get_outputs()
+        self.output_names = [o.name for o in outputs]
+        self.batched_output = len(outputs[0].shape) == 3
+
+        # Output layout: scores, boxes and (optionally) landmarks for each stride
+        if len(outputs) in (6, 9):
+            self.strides, self.num_anchors = [8, 16, 32], 2
+        elif len(outputs) in (10, 15):
+            self.strides, self.num_anchors = [8, 16, 32, 64, 128], 1
+        else:
+            raise ValueError(f"Unrecognised SCRFD model with {len(outputs)} outputs")
+        self.use_landmarks = len(outputs) in (9, 15)
+        self._centers = {}
+
+    def detect(self, images: List[np.ndarray]) -> List[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """Detect faces in BGR images; returns (boxes, landmarks) per image."""
+        if not images:
+            return []
+        prepared = [self._letterbox(image) for image in images]
+        blobs = [p[0] for p in prepared]
+
+        if self.batched_input and self.batched_output:
+            outputs = self.session.run(self.output_names, {self.input_name: np.concatenate(blobs)})
+            per_image = [[out[b] for out in outputs] for b in range(len(blobs))]
+        else:
+            per_image = []
+            for blob in blobs:
+                outputs = self.session.run(self.output_names, {self.input_name: blob})
+                per_image.append([out[0] if self.batched_output else out for out in outputs])
+
+        return [self._decode(outputs, scale) for outputs, (_, scale) in zip(per_image, prepared)]
+
+    def _letterbox(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        input_w, input_h = self.input_size
+        height, width = image.shape[:2]
+        if height / width > input_h / input_w:
+            new_h, new_w = input_h, max(1, int(input_h * width / height))
+        else:
+            new_w, new_h = input_w, max(1, int(input_w * height / width))
+
+        canvas = np.zeros((input_h, input_w, 3), dtype=np.uint8)
+        canvas[:new_h, :new_w] = cv2.resize(image, (new_w, new_h))
+        blob = cv2.dnn.blobFromImage(canvas, 1.0 / 128, (input_w, input_h),
+                                     (127.5, 127.5, 127.5), swapRB=True)
+        return blob, new_h / height
+
+    def _anchor_centers(self, stride: int) -> np.ndarray:
+        key = (stride, self.input_size)
+        if key not in self._centers:
+            input_w, input_h = self.input_size
+            rows, cols = input_h // stride, input_w // stride
+            centers = np.stack(np.mgrid[:rows, :cols][::-1], axis=-1).astype(np.float32)
+            centers = (centers * stride).reshape(-1, 2)
+            self._centers[key] = np.repeat(centers, self.num_anchors, axis=0)
+        return self._centers[key]
+
+    def _decode(self, outputs: List[np.ndarray], scale: float):
+        count = len(self.strides)
+        boxes, scores, landmarks = [], [], []
+        for i, stride in enumerate(self.strides):
+            stride_scores = outputs[i].reshape(-1)
+            keep = np.flatnonzero(stride_scores >= self.threshold)
+            if not keep.size:
+                continue
+            centers = self._anchor_centers(stride)[keep]
+            distances = outputs[i + count].reshape(-1, 4)[keep] * stride
+            boxes.append(np.hstack([centers - distances[:, :2], centers + distances[:, 2:]]))
+            scores.append(stride_scores[keep])
+            if self.use_landmarks:
+                offsets = outputs[i + 2 * count].reshape(-1, 10)[keep] * stride
+                landmarks.append(offsets.reshape(-1, 5, 2) + centers[:, None, :])
+
+        if not boxes:
+            return np.empty((0, 5), dtype=np.float32), None
+        boxes = np.vstack(boxes) / scale
+        scores = np.concatenate(scores)
+        keep = _nms(boxes, scores, self.nms_threshold)
+        detections = np.hstack([boxes[keep], scores[keep, None]]).astype(np.float32)
+        points = (np.vstack(landmarks) / scale)[keep] if self.use_landmarks else None
+        return detections, points
+
+
+class ArcFaceEncoder:
+    """ArcFace embedding model on ONNX Runtime.
+
+    Faces are aligned to the 112x112 ArcFace template from their five
+    landmarks and embedded in a single batch; embeddings are L2-normalised.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batched_input = _has_dynamic_batch(model_input.shape)
+        self.input_size = (int(model_input.shape[3]), int(model_input.shape[2]))
+        self.embedding_dim = session.get_outputs()[0].shape[-1]
+
+    def encode(self, image: np.ndarray, landmarks: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """Embed faces in one batch; None where the landmarks can't be aligned."""
+        crops = [self.align(image, points) for points in landmarks]
+        valid = [i for i, crop in enumerate(crops) if crop is not None]
+        results = [None] * len(crops)
+        if not valid:
+            return results
+
+        blob = cv2.dnn.blobFromImages([crops[i] for i in valid], 1.0 / 127.5, self.input_size,
+                                      (127.5, 127.5, 127.5), swapRB=True)
+        if self.batched_input:
+            embeddings = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            embeddings = np.vstack([self.session.run(None, {self.input_name: blob[i:i + 1]})[0]
+                                    for i in range(len(blob))])
+        embeddings = embeddings.astype(np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        for i, embedding in zip(valid, embeddings):
+            results[i] = embedding
+        return results
+
+    def align(self, image: np.ndarray, points: np.ndarray) -> Optional[np.ndarray]:
+        template = ARCFACE_TEMPLATE * (self.input_size[0] / 112.0)
+        matrix, _ = cv2.estimateAffinePartial2D(np.asarray(points, dtype=np.float32), template,
+                                                method=cv2.LMEDS)
+        if matrix is None:
+            return None
+        return cv2.warpAffine(image, matrix, self.input_size, borderValue=0.0)
+
+
+class OnnxFaceBackend:
+    """CPU face detection and embedding for the "insightface" model backend.
+
+    Both sessions are created (and optionally warmed up) when the backend
+    loads, so the first frame doesn't pay the model load. Detections are
+    returned as (top, right, bottom, left) boxes like face_recognition; their
+    landmarks are remembered per frame so `encode` on the same image can
+    align them without the caller passing landmarks around. Boxes from
+    elsewhere fall back to landmarks estimated from the box.
+    """
+
+    MAX_REMEMBERED_FRAMES = 32
+
+    def __init__(self, detector: ScrfdDetector, encoder: ArcFaceEncoder):
+        self.detector = detector
+        self.encoder = encoder
+        self.embedding_dim = encoder.embedding_dim
+        self._landmarks = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'OnnxFaceBackend':
+        onnx_config = config['face_recognition'].get('insightface', {}) or {}
+        threads = (onnx_config.get('intra_op_threads', 0), onnx_config.get('inter_op_threads', 0))
+        for key in ('detector_model', 'recognizer_model'):
+            if not Path(onnx_config.get(key, '')).is_file():
+                raise FileNotFoundError(f"face_recognition.insightface.{key} not found: {onnx_config.get(key)}")
+
+        det_size = onnx_config.get('det_size', 640)
+        backend = cls(
+            ScrfdDetector(
+                create_session(onnx_config['detector_model'], *threads),
+                input_size=(det_size, det_size),
+                threshold=onnx_config.get('det_threshold', 0.5),
+                nms_threshold=onnx_config.get('nms_threshold', 0.4)
+            ),
+            ArcFaceEncoder(create_session(onnx_config['recognizer_model'], *threads))
+        )
+        if onnx_config.get('warmup', True):
+            backend.warmup()
+        return backend
+
+    def warmup(self):
+        blank = np.zeros((self.detector.input_size[1], self.detector.input_size[0], 3), dtype=np.uint8)
+        self.detector.detect([blank])
+        self.encoder.encode(blank, [ARCFACE_TEMPLATE])
+
+    def detect(self, images: List[np.ndarray]) -> List[List[Tuple[int, int, int, int]]]:
+        """Detect faces in each BGR image; returns (top, right, bottom, left) boxes."""
+        results = []
+        for image, (detections, landmarks) in zip(images, self.detector.detect(images)):
+            height, width = image.shape[:2]
+            boxes = []
+            for x1, y1, x2, y2, _ in detections:
+                boxes.append((max(0, int(y1)), min(width, int(x2)), min(height, int(y2)), max(0, int(x1))))
+            if landmarks is not None:
+                self._remember(image, dict(zip(boxes, landmarks)))
+            results.append(boxes)
+        return results
+
+    def encode(self, image: np.ndarray, face_locations: List[Tuple]) -> List[Optional[np.ndarray]]:
+        """Embed every face in one batch; rows are L2-normalised."""
+        with self._lock:
+            entry = self._landmarks.get(id(image))
+        remembered = entry[1] if entry is not None and entry[0]() is image else {}
+        landmarks = [remembered.get(tuple(box)) for box in face_locations]
+        landmarks = [points if points is not None else self._landmarks_from_box(box)
+                     for points, box in zip(landmarks, face_locations)]
+        return self.encoder.encode(image, landmarks)
+
+    def _remember(self, image: np.ndarray, landmarks: dict):
+        # Keyed by frame identity; the weak reference tells a reused id() apart
+        # from the frame that was detected
+        key = id(image)
+        with self._lock:
+            self._landmarks[key] = (weakref.ref(image), landmarks)
+            self._landmarks.move_to_end(key)
+            while len(self._landmarks) > self.MAX_REMEMBERED_FRAMES:
+                self._landmarks.popitem(last=False)
+
+    @staticmethod
+    def _landmarks_from_box(box: Tuple) -> np.ndarray:
+        top, right, bottom, left = box
+        scale = np.array([(right - left) / 112.0, (bottom - top) / 112.0], dtype=np.float32)
+        return ARCFACE_TEMPLATE * scale + np.array([left, top], dtype=np.float32)
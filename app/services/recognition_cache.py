@@ -0,0 +1,105 @@
+import time
+import logging
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionCache:
+    """Short-lived cache of recently matched embeddings and their identities.
+
+    A lingering person produces nearly identical embeddings frame after
+    frame. An embedding within `distance` of a cached one reuses that entry's
+    result (a student id, or None for an unknown face) instead of scanning
+    the gallery. Entries expire after `ttl` seconds; when full, the least
+    recently used entry is replaced. Cached embeddings live in a fixed
+    (max_size, dim) matrix so a lookup is a single matrix product.
+
+    The cache must be cleared whenever the gallery changes, since an
+    enrollment can turn a cached unknown into a known student. Each clear
+    bumps `generation`; a result computed against an older generation is
+    not stored, so a search racing a gallery swap cannot repopulate it.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 10.0, distance: float = 0.15):
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self.distance = distance
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._sq_norms = np.zeros(self.max_size, dtype=np.float32)
+        self._expires = np.zeros(self.max_size, dtype=np.float64)
+        self._last_used = np.zeros(self.max_size, dtype=np.float64)
+        self._results: List[Optional[Tuple[Optional[str], float]]] = [None] * self.max_size
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['RecognitionCache']:
+        cache = config.get('face_recognition', {}).get('cache', {}) or {}
+        if not cache.get('enabled', True):
+            return None
+        return cls(
+            max_size=cache.get('max_size', 256),
+            ttl=cache.get('ttl', 10.0),
+            distance=cache.get('distance', 0.15)
+        )
+
+    def lookup(self, encodings: np.ndarray, now: Optional[float] = None) -> List[Optional[Tuple[Optional[str], float]]]:
+        """Return the cached (student_id, confidence) per row, or None on a miss."""
+        now = time.monotonic() if now is None else now
+        q = np.atleast_2d(np.asarray(encodings, dtype=np.float32))
+        results = [None] * len(q)
+
+        with self._lock:
+            live = self._expires > now
+            if self._matrix is None or self._matrix.shape[1] != q.shape[1] or not live.any():
+                self.misses += len(q)
+                return results
+
+            d2 = q @ self._matrix.T
+            d2 *= -2.0
+            d2 += self._sq_norms[None, :]
+            d2 += np.einsum('ij,ij->i', q, q)[:, None]
+            d2[:, ~live] = np.inf
+
+            best = np.argmin(d2, axis=1)
+            limit = self.distance * self.distance
+            for i, slot in enumerate(best):
+                if d2[i, slot] <= limit:
+                    results[i] = self._results[slot]
+                    self._last_used[slot] = now
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return results
+
+    def store(self, encoding: np.ndarray, result: Tuple[Optional[str], float], now: Optional[float] = None,
+              generation: Optional[int] = None):
+        """Cache a result; ignored if `generation` was read before the latest clear."""
+        now = time.monotonic() if now is None else now
+        row = np.asarray(encoding, dtype=np.float32).reshape(-1)
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self._matrix is None or self._matrix.shape[1] != row.size:
+                self._matrix = np.zeros((self.max_size, row.size), dtype=np.float32)
+                self._expires[:] = 0
+
+            expired = np.flatnonzero(self._expires <= now)
+            slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+            self._matrix[slot] = row
+            self._sq_norms[slot] = float(row @ row)
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._results[slot] = result
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._expires[:] = 0
+            self._results = [None] * self.max_size
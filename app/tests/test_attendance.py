@@ -1,6 +1,10 @@
 import sqlite3
+from datetime import datetime, timedelta, timezone
 from app.services.attendance_service import AttendanceService
 from app.core.database import DatabaseManager
+from app.core.db_writer import BatchedWriter
+from app.services.alert_service import AlertService
+from app.services.checkin_window import CheckinWindow
 
 
 def test_record_and_query(tmp_path):
@@ -22,3 +26,103 @@ def test_record_and_query(tmp_path):
 
 	ok = svc.record_attendance('S1', 0.9, location='test')
 	assert ok is True
+
+
+def test_backdated_records_use_footage_time_for_duplicates(tmp_path):
+	db_path = tmp_path / 'test.db'
+	with sqlite3.connect(db_path) as conn:
+		conn.execute("CREATE TABLE attendance_records (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, confidence REAL, location TEXT, device_id TEXT, image_path TEXT)")
+	svc = AttendanceService(str(db_path), {'attendance': {'duplicate_threshold': 300}})
+
+	start = datetime(2024, 3, 4, 9, 0, tzinfo=timezone.utc)
+	assert svc.record_attendance('S1', 0.9, timestamp=start) is True
+	assert svc.record_attendance('S1', 0.9, timestamp=start + timedelta(minutes=2)) is False
+	assert svc.record_attendance('S1', 0.9, timestamp=start + timedelta(minutes=10)) is True
+	assert svc.record_attendance('S1', 0.9) is True
+
+	with sqlite3.connect(db_path) as conn:
+		rows = conn.execute("SELECT timestamp FROM attendance_records ORDER BY id").fetchall()
+	assert rows[:2] == [('2024-03-04 09:00:00',), ('2024-03-04 09:10:00',)]
+
+
+def test_write_behind_batches_and_dedups_pending(tmp_path):
+	db_path = tmp_path / 'test.db'
+	with sqlite3.connect(db_path) as conn:
+		conn.execute("CREATE TABLE attendance_records (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, confidence REAL, location TEXT, device_id TEXT, image_path TEXT)")
+		conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, message TEXT, severity TEXT)")
+	writer = BatchedWriter(str(db_path), flush_interval=60.0, batch_size=3)
+	writer.start()
+	svc = AttendanceService(str(db_path), {'attendance': {'duplicate_threshold': 300}}, writer=writer)
+	alerts = AlertService(str(db_path), {}, writer=writer)
+
+	assert svc.record_attendance('S1', 0.9) is True
+	# Still queued, but already counts as a check-in
+	assert svc.record_attendance('S1', 0.9) is False
+	assert svc.record_attendance('S2', 0.9) is True
+	alerts.create_alert('test', 'queued alert')
+	assert writer.flush(timeout=5.0)
+
+	with sqlite3.connect(db_path) as conn:
+		assert conn.execute("SELECT student_id FROM attendance_records ORDER BY id").fetchall() == [('S1',), ('S2',)]
+		assert conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0] == 1
+
+	svc.record_attendance('S3', 0.9)
+	writer.stop()
+	with sqlite3.connect(db_path) as conn:
+		assert conn.execute("SELECT COUNT(*) FROM attendance_records").fetchone()[0] == 3
+	assert writer.written == 4 and writer.failed == 0
+
+
+def test_checkin_window_warms_from_db_and_evicts(tmp_path):
+	db_path = tmp_path / 'test.db'
+	with sqlite3.connect(db_path) as conn:
+		conn.execute("CREATE TABLE attendance_records (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, confidence REAL, location TEXT, device_id TEXT, image_path TEXT)")
+		conn.execute("INSERT INTO attendance_records (student_id) VALUES ('S1')")
+		conn.execute("INSERT INTO attendance_records (student_id, timestamp) VALUES ('S2', '2000-01-01 00:00:00')")
+	svc = AttendanceService(str(db_path), {'attendance': {'duplicate_threshold': 300}})
+	assert len(svc.checkins) == 1
+
+	assert svc.record_attendance('S1', 0.9) is False
+	assert svc.record_attendance('S2', 0.9) is True
+	assert svc.record_attendance('S2', 0.9) is False
+
+	window = CheckinWindow(threshold=60, evict_interval=0)
+	now = datetime.now(timezone.utc)
+	assert window.claim('S1', now - timedelta(seconds=120)) is True
+	assert window.claim('S2', now) is True
+	assert window.claim('S3', now) is True
+	assert len(window) == 2  # S1 expired and was swept
+	window.release('S3', now)
+	assert window.claim('S3', now) is True
+
+
+def test_write_behind_releases_failed_claims_and_needs_window(tmp_path):
+	db_path = tmp_path / 'test.db'
+	with sqlite3.connect(db_path) as conn:
+		conn.execute("CREATE TABLE attendance_records (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, confidence REAL, location TEXT, device_id TEXT, image_path TEXT)")
+		conn.execute("CREATE TRIGGER reject BEFORE INSERT ON attendance_records WHEN NEW.student_id = 'BAD' BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+	writer = BatchedWriter(str(db_path), flush_interval=60.0)
+	writer.start()
+	svc = AttendanceService(str(db_path), {'attendance': {'duplicate_threshold': 300}}, writer=writer)
+
+	assert svc.record_attendance('BAD', 0.9) is True
+	assert writer.flush(timeout=5.0) and writer.failed == 1
+	# The rejected row released its claim, so a retry is not treated as a duplicate
+	assert svc.record_attendance('BAD', 0.9) is True
+
+	# Without the window, check-ins are inserted directly so the database check sees them
+	no_window = AttendanceService(str(db_path), {'attendance': {'duplicate_threshold': 300, 'checkin_window': False}},
+		writer=writer)
+	assert no_window.record_attendance('S1', 0.9) is True
+	assert no_window.record_attendance('S1', 0.9) is False
+	writer.stop()
+	with sqlite3.connect(db_path) as conn:
+		assert conn.execute("SELECT COUNT(*) FROM attendance_records WHERE student_id = 'S1'").fetchone()[0] == 1
+
+
+def test_backdated_claim_keeps_newer_checkin():
+	window = CheckinWindow(threshold=60, evict_interval=3600)
+	now = datetime.now(timezone.utc)
+	assert window.claim('S1', now) is True
+	assert window.claim('S1', now - timedelta(seconds=120)) is True
+	assert window.claim('S1', now + timedelta(seconds=10)) is False
@@ -0,0 +1,23 @@
+import importlib.util
+import sqlite3
+from pathlib import Path
+
+from app.core.database import DatabaseManager
+
+spec = importlib.util.spec_from_file_location('backup', Path(__file__).resolve().parents[2] / 'scripts' / 'backup.py')
+backup = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(backup)
+
+
+def test_backup_includes_uncheckpointed_wal_rows(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'live.db'), schema_path=str(tmp_path / 'missing.sql'))
+	conn = db.connection()
+	conn.execute('PRAGMA wal_autocheckpoint = 0')
+	with conn:
+		conn.executemany('INSERT INTO alerts (type, message) VALUES (?, ?)', [('test', str(i)) for i in range(20)])
+	assert (tmp_path / 'live.db-wal').stat().st_size > 0
+
+	dst = backup.backup_db(str(db.db_path), str(tmp_path / 'backups'))
+	with sqlite3.connect(dst) as copy:
+		assert copy.execute('SELECT COUNT(*) FROM alerts').fetchone()[0] == 20
+	db.close_all()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from app.services.camera_scheduler import FairFrameScheduler, load_camera_configs
+
+
+def test_load_camera_configs_falls_back_to_single_camera():
+	cameras = load_camera_configs({'camera': {'source': 0, 'width': 320, 'height': 240, 'fps': 5}})
+	assert len(cameras) == 1 and cameras[0].width == 320
+
+	cameras = load_camera_configs({
+		'camera': {'width': 320, 'height': 240, 'fps': 5},
+		'cameras': [{'id': 'a', 'source': 0}, {'id': 'b', 'source': 1, 'fps': 15}]
+	})
+	assert [c.camera_id for c in cameras] == ['a', 'b']
+	assert cameras[1].fps == 15 and cameras[1].height == 240
+
+
+def test_camera_entries_inherit_only_capture_settings():
+	cameras = load_camera_configs({
+		'camera': {'source': 'rtsp://cam', 'device_id': 'CAM_009', 'width': 320, 'rotation': 90},
+		'cameras': [{'source': 0}, {'source': 1}]
+	})
+	assert [c.camera_id for c in cameras] == ['CAM_001', 'CAM_002']
+	assert [c.source for c in cameras] == [0, 1]
+	assert cameras[1].width == 320 and cameras[1].rotation == 90
+
+
+def test_duplicate_camera_ids_are_rejected():
+	with pytest.raises(ValueError, match='door-1'):
+		load_camera_configs({'cameras': [{'id': 'door-1', 'source': 0}, {'id': 'door-1', 'source': 1}]})
+	with pytest.raises(ValueError, match='CAM_007'):
+		load_camera_configs({'cameras': [{'device_id': 'CAM_007', 'source': 0}, {'device_id': 'CAM_007', 'source': 1}]})
+
+
+def test_scheduler_round_robin_and_drops_oldest():
+	scheduler = FairFrameScheduler(['a', 'b'], max_pending=2)
+	for i in range(3):
+		scheduler.put('a', np.full(1, i), timestamp=i)
+	scheduler.put('b', np.full(1, 10), timestamp=10)
+	assert scheduler.dropped_frames['a'] == 1
+
+	first = scheduler.get(timeout=0)
+	second = scheduler.get(timeout=0)
+	assert {first[0], second[0]} == {'a', 'b'}
+	# Both cameras are in flight until task_done
+	assert scheduler.get(timeout=0) is None
+	scheduler.task_done('a')
+	camera_id, frame, _ = scheduler.get(timeout=0)
+	assert camera_id == 'a' and frame[0] == 2
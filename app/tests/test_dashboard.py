@@ -0,0 +1,54 @@
+import io
+
+import cv2
+import numpy as np
+from app.web import dashboard
+from app.web.dashboard import create_app
+
+
+class StubFaceService:
+	def __init__(self, config=None):
+		self.enrolled = []
+
+	def detect_faces(self, img):
+		return [(20, 180, 180, 20)]
+
+	def encode_face(self, img, location):
+		return np.ones(128)
+
+	def add_known_face(self, encoding, metadata):
+		self.enrolled.append(metadata['student_id'])
+
+
+def register(client, student_id):
+	# Grey noise: sharp, mid-brightness and contrasty enough to pass enrollment checks
+	noise = np.repeat(np.random.default_rng(0).integers(40, 210, (200, 200, 1), dtype=np.uint8), 3, axis=2)
+	photo = io.BytesIO(cv2.imencode('.png', noise)[1].tobytes())
+	return client.post('/register', data={
+		'name': f'Student {student_id}', 'student_id': student_id, 'email': f'{student_id}@example.com',
+		'photo': (photo, 'face.png')
+	}, content_type='multipart/form-data')
+
+
+def test_registrations_use_the_injected_face_service(tmp_path, monkeypatch):
+	def forbidden(config):
+		raise AssertionError("FaceRecognitionService must not be constructed")
+	monkeypatch.setattr(dashboard, 'FaceRecognitionService', forbidden)
+
+	stub = StubFaceService()
+	client = create_app({'DATABASE_PATH': str(tmp_path / 'test.db')}, face_service=stub).test_client()
+	for student_id in ('S1', 'S2'):
+		assert register(client, student_id).headers['Location'].endswith('/')
+	assert stub.enrolled == ['S1', 'S2']
+
+
+def test_face_service_is_created_once_and_shared(tmp_path, monkeypatch):
+	created = []
+	monkeypatch.setattr(dashboard, 'FaceRecognitionService', lambda config: created.append(StubFaceService()) or created[-1])
+
+	app = create_app({'DATABASE_PATH': str(tmp_path / 'test.db')})
+	client = app.test_client()
+	register(client, 'S1')
+	register(client, 'S2')
+	assert len(created) == 1 and created[0].enrolled == ['S1', 'S2']
+	assert app.extensions['face_service'] is created[0]
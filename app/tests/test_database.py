@@ -0,0 +1,208 @@
+import threading
+
+from app.core import queries
+from app.core.database import DatabaseManager
+from app.core.migrations import LATEST_VERSION, MIGRATIONS
+from app.web.dashboard import create_app
+
+
+def test_pooled_connections(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'), pool_size=2)
+	conn = db.connection()
+	assert db.connection() is conn
+	assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+	assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+	assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+
+	def request():
+		seen.append(db.connection())
+		db.release_connection()
+
+	# Short-lived threads that release reuse one connection
+	seen = []
+	for _ in range(5):
+		worker = threading.Thread(target=request)
+		worker.start()
+		worker.join()
+	assert seen[0] is not conn and all(c is seen[0] for c in seen)
+	assert db._opened == 2
+
+	# A thread that exits without releasing has its connection reclaimed once the pool is dry
+	leaked = []
+	worker = threading.Thread(target=lambda: leaked.append(db.connection()))
+	worker.start()
+	worker.join()
+	other = []
+	worker = threading.Thread(target=lambda: other.append(db.connection()))
+	worker.start()
+	worker.join()
+	assert other[0] is leaked[0] and db._opened == 2
+
+	db.close_all()
+	assert db.connection() is not conn
+
+
+def test_web_requests_share_pooled_connections(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	client = create_app({'DATABASE_PATH': str(db.db_path)}, db_manager=db).test_client()
+	opened = []
+	original = db._open
+	db._open = lambda: opened.append(1) or original()
+
+	def get(path):
+		statuses.append(client.get(path).status_code)
+
+	statuses = []
+	for i in range(10):
+		# Flask's threaded server runs each request on a new thread
+		worker = threading.Thread(target=get, args=(f'/api/alerts?limit={i + 1}',))
+		worker.start()
+		worker.join()
+	assert statuses == [200] * 10
+	assert len(opened) == 1 and not db._in_use
+
+
+def test_api_and_dashboard_build_one_manager_from_config(tmp_path):
+	config = {'database': {'path': str(tmp_path / 'test.db'), 'schema_path': str(tmp_path / 'missing.sql'),
+		'pool_size': 3, 'result_cache': {'ttl': 0}}}
+	app = create_app(config)
+	statuses = []
+	workers = [threading.Thread(target=lambda: statuses.append(app.test_client().get('/api/cache').status_code))
+		for _ in range(8)]
+	for worker in workers:
+		worker.start()
+	for worker in workers:
+		worker.join()
+	assert statuses == [200] * 8
+
+	db = app.extensions['db']
+	assert db.pool_size == 3 and db.results.ttl == 0
+	with app.app_context():
+		assert app.extensions['get_db_manager']() is db
+	assert app.test_client().get('/').status_code == 200 and app.extensions['db'] is db
+	db.close_all()
+
+
+def test_migrations_bring_new_database_to_latest_version(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	conn = db.connection()
+	assert conn.execute('PRAGMA user_version').fetchone()[0] == LATEST_VERSION
+	tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+	assert {'students', 'attendance_records', 'unknown_faces', 'alerts'} <= tables
+	# Re-running is a no-op
+	assert db.migrate() == LATEST_VERSION
+
+
+def test_failed_migration_stops_at_last_good_version(tmp_path, monkeypatch):
+	broken = MIGRATIONS + [(LATEST_VERSION + 1, 'broken', ['CREATE INDEX idx_bad ON no_such_table(x)']),
+		(LATEST_VERSION + 2, 'after broken', ['CREATE TABLE later (id INTEGER)'])]
+	monkeypatch.setattr('app.core.database.MIGRATIONS', broken)
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	assert db.migrate() == LATEST_VERSION
+	conn = db.connection()
+	assert conn.execute("SELECT name FROM sqlite_master WHERE name='later'").fetchone() is None
+
+
+DAY = ('2024-01-01',)
+RANGE = ('2024-01-01', '2024-01-08')
+CURSOR = ('2024-01-01 09:00:00', 5)
+
+# Built from the same constants and builders the routes and services execute
+HOT_QUERIES = [
+	(queries.DAY_STATUS_COUNTS, DAY),
+	(queries.DAY_UNKNOWN_FACE_ALERTS, DAY * 2),
+	(queries.DAY_RECENT_ATTENDANCE, DAY * 2),
+	(queries.DAY_RECORD_TOTAL, DAY),
+	(queries.RANGE_RECORD_TOTAL, RANGE),
+	(queries.RANGE_UNIQUE_STUDENTS, RANGE),
+	(queries.RANGE_DAILY_COUNTS, RANGE),
+	(queries.RANGE_TOP_STUDENTS, RANGE),
+	(queries.STUDENT_CHECKINS_BETWEEN, ('S1', '2024-01-01 09:00:00', '2024-01-01 09:10:00')),
+	(queries.ATTENDANCE_REPORT, RANGE),
+]
+
+# Newest-first pages and exports; they must come straight off a timestamp index, never sorted
+KEYSET_QUERIES = [
+	queries.attendance_query(date=DAY[0], limit=51),
+	queries.attendance_query(date=DAY[0], student='S1', after=CURSOR, limit=51),
+	queries.attendance_query('ar.*, s.name', after=CURSOR, limit=51),
+	queries.alerts_query(after=CURSOR, limit=51),
+]
+# Unfiltered first pages and full exports walk the whole index, stopping at LIMIT
+UNBOUNDED_QUERIES = [
+	queries.attendance_query(),
+	queries.attendance_query(student='S1'),
+	queries.alerts_query(limit=51),
+]
+LARGE_TABLES = {'attendance_records', 'ar', 'alerts', 'attendance_daily', 'ad', 'attendance_day_summary'}
+
+
+def query_plan(conn, sql, params):
+	return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def test_hot_queries_use_indexes(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	conn = db.connection()
+	for sql, params in HOT_QUERIES + KEYSET_QUERIES:
+		plan = query_plan(conn, sql, params)
+		# Bounded queries seek into their range instead of scanning a large table
+		assert not any(step.split()[:2] in (['SCAN', t] for t in LARGE_TABLES) for step in plan), plan
+		assert all('USING' in step for step in plan if step.startswith(('SCAN', 'SEARCH'))), plan
+	for sql, params in KEYSET_QUERIES + UNBOUNDED_QUERIES:
+		plan = query_plan(conn, sql, params)
+		assert not any('TEMP B-TREE' in step for step in plan), plan
+		assert any('idx_attendance_timestamp' in step or 'idx_alerts_timestamp' in step for step in plan), plan
+
+
+def test_rollups_follow_inserts_and_deletes(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	conn = db.connection()
+	with conn:
+		conn.executemany(
+			'INSERT INTO attendance_records (student_id, timestamp, confidence, location, status) VALUES (?, ?, ?, ?, ?)',
+			[('S1', '2024-03-04 09:00:00', 0.9, 'A', 'present'),
+			 ('S1', '2024-03-04 13:00:00', None, 'B', 'late'),
+			 ('S2', '2024-03-04 09:05:00', 0.7, None, 'present'),
+			 ('S1', '2024-03-05 09:00:00', 0.8, 'A', 'present')])
+		conn.execute("DELETE FROM attendance_records WHERE student_id = 'S2'")
+
+	def snapshot():
+		return (conn.execute('SELECT day, records, students, ROUND(confidence_sum, 6), confidence_count '
+			'FROM attendance_day_summary ORDER BY day').fetchall(),
+			conn.execute('SELECT * FROM attendance_daily ORDER BY day, student_id, status').fetchall())
+
+	summary, daily = snapshot()
+	assert [tuple(r) for r in summary] == [('2024-03-04', 2, 1, 0.9, 1), ('2024-03-05', 1, 1, 0.8, 1)]
+	assert len(daily) == 3
+	db.rebuild_rollups()
+	assert [tuple(r) for r in snapshot()[0]] == [tuple(r) for r in summary]
+	assert [tuple(r) for r in snapshot()[1]] == [tuple(r) for r in daily]
+
+
+def test_result_cache_serves_until_invalidated(tmp_path):
+	from app.core.db_writer import BatchedWriter
+	from app.services.alert_service import AlertService
+
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	calls = []
+
+	def count_alerts():
+		calls.append(1)
+		return db.connection().execute('SELECT COUNT(*) FROM alerts').fetchone()[0]
+
+	assert db.results.get('alerts', count_alerts) == 0
+	assert db.results.get('alerts', count_alerts) == 0
+	assert len(calls) == 1
+
+	AlertService(str(db.db_path), {}, db_manager=db).create_alert('test', 'direct')
+	assert db.results.get('alerts', count_alerts) == 1
+
+	writer = BatchedWriter(str(db.db_path), flush_interval=60.0, db_manager=db)
+	writer.start()
+	AlertService(str(db.db_path), {}, writer=writer, db_manager=db).create_alert('test', 'queued')
+	writer.flush(5.0)
+	writer.stop()
+	assert db.results.get('alerts', count_alerts) == 2
+	assert len(calls) == 3
+	assert db.results.stats() == {'hits': 1, 'misses': 3, 'entries': 1}
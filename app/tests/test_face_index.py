@@ -0,0 +1,67 @@
+import numpy as np
+from app.services.face_index import FaceIndex, IVFFaceIndex, build_face_index, extend_face_index
+
+
+def test_search_matches_brute_force():
+	rng = np.random.default_rng(0)
+	gallery = rng.normal(size=(500, 128)).astype(np.float32)
+	ids = [f'S{i}' for i in range(len(gallery))]
+	queries = gallery[[3, 42, 499]] + rng.normal(scale=0.01, size=(3, 128)).astype(np.float32)
+
+	index = FaceIndex(list(gallery), ids)
+	best, dist = index.search(queries)
+
+	expected = np.linalg.norm(gallery[None, :, :] - queries[:, None, :], axis=2)
+	assert list(best) == list(expected.argmin(axis=1)) == [3, 42, 499]
+	assert np.allclose(dist, expected.min(axis=1), atol=1e-3)
+	assert index.matrix.flags['C_CONTIGUOUS'] and index.matrix.dtype == np.float32
+
+
+def test_search_empty_index():
+	index = FaceIndex([], [])
+	best, dist = index.search(np.zeros(128))
+	assert len(index) == 0
+	assert best[0] == -1 and np.isinf(dist[0])
+
+
+def test_ivf_full_probe_equals_exact():
+	rng = np.random.default_rng(1)
+	gallery = rng.normal(size=(2000, 64)).astype(np.float32)
+	ids = [f'S{i}' for i in range(len(gallery))]
+	queries = gallery[:20] + rng.normal(scale=0.05, size=(20, 64)).astype(np.float32)
+
+	exact = FaceIndex(gallery, ids)
+	ann = IVFFaceIndex(gallery, ids, nlist=16, nprobe=16)
+	exact_best, exact_dist = exact.search(queries)
+	ann_best, ann_dist = ann.search(queries)
+
+	assert list(ann.student_ids[ann_best]) == list(exact.student_ids[exact_best])
+	assert np.allclose(ann_dist, exact_dist, atol=1e-3)
+
+
+def test_build_face_index_selects_ann_above_min_size():
+	gallery = np.random.default_rng(2).normal(size=(50, 8)).astype(np.float32)
+	ids = [str(i) for i in range(50)]
+	config = {'face_recognition': {'index': 'ann', 'ann': {'min_gallery_size': 10, 'nlist': 4}}}
+	assert isinstance(build_face_index(gallery, ids, config), IVFFaceIndex)
+	config['face_recognition']['ann']['min_gallery_size'] = 100
+	assert type(build_face_index(gallery, ids, config)) is FaceIndex
+
+
+def test_extend_face_index_matches_a_rebuild():
+	rng = np.random.default_rng(3)
+	gallery = rng.normal(size=(200, 16)).astype(np.float32)
+	ids = [str(i) for i in range(200)]
+	config = {'face_recognition': {'index': 'ann', 'ann': {'min_gallery_size': 100, 'nlist': 8, 'nprobe': 8}}}
+
+	index = build_face_index(gallery[:180], ids[:180], config)
+	for row, student_id in zip(gallery[180:199], ids[180:199]):
+		index = extend_face_index(index, row, student_id, config)
+	assert isinstance(index, IVFFaceIndex) and len(index.tail_cells) == 19
+
+	best, dist = index.search(gallery[170:199])
+	assert list(index.student_ids[best]) == ids[170:199]
+	assert np.allclose(dist, 0.0, atol=1e-2)
+	# Past 10% of rows outside the cells the caller rebuilds
+	assert extend_face_index(index, gallery[199], ids[199], config) is None
+	assert extend_face_index(FaceIndex([], []), gallery[0], '0', config) is None
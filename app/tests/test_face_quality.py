@@ -0,0 +1,47 @@
+import numpy as np
+from app.utils.face_quality import FaceQualityGate, validate_face_quality
+
+
+def test_gate_rejects_by_reason():
+	rng = np.random.default_rng(0)
+	frame = np.zeros((200, 400, 3), dtype=np.uint8)
+	frame[0:100, 0:100] = rng.integers(60, 200, (100, 100, 3))  # sharp, well lit
+	frame[0:100, 100:200] = 128  # flat: no edges
+	frame[0:100, 200:300] = rng.integers(0, 20, (100, 100, 3))  # dark but textured
+	locations = [(0, 100, 100, 0), (0, 200, 100, 100), (0, 300, 100, 200), (150, 320, 170, 300)]
+
+	passed, rejected = FaceQualityGate().filter(frame, locations)
+	assert passed == [0]
+	assert rejected == {'blurry': 1, 'too_dark': 1, 'too_small': 1}
+
+	passed, rejected = FaceQualityGate().filter(frame, locations, indices=[1])
+	assert passed == [] and rejected == {'blurry': 1}
+	assert FaceQualityGate.from_config({'quality': {'enabled': False}}) is None
+
+
+def test_validate_face_quality_accepts_precomputed_gray():
+	frame = np.full((100, 100, 3), 128, dtype=np.uint8)
+	gray = frame[:, :, 0]
+	ok, message = validate_face_quality(frame, (0, 100, 100, 0), gray=gray)
+	assert ok is False and message.startswith('Image is too blurry')
+
+
+def test_analyze_frame_counts_detections_before_the_gate():
+	from app.services.frame_pool import analyze_frame
+
+	class FakeService:
+		def detect_faces(self, frame):
+			return [(10, 110, 110, 10), (0, 5, 5, 0)]
+
+		def encode_faces(self, frame, locations):
+			return [np.zeros(128) for _ in locations]
+
+		def recognize_faces(self, encodings):
+			return [('S1', 0.9) for _ in encodings]
+
+	rng = np.random.default_rng(0)
+	frame = rng.integers(0, 255, (200, 200, 3), dtype=np.uint8)
+	rejected = {}
+	faces, detected = analyze_frame(FakeService(), frame, quality_gate=FaceQualityGate(), rejected=rejected)
+	assert detected == 2 and len(faces) == 1
+	assert sum(rejected.values()) == 1
@@ -18,3 +18,59 @@ def test_load_known_faces_empty(tmp_path, monkeypatch):
 
 	svc = FaceRecognitionService(config)
 	assert isinstance(svc.known_face_encodings, list)
+
+
+def test_recognize_faces_batch(tmp_path, monkeypatch):
+	config = {'face_recognition': {'model_backend': 'face_recognition', 'detection_model': 'hog', 'num_jitters': 1, 'tolerance': 0.6, 'known_faces_path': str(tmp_path)}}
+	import types
+	fr = types.SimpleNamespace(face_locations=lambda img, model=None: [], face_encodings=lambda img, locs, num_jitters=1: [])
+	monkeypatch.setitem(__import__('sys').modules, 'face_recognition', fr)
+
+	svc = FaceRecognitionService(config)
+	a = np.zeros(128)
+	b = np.full(128, 0.1)
+	svc.add_known_face(a, {'student_id': 'A'})
+	svc.add_known_face(b, {'student_id': 'B'})
+
+	results = svc.recognize_faces([b + 0.001, None, np.ones(128), a])
+	assert [r[0] for r in results] == ['B', None, None, 'A']
+	assert results[3][1] > 0.99
+
+
+def test_add_known_face_extends_the_live_index(tmp_path, monkeypatch):
+	import types
+	from app.services.gallery_store import GalleryStore
+	config = {'face_recognition': {'model_backend': 'face_recognition', 'detection_model': 'hog', 'num_jitters': 1, 'tolerance': 0.6, 'known_faces_path': str(tmp_path)}}
+	fr = types.SimpleNamespace(face_locations=lambda img, model=None: [], face_encodings=lambda img, locs, num_jitters=1: [])
+	monkeypatch.setitem(__import__('sys').modules, 'face_recognition', fr)
+
+	svc = FaceRecognitionService(config)
+	svc.add_known_face(np.zeros(128), {'student_id': 'A'})
+	svc.add_known_face(np.full(128, 0.1), {'student_id': 'B'})
+	before = svc._index
+	svc.add_known_face(np.full(128, 0.2), {'student_id': 'C'})
+	# Existing rows stay in place; only the new one is written
+	assert np.shares_memory(svc._index.matrix, before.matrix)
+	assert list(svc._index.student_ids) == ['A', 'B', 'C']
+	assert len(before) == 2
+
+	# A row enrolled by another process forces a reload so it isn't skipped
+	GalleryStore(tmp_path).append(np.full(128, 0.3), {'student_id': 'D'})
+	svc.add_known_face(np.full(128, 0.4), {'student_id': 'E'})
+	assert list(svc._index.student_ids) == ['A', 'B', 'C', 'D', 'E']
+	assert [r[0] for r in svc.recognize_faces([np.full(128, 0.2), np.full(128, 0.3)])] == ['C', 'D']
+	assert len(svc.known_face_encodings) == 5
+	assert not svc.reload_if_changed()
+
+
+def test_gallery_from_another_backend_is_refused(tmp_path, monkeypatch):
+	import types
+	import pytest
+	from app.services.gallery_store import GalleryStore
+	config = {'face_recognition': {'model_backend': 'face_recognition', 'detection_model': 'hog', 'num_jitters': 1, 'tolerance': 0.6, 'known_faces_path': str(tmp_path)}}
+	fr = types.SimpleNamespace(embedding_dim=512, face_locations=lambda img, model=None: [], face_encodings=lambda img, locs, num_jitters=1: [])
+	monkeypatch.setitem(__import__('sys').modules, 'face_recognition', fr)
+
+	GalleryStore(tmp_path).append(np.zeros(128), {'student_id': 'A'})
+	with pytest.raises(ValueError, match='re-enroll'):
+		FaceRecognitionService(config)
@@ -0,0 +1,29 @@
+from app.services.face_tracker import FaceTracker, box_iou
+
+
+def test_box_iou():
+	assert box_iou((0, 10, 10, 0), (0, 10, 10, 0)) == 1.0
+	assert box_iou((0, 10, 10, 0), (20, 30, 30, 20)) == 0.0
+
+
+def test_track_reused_and_recognized_until_confirmed():
+	tracker = FaceTracker(iou_threshold=0.3, max_age=1.0, confirm_hits=2, reverify_interval=5.0)
+
+	[t1] = tracker.update([(10, 60, 60, 10)], now=0.0)
+	assert tracker.needs_recognition(t1, now=0.0)
+	assert tracker.observe(t1, 'S1', 0.7, now=0.0) is False
+
+	[t2] = tracker.update([(12, 62, 62, 12)], now=0.1)
+	assert t2 is t1
+	assert tracker.observe(t2, 'S1', 0.7, now=0.1) is True
+	assert not tracker.needs_recognition(t2, now=0.2)
+	assert tracker.needs_recognition(t2, now=5.2)
+
+
+def test_tracks_expire_and_new_faces_get_new_tracks():
+	tracker = FaceTracker(max_age=1.0)
+	[t1] = tracker.update([(10, 60, 60, 10)], now=0.0)
+	a, b = tracker.update([(10, 60, 60, 10), (100, 160, 160, 100)], now=0.5)
+	assert a is t1 and b is not t1
+	[c] = tracker.update([(10, 60, 60, 10)], now=3.0)
+	assert c.track_id not in (t1.track_id, b.track_id)
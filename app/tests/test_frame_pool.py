@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+from app.services.frame_pool import FrameProcessingPool
+
+CONFIG = {'face_recognition': {'reload_interval': 60.0}, 'quality': {'enabled': False}}
+
+
+class StubFaceService:
+	"""Finds one face in any frame that isn't black; a frame starting with 255 hangs."""
+
+	recognition_cache = None
+
+	def __init__(self, config):
+		pass
+
+	def detect_faces(self, frame):
+		if frame[0, 0, 0] == 255:
+			time.sleep(60)
+		return [(0, 4, 4, 0)] if frame.any() else []
+
+	def encode_faces(self, frame, face_locations):
+		return [np.full(4, float(frame[1, 1, 0]))]
+
+	def recognize_faces(self, encodings):
+		return [('S1', 0.9)]
+
+	def reload_if_changed(self):
+		return False
+
+
+def broken_service(config):
+	raise RuntimeError("model file missing")
+
+
+def make_pool(factory, **kwargs):
+	return FrameProcessingPool(CONFIG, workers=1, slots=1, slot_bytes=8 * 8 * 3, start_method='spawn',
+		start_timeout=60.0, service_factory=factory, **kwargs)
+
+
+def next_result(pool, timeout=30.0):
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		result = pool.get_result(timeout=0.5)
+		if result is not None:
+			return result
+	raise AssertionError("no result from the frame pool")
+
+
+def test_frames_round_trip_through_shared_memory_and_slots_are_recycled(caplog):
+	pool = make_pool(StubFaceService)
+	pool.start()
+	try:
+		for value in (7, 9):
+			frame = np.full((8, 8, 3), value, dtype=np.uint8)
+			# Only one slot: the second frame fits only if the first slot came back
+			assert pool.submit(frame, {'camera_id': 'door-1'}, timeout=5.0)
+			result = next_result(pool)
+			assert result.meta == {'camera_id': 'door-1'} and result.face_count == 1
+			assert result.faces[0].student_id == 'S1' and result.faces[0].encoding[0] == value
+
+		# Oversized frames are dropped without taking a slot, logged once per camera
+		for _ in range(3):
+			assert not pool.submit(np.zeros((16, 16, 3), np.uint8), {'camera_id': 'door-2'})
+		assert sum('door-2' in r.getMessage() for r in caplog.records) == 1
+		assert pool.submit(np.zeros((8, 8, 3), np.uint8), timeout=5.0)
+		assert next_result(pool).face_count == 0
+	finally:
+		pool.stop()
+
+
+def test_dead_worker_is_restarted_and_its_slot_reclaimed():
+	pool = make_pool(StubFaceService)
+	pool.start()
+	try:
+		hang = np.zeros((8, 8, 3), np.uint8)
+		hang[0, 0, 0] = 255
+		assert pool.submit(hang, timeout=5.0)
+		time.sleep(0.5)
+		pool._processes[0].kill()
+		pool._processes[0].join(5.0)
+
+		assert pool.get_result(timeout=0) is None
+		assert pool.restarts == 1
+		assert pool.submit(np.full((8, 8, 3), 3, np.uint8), timeout=5.0)
+		assert next_result(pool).face_count == 1
+	finally:
+		pool.stop()
+
+
+def test_start_fails_loudly_when_workers_cannot_load():
+	pool = make_pool(broken_service)
+	with pytest.raises(RuntimeError, match='model file missing'):
+		pool.start()
@@ -0,0 +1,63 @@
+import pickle
+import numpy as np
+from app.services.gallery_store import GalleryStore
+
+
+def test_append_and_memmap_load(tmp_path):
+	store = GalleryStore(tmp_path)
+	store.append(np.zeros(4), {'student_id': 'A'})
+	store.append(np.ones(4), {'student_id': 'B'})
+
+	reader = GalleryStore(tmp_path)
+	matrix, metadata = reader.load()
+	assert isinstance(matrix, np.memmap)
+	assert matrix.shape == (2, 4) and matrix.dtype == np.float32
+	assert [m['student_id'] for m in metadata] == ['A', 'B']
+
+	version = reader.version()
+	store.append(np.full(4, 2.0), {'student_id': 'C'})
+	assert reader.version() > version
+	matrix, metadata = reader.load()
+	assert matrix.shape == (3, 4) and metadata[-1]['student_id'] == 'C'
+	assert np.allclose(matrix[2], 2.0)
+
+
+def test_append_discards_uncommitted_row(tmp_path):
+	store = GalleryStore(tmp_path)
+	store.append(np.zeros(4), {'student_id': 'A'})
+	# Simulate a crash between writing the row and its metadata line
+	with open(store.embeddings_file, 'ab') as f:
+		f.write(np.full(4, 9.0, dtype='<f4').tobytes())
+
+	store.append(np.ones(4), {'student_id': 'B'})
+	matrix, metadata = GalleryStore(tmp_path).load()
+	assert matrix.shape == (2, 4)
+	assert np.allclose(matrix[1], 1.0)
+
+
+def test_append_discards_partial_metadata_line(tmp_path):
+	store = GalleryStore(tmp_path)
+	store.append(np.zeros(4), {'student_id': 'A'})
+	# Simulate a crash halfway through writing the metadata line
+	with open(store.embeddings_file, 'ab') as f:
+		f.write(np.full(4, 9.0, dtype='<f4').tobytes())
+	with open(store.metadata_file, 'ab') as f:
+		f.write(b'{"student_id": "X", "na')
+
+	store.append(np.ones(4), {'student_id': 'B'})
+	matrix, metadata = GalleryStore(tmp_path).load()
+	assert [m['student_id'] for m in metadata] == ['A', 'B']
+	assert np.allclose(matrix[1], 1.0)
+
+
+def test_migrate_from_pickle(tmp_path):
+	legacy = tmp_path / 'encodings.pkl'
+	with open(legacy, 'wb') as f:
+		pickle.dump({'encodings': [np.zeros(3), np.ones(3)], 'metadata': [{'student_id': 'A'}, {'student_id': 'B'}]}, f)
+
+	store = GalleryStore(tmp_path)
+	assert store.migrate_from_pickle(legacy) == 2
+	assert not legacy.exists()
+	assert (tmp_path / 'encodings.pkl.migrated').exists()
+	matrix, metadata = store.load()
+	assert matrix.shape == (2, 3) and metadata[1]['student_id'] == 'B'
@@ -0,0 +1,47 @@
+import sys
+import time
+import types
+
+import numpy as np
+from app.services.face_recognition import FaceRecognitionService
+from app.services.gallery_store import GalleryStore
+from app.services.gallery_watcher import GalleryWatcher
+
+
+def make_service(tmp_path, monkeypatch):
+	config = {'face_recognition': {'model_backend': 'face_recognition', 'detection_model': 'hog', 'num_jitters': 1, 'tolerance': 0.6, 'known_faces_path': str(tmp_path)}}
+	fr = types.SimpleNamespace(face_locations=lambda img, model=None: [], face_encodings=lambda img, locs, num_jitters=1: [])
+	monkeypatch.setitem(sys.modules, 'face_recognition', fr)
+	return FaceRecognitionService(config)
+
+
+def test_reload_if_changed_swaps_in_changes_on_disk(tmp_path, monkeypatch):
+	svc = make_service(tmp_path, monkeypatch)
+	loads = []
+	original = svc.store.load
+	svc.store.load = lambda: loads.append(1) or original()
+
+	# Nothing changed: the store is not even read
+	assert svc.reload_if_changed() is False
+	assert loads == []
+
+	# Another process enrolls a face
+	GalleryStore(tmp_path).append(np.full(128, 0.5), {'student_id': 'A'})
+	assert svc.reload_if_changed() is True
+	assert svc.recognize_faces([np.full(128, 0.5)])[0][0] == 'A'
+	assert svc.reload_if_changed() is False
+	assert len(loads) == 1
+
+
+def test_watcher_picks_up_enrollments_in_the_background(tmp_path, monkeypatch):
+	svc = make_service(tmp_path, monkeypatch)
+	watcher = GalleryWatcher(svc, interval=0.1)
+	watcher.start()
+	try:
+		GalleryStore(tmp_path).append(np.full(128, 0.5), {'student_id': 'A'})
+		deadline = time.monotonic() + 5.0
+		while len(svc.known_face_metadata) == 0 and time.monotonic() < deadline:
+			time.sleep(0.05)
+		assert [m['student_id'] for m in svc.known_face_metadata] == ['A']
+	finally:
+		watcher.stop()
@@ -35,14 +35,21 @@ def test_config():
     }
 
 
+def remove_db_files(db_path):
+    """Delete the database along with its WAL sidecar files."""
+    for suffix in ('', '-wal', '-shm'):
+        path = Path(db_path + suffix)
+        if path.exists():
+            path.unlink()
+
+
 @pytest.fixture
 def setup_test_db(test_config):
     """Setup test database"""
     db_path = test_config['database']['path']
     
     # Clean up if exists
-    if Path(db_path).exists():
-        Path(db_path).unlink()
+    remove_db_files(db_path)
     
     # Create database
     db_manager = DatabaseManager(db_path)
@@ -50,8 +57,8 @@ def setup_test_db(test_config):
     yield db_path
     
     # Cleanup
-    if Path(db_path).exists():
-        Path(db_path).unlink()
+    db_manager.close_all()
+    remove_db_files(db_path)
     
     # Clean up known faces
     known_faces_path = Path(test_config['face_recognition']['known_faces_path'])
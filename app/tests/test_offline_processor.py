@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import cv2
+import numpy as np
+from app.services.offline_processor import plan_chunks, process_chunk
+
+
+class FakeFaceService:
+	def detect_faces(self, frame):
+		return [(0, 10, 10, 0)] if frame.mean() > 60 else []
+
+	def encode_faces(self, frame, locations):
+		return [np.zeros(128) for _ in locations]
+
+	def recognize_faces(self, encodings):
+		return [('S1', 0.9) for _ in encodings]
+
+
+def test_frame_directory_chunks_keep_frame_times(tmp_path):
+	for i in range(40):
+		value = 200 if 10 <= i < 20 else 0
+		cv2.imwrite(str(tmp_path / f'{i:04d}.png'), np.full((16, 16, 3), value, np.uint8))
+
+	start = datetime(2024, 3, 4, 9, 0)
+	chunks = plan_chunks(tmp_path, chunk_seconds=2.0, sample_fps=5.0, start_time=start, frame_rate=10.0)
+	assert [(c.start_frame, c.end_frame, c.step) for c in chunks] == [(0, 20, 2), (20, 40, 2)]
+
+	config = {'tracking': {'confirm_hits': 2}, 'quality': {'enabled': False}}
+	results = [process_chunk(c, FakeFaceService(), config) for c in chunks]
+	assert [r.frames for r in results] == [10, 10]
+	sightings = results[0].sightings + results[1].sightings
+	# Seen from frame 10, confirmed on the next sampled frame (12) at 1.2s
+	assert [(s.student_id, s.timestamp) for s in sightings] == [('S1', datetime(2024, 3, 4, 9, 0, 1, 200000))]
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import numpy as np
+from app.services.onnx_backend import ArcFaceEncoder, OnnxFaceBackend, ScrfdDetector
+
+
+class FakeSession:
+	def __init__(self, input_shape, output_shapes, outputs):
+		self.input_shape = input_shape
+		self.output_shapes = output_shapes
+		self.outputs = outputs
+		self.calls = []
+
+	def get_inputs(self):
+		return [SimpleNamespace(name='input', shape=self.input_shape)]
+
+	def get_outputs(self):
+		return [SimpleNamespace(name=f'out{i}', shape=s) for i, s in enumerate(self.output_shapes)]
+
+	def run(self, names, feed):
+		self.calls.append(feed['input'].shape)
+		return self.outputs(feed['input'])
+
+
+def scrfd_outputs(blob):
+	# 32x32 input, strides 8/16/32 with 2 anchors each: 32, 8 and 2 anchors
+	counts = [32, 8, 2]
+	scores = [np.zeros((n, 1), np.float32) for n in counts]
+	boxes = [np.zeros((n, 4), np.float32) for n in counts]
+	kps = [np.zeros((n, 10), np.float32) for n in counts]
+	# Anchors 10 and 11 sit at (8, 8) on the stride-8 grid; NMS keeps the stronger one
+	scores[0][10], scores[0][11] = 0.9, 0.7
+	boxes[0][10] = boxes[0][11] = 1.0
+	kps[0][10] = kps[0][11] = [-0.4, -0.4, 0.4, -0.4, 0.0, 0.0, -0.3, 0.5, 0.3, 0.5]
+	return scores + boxes + kps
+
+
+def test_detect_and_encode_with_fake_sessions():
+	detector = ScrfdDetector(
+		FakeSession([1, 3, 32, 32], [[None, 1]] * 9, scrfd_outputs),
+		input_size=(32, 32)
+	)
+	encoder = ArcFaceEncoder(FakeSession(
+		['N', 3, 112, 112], [['N', 2]],
+		lambda blob: [np.tile([3.0, 4.0], (len(blob), 1))]
+	))
+	backend = OnnxFaceBackend(detector, encoder)
+
+	image = np.zeros((64, 64, 3), dtype=np.uint8)
+	assert backend.detect([image, image]) == [[(0, 32, 32, 0)], [(0, 32, 32, 0)]]
+	assert len(detector.session.calls) == 2  # fixed-batch model runs frames in turn
+
+	embeddings = backend.encode(image, [(0, 32, 32, 0), (10, 40, 40, 10)])
+	assert encoder.session.calls == [(2, 3, 112, 112)]
+	assert np.allclose(embeddings, [[0.6, 0.8], [0.6, 0.8]])
+	# Landmarks collapsed to one point can't be aligned
+	assert encoder.encode(image, [np.zeros((5, 2), np.float32)]) == [None]
+	assert backend.embedding_dim == 2
+
+
+def test_landmarks_are_remembered_per_frame():
+	def outputs(blob):
+		# Same box in every frame; the landmarks shift with the frame's brightness
+		result = scrfd_outputs(blob)
+		result[6][10] += float(blob.max() > 0)
+		return result
+
+	detector = ScrfdDetector(FakeSession([1, 3, 32, 32], [[None, 1]] * 9, outputs), input_size=(32, 32))
+	encoder = SimpleNamespace(embedding_dim=2, calls=[])
+	encoder.encode = lambda image, landmarks: encoder.calls.append(landmarks) or [None] * len(landmarks)
+	backend = OnnxFaceBackend(detector, encoder)
+
+	dark = np.zeros((64, 64, 3), dtype=np.uint8)
+	bright = np.full((64, 64, 3), 255, dtype=np.uint8)
+	assert backend.detect([dark]) == backend.detect([bright]) == [[(0, 32, 32, 0)]]
+
+	backend.encode(dark, [(0, 32, 32, 0)])
+	backend.encode(bright, [(0, 32, 32, 0)])
+	backend.encode(dark.copy(), [(0, 32, 32, 0)])
+	dark_points, bright_points, unseen_points = (calls[0] for calls in encoder.calls)
+	assert np.allclose(bright_points - dark_points, 16.0)
+	assert np.allclose(unseen_points, OnnxFaceBackend._landmarks_from_box((0, 32, 32, 0)))
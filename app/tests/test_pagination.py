@@ -0,0 +1,38 @@
+import pytest
+
+from app.core.database import DatabaseManager
+from app.core.pagination import decode_cursor, encode_cursor
+from app.web.dashboard import create_app
+
+
+def test_cursor_round_trip():
+	token = encode_cursor('2024-03-04 09:00:00', 42)
+	assert decode_cursor(token) == ('2024-03-04 09:00:00', 42)
+	with pytest.raises(ValueError):
+		decode_cursor('not a cursor')
+
+
+def test_attendance_api_walks_pages_in_order(tmp_path):
+	db = DatabaseManager(str(tmp_path / 'test.db'), schema_path=str(tmp_path / 'missing.sql'))
+	with db.connection() as conn:
+		# Equal timestamps must still page without skipping or repeating rows
+		conn.executemany('INSERT INTO attendance_records (student_id, timestamp) VALUES (?, ?)',
+			[(f'S{i}', f'2024-03-04 09:0{i // 2}:00') for i in range(7)])
+		conn.execute("INSERT INTO attendance_records (student_id, timestamp) VALUES ('S9', '2024-03-05 09:00:00')")
+	client = create_app({'DATABASE_PATH': str(db.db_path)}, db_manager=db).test_client()
+
+	seen, after = [], None
+	while True:
+		resp = client.get('/api/attendance', query_string={'date': '2024-03-04', 'limit': 3, 'after': after or ''})
+		assert resp.status_code == 200
+		page = resp.get_json()
+		assert len(page['items']) <= 3
+		seen += [row['id'] for row in page['items']]
+		after = page['next_cursor']
+		if after is None:
+			break
+	assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+	assert client.get('/api/alerts?after=bogus').status_code == 400
+	assert client.get('/api/attendance?limit=x').status_code == 400
+	assert len(client.get('/api/attendance', query_string={'date': ''}).get_json()['items']) == 8
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import numpy as np
+from app.main import SmartAttendanceSystem
+from app.utils.performance import (AdaptiveFrameSkipper, MotionDetector, PerformanceMonitor,
+	optimize_frame_for_detection, scale_face_locations)
+from app.web.dashboard import create_app
+
+
+def test_stage_quantiles_and_counters():
+	monitor = PerformanceMonitor()
+	for i in range(1, 101):
+		monitor.record_stage_time('encoding', i / 1000)
+	monitor.increment('attendance_frames_dropped_total', camera='door-1', reason='stale')
+	monitor.increment('attendance_frames_dropped_total', camera='door-1', reason='stale')
+
+	q = monitor.get_quantiles('attendance_stage_latency_seconds', stage='encoding')
+	assert abs(q[0.5] - 0.0505) < 1e-6 and q[0.99] > q[0.95] > q[0.5]
+	assert monitor.get_counter('attendance_frames_dropped_total', camera='door-1', reason='stale') == 2
+
+
+def test_metrics_endpoint_prometheus_format():
+	monitor = PerformanceMonitor()
+	monitor.record_stage_time('detection', 0.02)
+	monitor.increment('attendance_frames_processed_total', camera='door-1')
+	app = create_app({'DATABASE_PATH': ':memory:'}, metrics=monitor)
+
+	resp = app.test_client().get('/api/metrics')
+	body = resp.get_data(as_text=True)
+	assert resp.status_code == 200 and resp.mimetype == 'text/plain'
+	assert '# TYPE attendance_stage_latency_seconds summary' in body
+	assert 'attendance_stage_latency_seconds{stage="detection",quantile="0.99"} 0.02' in body
+	assert 'attendance_frames_processed_total{camera="door-1"} 1' in body
+
+
+def test_motion_detector_ignores_static_frames():
+	detector = MotionDetector(threshold=0.01)
+	corridor = np.full((480, 640, 3), 90, dtype=np.uint8)
+	assert detector.has_motion(corridor) is True  # first frame seeds the background
+	assert detector.has_motion(corridor) is False
+	assert detector.has_motion(corridor + 3) is False  # sensor noise / slight light change
+
+	person = corridor.copy()
+	person[120:400, 260:380] = 200
+	assert detector.has_motion(person) is True
+
+
+def test_skipper_follows_camera_fps_and_shared_capacity():
+	def settle(skipper, duration):
+		system = SimpleNamespace(skippers={'door-1': skipper})
+		for _ in range(skipper.recent_durations.maxlen):
+			skipper.last_adjust_time = 0
+			SmartAttendanceSystem._frame_done(system, 'door-1', duration)
+		return skipper.current_skip
+
+	# 10 fps camera, 5 fps of capacity: every other frame, not max_skip
+	assert settle(AdaptiveFrameSkipper(target_fps=10, max_skip=5, camera_fps=10), 0.2) == 1
+	# Fast processing is still held to target_fps: 30 fps camera -> every 3rd frame
+	assert settle(AdaptiveFrameSkipper(target_fps=10, max_skip=5, camera_fps=30), 0.01) == 2
+	# 12 cameras on one thread at 30 ms each: ~2.8 fps per camera, capped by max_skip
+	assert settle(AdaptiveFrameSkipper(target_fps=10, max_skip=8, camera_fps=30, cameras_per_worker=12), 0.03) == 8
+	# Two cameras per worker at 40 ms: 12.5 fps of share, so target_fps decides
+	skipper = AdaptiveFrameSkipper(target_fps=10, max_skip=5, camera_fps=30, cameras_per_worker=2)
+	assert settle(skipper, 0.04) == 2
+	# And the skip comes back down when frames get cheaper
+	assert settle(skipper, 0.3) == 5 and settle(skipper, 0.02) == 2
+
+
+def test_scale_face_locations_rounds_and_clamps():
+	boxes = [(10, 21, 31, 5)]
+	assert scale_face_locations(boxes, (240, 320), (240, 320)) == boxes
+	assert scale_face_locations(boxes, (240, 320, 3), (480, 640, 3)) == [(20, 42, 62, 10)]
+	# 10/3 ~ 3.33: coordinates round to the nearest pixel
+	assert scale_face_locations([(1, 2, 2, 1)], (3, 3), (10, 10)) == [(3, 7, 7, 3)]
+	# Boxes running off the small frame are clipped to the full-size one
+	assert scale_face_locations([(-1, 330, 250, -2)], (240, 320), (480, 640)) == [(0, 640, 480, 0)]
+	assert scale_face_locations([], (240, 320), (480, 640)) == []
+
+	frame = np.zeros((480, 640, 3), dtype=np.uint8)
+	small = optimize_frame_for_detection(frame, scale=0.35, grayscale=False)
+	top, right, bottom, left = scale_face_locations([(0, small.shape[1], small.shape[0], 0)], small.shape, frame.shape)[0]
+	assert (top, right, bottom, left) == (0, 640, 480, 0)
@@ -0,0 +1,39 @@
+import numpy as np
+from app.services.recognition_cache import RecognitionCache
+
+
+def test_hit_within_distance_and_expiry():
+	cache = RecognitionCache(max_size=4, ttl=5.0, distance=0.1)
+	a = np.ones(128, dtype=np.float32)
+	cache.store(a, ('S1', 0.8), now=0.0)
+	cache.store(-a, (None, 0.0), now=0.0)
+
+	near, far = a + 0.005, a + 0.5
+	assert cache.lookup(np.stack([near, far, -a]), now=1.0) == [('S1', 0.8), None, (None, 0.0)]
+	assert (cache.hits, cache.misses) == (2, 1)
+	assert cache.lookup(near, now=6.0) == [None]
+
+	cache.store(a, ('S1', 0.8), now=7.0)
+	cache.clear()
+	assert cache.lookup(a, now=7.0) == [None]
+
+
+def test_evicts_least_recently_used():
+	cache = RecognitionCache(max_size=2, ttl=100.0, distance=0.1)
+	rows = np.eye(3, dtype=np.float32)
+	cache.store(rows[0], ('A', 1.0), now=0.0)
+	cache.store(rows[1], ('B', 1.0), now=1.0)
+	cache.lookup(rows[0], now=2.0)
+	cache.store(rows[2], ('C', 1.0), now=3.0)
+	assert cache.lookup(rows, now=4.0) == [('A', 1.0), None, ('C', 1.0)]
+
+
+def test_store_from_before_a_clear_is_dropped():
+	cache = RecognitionCache(max_size=4, ttl=100.0, distance=0.1)
+	a = np.ones(8, dtype=np.float32)
+	generation = cache.generation
+	cache.clear()  # e.g. a gallery reload while the search was running
+	cache.store(a, (None, 0.0), now=0.0, generation=generation)
+	assert cache.lookup(a, now=1.0) == [None]
+	cache.store(a, ('S1', 0.9), now=0.0, generation=cache.generation)
+	assert cache.lookup(a, now=1.0) == [('S1', 0.9)]
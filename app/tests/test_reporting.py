@@ -0,0 +1,30 @@
+import csv
+import sqlite3
+
+from app.utils.reporting import generate_csv_report, iter_csv, iter_cursor
+
+
+def _cursor(rows):
+	conn = sqlite3.connect(':memory:')
+	conn.row_factory = sqlite3.Row
+	conn.execute('CREATE TABLE t (student_id TEXT, n INTEGER)')
+	conn.executemany('INSERT INTO t VALUES (?, ?)', [(f'S{i}', i) for i in range(rows)])
+	return conn.execute('SELECT * FROM t ORDER BY n')
+
+
+def test_iter_csv_streams_in_chunks():
+	rows = ([r['student_id'], r['n']] for r in iter_cursor(_cursor(5000), chunk_size=100))
+	chunks = list(iter_csv(rows, header=['student_id', 'n'], flush_chars=4096))
+	assert len(chunks) > 1
+	parsed = list(csv.reader(''.join(chunks).splitlines()))
+	assert parsed[0] == ['student_id', 'n']
+	assert parsed[1] == ['S0', '0'] and len(parsed) == 5001
+
+
+def test_generate_csv_report_from_cursor(tmp_path):
+	out = generate_csv_report('2024-01-01', '2024-01-31', iter_cursor(_cursor(250), chunk_size=64),
+		out_path=str(tmp_path / 'report.csv'))
+	with open(out, newline='', encoding='utf-8') as f:
+		rows = list(csv.DictReader(f))
+	assert len(rows) == 250
+	assert rows[-1] == {'student_id': 'S249', 'n': '249'}
@@ -2,9 +2,10 @@
 
 from .video_utils import open_camera, read_frame
 from .validators import validate_email
-from .reporting import generate_csv_report, generate_pdf_report
+from .reporting import generate_csv_report, generate_pdf_report, iter_csv, iter_cursor
 
 __all__ = [
-	'open_camera', 'read_frame', 'validate_email', 'generate_csv_report', 'generate_pdf_report'
+	'open_camera', 'read_frame', 'validate_email', 'generate_csv_report', 'generate_pdf_report',
+	'iter_csv', 'iter_cursor'
 ]
 
@@ -1,6 +1,18 @@
 import cv2
 import numpy as np
-from typing import Tuple, Optional
+from typing import Dict, List, Optional, Tuple
+
+QUALITY_MESSAGES = {
+    'too_small': "Face is too small. Please move closer to the camera.",
+    'blurry': "Image is too blurry (score: {blur:.1f}). Please ensure good focus.",
+    'too_dark': "Image is too dark",
+    'overexposed': "Image is overexposed",
+    'low_contrast': "Image has low contrast",
+}
+
+
+def to_grayscale(image: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
 
 
 def calculate_blur_score(image: np.ndarray) -> float:
@@ -8,64 +20,114 @@ def calculate_blur_score(image: np.ndarray) -> float:
     Calculate blur score using Laplacian variance.
     Higher values indicate sharper images.
     Typical threshold: > 100 for acceptable quality.
+    Accepts a BGR image or an already converted grayscale one.
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    gray = to_grayscale(image)
     laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
     return laplacian_var
 
 
+def lighting_problem(gray: np.ndarray, min_brightness: float = 50, max_brightness: float = 200,
+                     min_contrast: float = 30) -> Optional[str]:
+    """Return 'too_dark', 'overexposed' or 'low_contrast' for a grayscale crop, or None."""
+    mean_brightness, std_brightness = cv2.meanStdDev(gray)
+    if mean_brightness[0][0] < min_brightness:
+        return 'too_dark'
+    if mean_brightness[0][0] > max_brightness:
+        return 'overexposed'
+    # Low contrast (flat lighting)
+    if std_brightness[0][0] < min_contrast:
+        return 'low_contrast'
+    return None
+
+
 def assess_lighting_quality(image: np.ndarray) -> Tuple[bool, str]:
     """
     Assess if image has adequate lighting.
     Returns (is_acceptable, reason).
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-    mean_brightness = np.mean(gray)
-    std_brightness = np.std(gray)
-    
-    # Too dark
-    if mean_brightness < 50:
-        return False, "Image is too dark"
-    
-    # Too bright (overexposed)
-    if mean_brightness > 200:
-        return False, "Image is overexposed"
-    
-    # Low contrast (flat lighting)
-    if std_brightness < 30:
-        return False, "Image has low contrast"
-    
+    problem = lighting_problem(to_grayscale(image))
+    if problem:
+        return False, QUALITY_MESSAGES[problem]
     return True, "Lighting is acceptable"
 
 
-def validate_face_quality(image: np.ndarray, face_location: Tuple) -> Tuple[bool, str]:
+def face_quality_problem(gray: np.ndarray, face_location: Tuple, min_size: int = 80,
+                         min_blur: float = 100.0, min_brightness: float = 50,
+                         max_brightness: float = 200, min_contrast: float = 30) -> Tuple[Optional[str], float]:
+    """
+    Check one face on a grayscale frame, cheapest test first.
+    Returns (problem, blur_score); problem is None for an acceptable face.
+    """
+    top, right, bottom, left = face_location
+    if bottom - top < min_size or right - left < min_size:
+        return 'too_small', 0.0
+
+    face_gray = gray[max(0, top):bottom, max(0, left):right]
+    blur_score = calculate_blur_score(face_gray)
+    if blur_score < min_blur:
+        return 'blurry', blur_score
+    return lighting_problem(face_gray, min_brightness, max_brightness, min_contrast), blur_score
+
+
+def validate_face_quality(image: np.ndarray, face_location: Tuple,
+                          gray: Optional[np.ndarray] = None) -> Tuple[bool, str]:
     """
     Comprehensive face quality validation.
+    Pass `gray` when the grayscale frame is already at hand.
     Returns (is_valid, message).
     """
-    top, right, bottom, left = face_location
-    face_img = image[top:bottom, left:right]
-    
-    # Check if face region is too small
-    face_height = bottom - top
-    face_width = right - left
-    
-    if face_height < 80 or face_width < 80:
-        return False, "Face is too small. Please move closer to the camera."
-    
-    # Check blur
-    blur_score = calculate_blur_score(face_img)
-    if blur_score < 100:
-        return False, f"Image is too blurry (score: {blur_score:.1f}). Please ensure good focus."
-    
-    # Check lighting
-    lighting_ok, lighting_msg = assess_lighting_quality(face_img)
-    if not lighting_ok:
-        return False, lighting_msg
-    
+    gray = to_grayscale(image) if gray is None else gray
+    problem, blur_score = face_quality_problem(gray, face_location)
+    if problem:
+        return False, QUALITY_MESSAGES[problem].format(blur=blur_score)
     return True, "Face quality is acceptable"
 
 
+class FaceQualityGate:
+    """Rejects faces that are too small, blurry or badly lit to be worth encoding.
+
+    The frame is converted to grayscale once and every face crop and metric
+    reuses it. Thresholds are looser than enrollment's, since live faces are
+    smaller and a rejected face is simply retried on a later frame.
+    """
+
+    def __init__(self, min_face_size: int = 40, min_blur: float = 30.0, min_brightness: float = 40,
+                 max_brightness: float = 220, min_contrast: float = 15):
+        self.thresholds = dict(min_size=min_face_size, min_blur=min_blur, min_brightness=min_brightness,
+                               max_brightness=max_brightness, min_contrast=min_contrast)
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['FaceQualityGate']:
+        quality = config.get('quality', {}) or {}
+        if not quality.get('enabled', True):
+            return None
+        return cls(
+            min_face_size=quality.get('min_face_size', 40),
+            min_blur=quality.get('min_blur', 30.0),
+            min_brightness=quality.get('min_brightness', 40),
+            max_brightness=quality.get('max_brightness', 220),
+            min_contrast=quality.get('min_contrast', 15)
+        )
+
+    def filter(self, frame: np.ndarray, face_locations: List[Tuple],
+               indices: Optional[List[int]] = None) -> Tuple[List[int], Dict[str, int]]:
+        """Return the indices of faces that pass and a count of rejections by reason."""
+        indices = list(range(len(face_locations))) if indices is None else indices
+        if not indices:
+            return [], {}
+
+        gray = to_grayscale(frame)
+        passed, rejected = [], {}
+        for i in indices:
+            problem, _ = face_quality_problem(gray, face_locations[i], **self.thresholds)
+            if problem:
+                rejected[problem] = rejected.get(problem, 0) + 1
+            else:
+                passed.append(i)
+        return passed, rejected
+
+
 def detect_multiple_faces_warning(face_locations: list) -> Optional[str]:
     """
     Check if multiple faces are detected and return warning message.
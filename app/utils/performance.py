@@ -1,30 +1,91 @@
 import cv2
+import math
 import numpy as np
 import time
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
 from collections import deque
 
 
 class PerformanceMonitor:
-    """Monitor and track performance metrics for face recognition system"""
+    """Monitor and track performance metrics for face recognition system
     
-    def __init__(self, window_size: int = 30):
+    Besides the rolling averages, keeps labelled counters and summaries
+    (rolling-window p50/p95/p99 plus lifetime sum and count) that can be
+    rendered in Prometheus text format. Safe to share between threads.
+    """
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, window_size: int = 30, summary_window: int = 1024):
         self.window_size = window_size
+        self.summary_window = summary_window
         self.frame_times = deque(maxlen=window_size)
         self.detection_times = deque(maxlen=window_size)
         self.recognition_times = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._summaries: Dict[Tuple, list] = {}
         
     def record_frame_time(self, duration: float):
         """Record time taken to process a frame"""
         self.frame_times.append(duration)
+        self.observe('attendance_stage_latency_seconds', duration, stage='frame')
     
     def record_detection_time(self, duration: float):
         """Record time taken for face detection"""
         self.detection_times.append(duration)
+        self.observe('attendance_stage_latency_seconds', duration, stage='detection')
     
     def record_recognition_time(self, duration: float):
         """Record time taken for face recognition"""
         self.recognition_times.append(duration)
+        self.observe('attendance_stage_latency_seconds', duration, stage='matching')
+    
+    def record_stage_time(self, stage: str, duration: float):
+        """Record time taken by a named pipeline stage"""
+        self.observe('attendance_stage_latency_seconds', duration, stage=stage)
+    
+    @contextmanager
+    def time_stage(self, stage: str):
+        """Context manager recording the wall time of a pipeline stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage_time(stage, time.perf_counter() - start)
+    
+    def increment(self, name: str, value: float = 1, **labels):
+        """Increase a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name: str, value: float, **labels):
+        """Add a sample to a summary"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = [deque(maxlen=self.summary_window), 0, 0.0]
+            summary[0].append(value)
+            summary[1] += 1
+            summary[2] += value
+    
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+    
+    def get_quantiles(self, name: str, **labels) -> dict:
+        """p50/p95/p99 over the most recent samples of a summary"""
+        with self._lock:
+            summary = self._summaries.get((name, tuple(sorted(labels.items()))))
+            samples = list(summary[0]) if summary else []
+        if not samples:
+            return {q: 0.0 for q in self.QUANTILES}
+        values = np.quantile(samples, self.QUANTILES)
+        return dict(zip(self.QUANTILES, (float(v) for v in values)))
     
     def get_average_fps(self) -> float:
         """Calculate average FPS from recent frames"""
@@ -41,22 +102,68 @@ class PerformanceMonitor:
             'avg_detection_time': sum(self.detection_times) / len(self.detection_times) if self.detection_times else 0,
             'avg_recognition_time': sum(self.recognition_times) / len(self.recognition_times) if self.recognition_times else 0,
         }
+    
+    def render_prometheus(self) -> str:
+        """Render counters and summaries in Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._summaries.items())
+        
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for (name, labels), (samples, count, total) in summaries:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            if samples:
+                for q, v in zip(self.QUANTILES, np.quantile(samples, self.QUANTILES)):
+                    lines.append(f"{name}{_format_labels(labels + (('quantile', str(q)),))} {_format_value(v)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
 
 
-def optimize_frame_for_detection(frame: np.ndarray, target_width: int = 640) -> np.ndarray:
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def optimize_frame_for_detection(frame: np.ndarray, target_width: int = 640,
+                                 scale: Optional[float] = None, grayscale: bool = True) -> np.ndarray:
     """
     Optimize frame for faster face detection.
-    Converts to grayscale and optionally resizes.
+    Optionally converts to grayscale, then downsizes either by a fixed
+    `scale` factor or to at most `target_width` pixels wide.
     """
     # Convert to grayscale for faster processing
-    if len(frame.shape) == 3:
+    if grayscale and len(frame.shape) == 3:
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     else:
         gray = frame
     
-    # Resize if frame is too large
     height, width = gray.shape[:2]
-    if width > target_width:
+    if scale is not None:
+        if scale < 1.0:
+            new_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            gray = cv2.resize(gray, new_size, interpolation=cv2.INTER_AREA)
+    # Resize if frame is too large
+    elif width > target_width:
         scale = target_width / width
         new_height = int(height * scale)
         gray = cv2.resize(gray, (target_width, new_height))
@@ -64,6 +171,59 @@ def optimize_frame_for_detection(frame: np.ndarray, target_width: int = 640) ->
     return gray
 
 
+def scale_face_locations(face_locations: list, from_shape: tuple, to_shape: tuple) -> list:
+    """
+    Map (top, right, bottom, left) boxes found on an image of `from_shape`
+    back onto an image of `to_shape`, clipped to its bounds.
+    """
+    sy = to_shape[0] / from_shape[0]
+    sx = to_shape[1] / from_shape[1]
+    max_y, max_x = to_shape[0], to_shape[1]
+    return [
+        (
+            max(0, int(round(top * sy))),
+            min(max_x, int(round(right * sx))),
+            min(max_y, int(round(bottom * sy))),
+            max(0, int(round(left * sx)))
+        )
+        for top, right, bottom, left in face_locations
+    ]
+
+
+class MotionDetector:
+    """
+    Cheap motion pre-filter run before face detection.
+    Compares a small, blurred grayscale copy of each frame against a running
+    background average and reports motion when more than `threshold` of the
+    pixels changed by over `pixel_delta` grey levels.
+    """
+    
+    def __init__(self, threshold: float = 0.01, pixel_delta: int = 25,
+                 learning_rate: float = 0.05, width: int = 160):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.learning_rate = learning_rate
+        self.width = width
+        self.background = None
+        self.last_motion_fraction = 0.0
+    
+    def has_motion(self, frame: np.ndarray) -> bool:
+        """Update the background model and return True if the frame changed"""
+        small = optimize_frame_for_detection(frame, target_width=self.width)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        
+        if self.background is None or self.background.shape != small.shape:
+            self.background = small.astype(np.float32)
+            self.last_motion_fraction = 1.0
+            return True
+        
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        changed = np.count_nonzero(diff > self.pixel_delta)
+        self.last_motion_fraction = changed / diff.size
+        cv2.accumulateWeighted(small, self.background, self.learning_rate)
+        return bool(self.last_motion_fraction >= self.threshold)
+
+
 def should_process_frame(frame_count: int, skip_frames: int = 2) -> bool:
     """
     Determine if current frame should be processed.
@@ -85,14 +245,23 @@ class AdaptiveFrameSkipper:
     """
     Adaptively skip frames based on system performance.
     Increases skip rate if processing is slow.
+
+    Given the camera's `camera_fps` and the number of cameras sharing each
+    processing thread or worker, `update_duration` sets the skip directly so
+    the camera's processed rate, camera_fps / (skip + 1), stays within both
+    `target_fps` and its share of the processing capacity.
     """
     
-    def __init__(self, target_fps: float = 10.0, max_skip: int = 5):
+    def __init__(self, target_fps: float = 10.0, max_skip: int = 5,
+                 camera_fps: Optional[float] = None, cameras_per_worker: float = 1.0):
         self.target_fps = target_fps
         self.max_skip = max_skip
+        self.camera_fps = camera_fps
+        self.cameras_per_worker = max(1.0, float(cameras_per_worker))
         self.current_skip = 0
         self.last_adjust_time = time.time()
         self.recent_fps = deque(maxlen=10)
+        self.recent_durations = deque(maxlen=10)
     
     def update_fps(self, current_fps: float):
         """Update with current FPS measurement"""
@@ -103,6 +272,27 @@ class AdaptiveFrameSkipper:
             self._adjust_skip_rate()
             self.last_adjust_time = time.time()
     
+    def update_duration(self, seconds: float):
+        """Update with the time one processed frame took"""
+        if not self.camera_fps:
+            self.update_fps(1.0 / seconds)
+            return
+        self.recent_durations.append(seconds)
+
+        if time.time() - self.last_adjust_time > 2.0:
+            self._skip_for_durations()
+            self.last_adjust_time = time.time()
+
+    def _skip_for_durations(self):
+        """Process one frame per interval: the slower of target_fps and this camera's share."""
+        duration = sum(self.recent_durations) / len(self.recent_durations)
+        interval = duration * self.cameras_per_worker
+        if self.target_fps:
+            interval = max(interval, 1.0 / self.target_fps)
+        # Rounded first so e.g. 30 fps at a 0.1 s interval is exactly every 3rd frame
+        skip = math.ceil(round(self.camera_fps * interval, 6)) - 1
+        self.current_skip = min(max(skip, 0), self.max_skip)
+
     def _adjust_skip_rate(self):
         """Adjust frame skip rate based on performance"""
         if not self.recent_fps:
@@ -1,22 +1,63 @@
 import csv
+import io
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, Sequence
 
 
-def generate_csv_report(start_date: str, end_date: str, rows: List[Dict], out_path: str = None) -> str:
-	out_dir = Path('data/exports')
-	out_dir.mkdir(parents=True, exist_ok=True)
-	out_file = out_dir / f"attendance_{start_date}_{end_date}.csv"
-	keys = rows[0].keys() if rows else ['student_id']
+def iter_cursor(cursor, chunk_size: int = 1000) -> Iterator:
+	"""Yield the rows of an executed cursor, fetching `chunk_size` at a time.
+
+	The cursor is closed when the rows run out or the consumer stops early.
+	"""
+	try:
+		while True:
+			rows = cursor.fetchmany(chunk_size)
+			if not rows:
+				break
+			yield from rows
+	finally:
+		cursor.close()
+
+
+def iter_csv(rows: Iterable[Sequence], header: Sequence = None, flush_chars: int = 65536) -> Iterator[str]:
+	"""Render rows as CSV text in chunks of roughly `flush_chars`, for streaming responses."""
+	buf = io.StringIO()
+	writer = csv.writer(buf)
+	if header is not None:
+		writer.writerow(header)
+	for row in rows:
+		writer.writerow(row)
+		if buf.tell() >= flush_chars:
+			yield buf.getvalue()
+			buf.seek(0)
+			buf.truncate()
+	if buf.tell():
+		yield buf.getvalue()
+
+
+def generate_csv_report(start_date: str, end_date: str, rows: Iterable[Dict], out_path: str = None) -> str:
+	"""Write `rows` (dicts or sqlite3.Row, e.g. from `iter_cursor`) to a CSV file as they arrive."""
+	if out_path:
+		out_file = Path(out_path)
+		out_file.parent.mkdir(parents=True, exist_ok=True)
+	else:
+		out_dir = Path('data/exports')
+		out_dir.mkdir(parents=True, exist_ok=True)
+		out_file = out_dir / f"attendance_{start_date}_{end_date}.csv"
+	rows = iter(rows)
+	first = next(rows, None)
+	keys = first.keys() if first is not None else ['student_id']
 	with open(out_file, 'w', newline='', encoding='utf-8') as f:
 		writer = csv.DictWriter(f, fieldnames=list(keys))
 		writer.writeheader()
-		for r in rows:
-			writer.writerow(r)
+		if first is not None:
+			writer.writerow(dict(first))
+			for r in rows:
+				writer.writerow(dict(r))
 	return str(out_file)
 
 
-def generate_pdf_report(start_date: str, end_date: str, rows: List[Dict], out_path: str = None) -> str:
+def generate_pdf_report(start_date: str, end_date: str, rows: Iterable[Dict], out_path: str = None) -> str:
 	# Minimal placeholder: write a text-like PDF using reportlab if available
 	try:
 		from reportlab.lib.pagesizes import letter
@@ -1,13 +1,19 @@
 from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
 import sqlite3
 import os
+import threading
 import cv2
 import numpy as np
 from datetime import datetime
 from app.api import api_bp
+from app.core.database import DatabaseManager
+from app.core import queries
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, keyset_page
+from app.core.result_cache import ResultCache
 from app.services.face_recognition import FaceRecognitionService
+from app.utils.performance import PerformanceMonitor
 
-def create_app(config=None):
+def create_app(config=None, face_service=None, metrics=None, db_manager=None):
     app = Flask(__name__, template_folder='templates')
     app.secret_key = 'dev-secret-key' # Change in production
     
@@ -17,53 +23,99 @@ def create_app(config=None):
     # Register Blueprints
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    # Pipeline metrics served at /api/metrics; SmartAttendanceSystem shares its monitor
+    app.extensions['metrics'] = metrics if metrics is not None else PerformanceMonitor()
+
+    # One FaceRecognitionService per app, shared by every request thread.
+    # SmartAttendanceSystem injects its own so the camera pipeline and web
+    # registration use the same in-memory gallery.
+    app.extensions['face_service'] = face_service
+    face_service_lock = threading.Lock()
+
+    def get_face_service():
+        service = app.extensions.get('face_service')
+        if service is None:
+            with face_service_lock:
+                service = app.extensions.get('face_service')
+                if service is None:
+                    service = FaceRecognitionService(app.config)
+                    app.extensions['face_service'] = service
+        return service
+
+    # Routes and the API share one DatabaseManager (pooled connections);
+    # SmartAttendanceSystem passes the one its services use. The API
+    # blueprint reaches it through extensions['get_db_manager'].
+    app.extensions['db'] = db_manager
+    db_lock = threading.Lock()
+
+    def get_db_manager():
+        db = app.extensions.get('db')
+        if db is None:
+            with db_lock:
+                db = app.extensions.get('db')
+                if db is None:
+                    # Handle both full config and simple dict with DATABASE_PATH
+                    metrics = app.extensions['metrics']
+                    if app.config.get('DATABASE_PATH') or 'database' not in app.config:
+                        db = DatabaseManager(
+                            app.config.get('DATABASE_PATH') or 'data/attendance.db',
+                            result_cache=ResultCache.from_config(app.config, monitor=metrics)
+                        )
+                    else:
+                        db = DatabaseManager.from_config(app.config, monitor=metrics)
+                    app.extensions['db'] = db
+        return db
+
+    app.extensions['get_db_manager'] = get_db_manager
+
     def get_db():
-        # Handle both full config and simple dict with DATABASE_PATH
-        db_path = app.config.get('DATABASE_PATH')
-        if not db_path and 'database' in app.config:
-            db_path = app.config['database']['path']
-        if not db_path:
-            db_path = 'data/attendance.db'
-        
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_db_manager().connection()
+
+    @app.teardown_appcontext
+    def release_db(exc):
+        # Request threads are short-lived; hand the connection back to the pool
+        db = app.extensions.get('db')
+        if db is not None:
+            db.release_connection()
+
+    def cached(key, compute):
+        """Serve `compute()` from the shared result cache; services invalidate it on writes."""
+        return get_db_manager().results.get(key, compute)
 
     @app.route('/')
     def dashboard():
         today = datetime.now().strftime('%Y-%m-%d')
-        stats = {
-            'present': 0,
-            'late': 0,
-            'unknown': 0,
-            'total_students': 0
-        }
-        
-        with get_db() as conn:
-            cursor = conn.cursor()
+
+        def load():
+            stats = {
+                'present': 0,
+                'late': 0,
+                'unknown': 0,
+                'total_students': 0
+            }
+
+            with get_db() as conn:
+                cursor = conn.cursor()
             
-            # Get stats
-            cursor.execute("SELECT COUNT(*) FROM students WHERE is_active=1")
-            stats['total_students'] = cursor.fetchone()[0]
+                # Get stats
+                cursor.execute("SELECT COUNT(*) FROM students WHERE is_active=1")
+                stats['total_students'] = cursor.fetchone()[0]
             
-            cursor.execute("SELECT status, COUNT(*) FROM attendance_records WHERE date(timestamp)=? GROUP BY status", (today,))
-            for row in cursor.fetchall():
-                if row['status'] == 'present': stats['present'] = row[1]
-                elif row['status'] == 'late': stats['late'] = row[1]
+                cursor.execute(queries.DAY_STATUS_COUNTS, (today,))
+                for row in cursor.fetchall():
+                    if row['status'] == 'present': stats['present'] = row[1]
+                    elif row['status'] == 'late': stats['late'] = row[1]
             
-            cursor.execute("SELECT COUNT(*) FROM alerts WHERE type='unknown_face' AND date(timestamp)=?", (today,))
-            stats['unknown'] = cursor.fetchone()[0]
-
-            # Get recent attendance
-            cursor.execute('''
-                SELECT ar.*, s.name, s.email 
-                FROM attendance_records ar
-                LEFT JOIN students s ON ar.student_id = s.student_id
-                WHERE date(ar.timestamp) = ?
-                ORDER BY ar.timestamp DESC LIMIT 10
-            ''', (today,))
-            recent_attendance = [dict(row) for row in cursor.fetchall()]
+                cursor.execute(queries.DAY_UNKNOWN_FACE_ALERTS, (today, today))
+                stats['unknown'] = cursor.fetchone()[0]
+
+                # Get recent attendance
+                cursor.execute(queries.DAY_RECENT_ATTENDANCE, (today, today))
+                recent_attendance = [dict(row) for row in cursor.fetchall()]
+
+            return stats, recent_attendance
 
+        stats, recent_attendance = cached(('dashboard', today), load)
         return render_template('dashboard.html', stats=stats, recent_attendance=recent_attendance)
 
     @app.route('/register', methods=['GET', 'POST'])
@@ -87,12 +139,9 @@ def create_app(config=None):
                     flash('Invalid image file', 'danger')
                     return redirect(request.url)
 
-                # Initialize service to get encoding
-                # Use the app's configuration
-                from flask import current_app
                 from app.utils.face_quality import validate_face_quality, detect_multiple_faces_warning
                 
-                face_service = FaceRecognitionService(current_app.config)
+                face_service = get_face_service()
                 
                 # Detect and encode
                 face_locations = face_service.detect_faces(img)
@@ -124,11 +173,12 @@ def create_app(config=None):
                             (student_id, name, email)
                         )
                         conn.commit()
+                        get_db_manager().results.invalidate()
                     except sqlite3.IntegrityError:
                         flash(f'Student ID {student_id} or Email {email} already exists.', 'danger')
                         return redirect(request.url)
 
-                # Add to known faces (this saves to pickle/disk as per current implementation)
+                # Add to the shared gallery (appends one row to the on-disk store)
                 face_service.add_known_face(encoding, {'student_id': student_id})
                 
                 flash(f'Student {name} registered successfully!', 'success')
@@ -161,28 +211,16 @@ def create_app(config=None):
         with get_db() as conn:
             cursor = conn.cursor()
             
-            # Total records in date range
-            cursor.execute(
-                "SELECT COUNT(*) FROM attendance_records WHERE date(timestamp) BETWEEN ? AND ?",
-                (start_date, end_date)
-            )
+            # Totals come from the rollup tables, not raw attendance_records
+            cursor.execute(queries.RANGE_RECORD_TOTAL, (start_date, end_date))
             analytics_data['total_records'] = cursor.fetchone()[0]
             
             # Unique students
-            cursor.execute(
-                "SELECT COUNT(DISTINCT student_id) FROM attendance_records WHERE date(timestamp) BETWEEN ? AND ?",
-                (start_date, end_date)
-            )
+            cursor.execute(queries.RANGE_UNIQUE_STUDENTS, (start_date, end_date))
             analytics_data['unique_students'] = cursor.fetchone()[0]
             
             # Daily attendance for chart
-            cursor.execute("""
-                SELECT date(timestamp) as day, COUNT(*) as count
-                FROM attendance_records
-                WHERE date(timestamp) BETWEEN ? AND ?
-                GROUP BY day
-                ORDER BY day
-            """, (start_date, end_date))
+            cursor.execute(queries.RANGE_DAILY_COUNTS, (start_date, end_date))
             
             daily_data = cursor.fetchall()
             if daily_data:
@@ -195,15 +233,7 @@ def create_app(config=None):
                 analytics_data['peak_day'] = analytics_data['chart_labels'][max_idx]
             
             # Top students
-            cursor.execute("""
-                SELECT s.name, ar.student_id, COUNT(*) as count
-                FROM attendance_records ar
-                LEFT JOIN students s ON ar.student_id = s.student_id
-                WHERE date(ar.timestamp) BETWEEN ? AND ?
-                GROUP BY ar.student_id
-                ORDER BY count DESC
-                LIMIT 10
-            """, (start_date, end_date))
+            cursor.execute(queries.RANGE_TOP_STUDENTS, (start_date, end_date))
             
             analytics_data['top_students'] = [
                 {'name': row[0] or 'Unknown', 'student_id': row[1], 'count': row[2]}
@@ -219,44 +249,30 @@ def create_app(config=None):
         # Get filters
         selected_date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
         selected_student = request.args.get('student_id', '')
+        try:
+            after = decode_cursor(request.args['after']) if request.args.get('after') else None
+        except ValueError:
+            flash('Invalid page link; showing the newest records.', 'warning')
+            after = None
         
         with get_db() as conn:
             cursor = conn.cursor()
             
-            # Build query with filters
-            query = '''
-                SELECT ar.*, s.name, s.email 
-                FROM attendance_records ar
-                LEFT JOIN students s ON ar.student_id = s.student_id
-                WHERE 1=1
-            '''
-            params = []
-            
-            if selected_date:
-                query += ' AND date(ar.timestamp) = ?'
-                params.append(selected_date)
-            
-            if selected_student:
-                query += ' AND ar.student_id LIKE ?'
-                params.append(f'%{selected_student}%')
-            
-            query += ' ORDER BY ar.timestamp DESC LIMIT 100'
-            
+            query, params = queries.attendance_query(
+                date=selected_date, student=selected_student, after=after, limit=DEFAULT_PAGE_SIZE + 1
+            )
             cursor.execute(query, params)
-            records = [dict(row) for row in cursor.fetchall()]
+            records, next_cursor = keyset_page([dict(row) for row in cursor.fetchall()], DEFAULT_PAGE_SIZE)
             
             # Get stats
-            cursor.execute('SELECT COUNT(*) FROM attendance_records')
-            total_records = cursor.fetchone()[0]
-            
             cursor.execute(
-                'SELECT COUNT(*) FROM attendance_records WHERE date(timestamp) = ?',
-                (datetime.now().strftime('%Y-%m-%d'),)
+                'SELECT COALESCE(SUM(records), 0), SUM(confidence_sum) / SUM(confidence_count) FROM attendance_day_summary'
             )
-            today_count = cursor.fetchone()[0]
+            total_records, avg_confidence = cursor.fetchone()
+            avg_confidence = avg_confidence or 0
             
-            cursor.execute('SELECT AVG(confidence) FROM attendance_records')
-            avg_confidence = cursor.fetchone()[0] or 0
+            cursor.execute(queries.DAY_RECORD_TOTAL, (datetime.now().strftime('%Y-%m-%d'),))
+            today_count = cursor.fetchone()[0]
         
         return render_template(
             'attendance.html',
@@ -265,98 +281,86 @@ def create_app(config=None):
             today_count=today_count,
             avg_confidence=avg_confidence,
             selected_date=selected_date,
-            selected_student=selected_student
+            selected_student=selected_student,
+            next_cursor=next_cursor,
+            paged=after is not None
         )
 
     @app.route('/settings')
     def settings():
-        with get_db() as conn:
-            cursor = conn.cursor()
+        def load():
+            with get_db() as conn:
+                cursor = conn.cursor()
             
-            stats = {}
-            cursor.execute('SELECT COUNT(*) FROM students')
-            stats['total_students'] = cursor.fetchone()[0]
+                stats = {}
+                cursor.execute('SELECT COUNT(*) FROM students')
+                stats['total_students'] = cursor.fetchone()[0]
             
-            cursor.execute('SELECT COUNT(*) FROM attendance_records')
-            stats['total_records'] = cursor.fetchone()[0]
+                cursor.execute('SELECT COALESCE(SUM(records), 0) FROM attendance_day_summary')
+                stats['total_records'] = cursor.fetchone()[0]
             
-            cursor.execute('SELECT COUNT(*) FROM unknown_faces')
-            stats['unknown_faces'] = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM unknown_faces')
+                stats['unknown_faces'] = cursor.fetchone()[0]
             
-            cursor.execute('SELECT COUNT(*) FROM alerts')
-            stats['total_alerts'] = cursor.fetchone()[0]
-        
+                cursor.execute('SELECT COUNT(*) FROM alerts')
+                stats['total_alerts'] = cursor.fetchone()[0]
+
+            return stats
+
+        stats = cached(('settings',), load)
         return render_template('settings.html', config=app.config, stats=stats)
 
     @app.route('/export/csv')
     def export_csv():
         from datetime import datetime
-        import csv
-        from io import StringIO
         from flask import Response
+        from app.utils.reporting import iter_csv, iter_cursor
         
         selected_date = request.args.get('date', '')
         selected_student = request.args.get('student_id', '')
         export_all = request.args.get('all', '')
         
-        with get_db() as conn:
-            cursor = conn.cursor()
-            
-            if export_all:
-                cursor.execute('''
-                    SELECT ar.*, s.name, s.email 
-                    FROM attendance_records ar
-                    LEFT JOIN students s ON ar.student_id = s.student_id
-                    ORDER BY ar.timestamp DESC
-                ''')
-            else:
-                query = '''
-                    SELECT ar.*, s.name, s.email 
-                    FROM attendance_records ar
-                    LEFT JOIN students s ON ar.student_id = s.student_id
-                    WHERE 1=1
-                '''
-                params = []
-                
-                if selected_date:
-                    query += ' AND date(ar.timestamp) = ?'
-                    params.append(selected_date)
-                
-                if selected_student:
-                    query += ' AND ar.student_id LIKE ?'
-                    params.append(f'%{selected_student}%')
-                
-                query += ' ORDER BY ar.timestamp DESC'
-                cursor.execute(query, params)
-            
-            records = cursor.fetchall()
-        
-        # Create CSV
-        output = StringIO()
-        writer = csv.writer(output)
+        # Walks idx_attendance_timestamp backwards, so no sort buffer either
+        if export_all:
+            query, params = queries.attendance_query()
+        else:
+            query, params = queries.attendance_query(date=selected_date, student=selected_student)
+        # The stream outlives this request's app context, so it checks out
+        # its own connection and returns it once the last row has been sent
+        db = get_db_manager()
+        conn = db.acquire()
+        try:
+            cursor = conn.execute(query, params)
+        except Exception:
+            db.release(conn)
+            raise
         
-        # Header
-        writer.writerow(['ID', 'Timestamp', 'Student ID', 'Name', 'Email', 'Confidence', 'Location', 'Device ID'])
-        
-        # Data
-        for record in records:
-            writer.writerow([
-                record[0],  # id
-                record[1],  # timestamp
-                record[2],  # student_id
-                record[7] or 'Unknown',  # name
-                record[8] or 'N/A',  # email
-                f"{record[3]:.2f}",  # confidence
-                record[4] or 'N/A',  # location
-                record[5] or 'N/A'   # device_id
-            ])
-        
-        # Create response
-        output.seek(0)
+        # Rows are fetched in chunks and rendered as the response is sent,
+        # so memory stays flat regardless of how much history is exported
+        rows = (
+            [
+                record['id'],
+                record['timestamp'],
+                record['student_id'],
+                record['name'] or 'Unknown',
+                record['email'] or 'N/A',
+                f"{record['confidence'] or 0:.2f}",
+                record['location'] or 'N/A',
+                record['device_id'] or 'N/A'
+            ]
+            for record in iter_cursor(cursor)
+        )
+        header = ['ID', 'Timestamp', 'Student ID', 'Name', 'Email', 'Confidence', 'Location', 'Device ID']
         filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
+        def generate():
+            try:
+                yield from iter_csv(rows, header)
+            finally:
+                db.release(conn)
+        
         return Response(
-            output.getvalue(),
+            generate(),
             mimetype='text/csv',
             headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
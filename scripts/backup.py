@@ -4,7 +4,8 @@ Usage:
 	python scripts/backup.py --config config.yaml
 """
 import argparse
-import shutil
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 import yaml
 import time
@@ -23,7 +24,10 @@ def backup_db(db_path: str, out_dir: str = 'data/backups'):
 		logger.error('Database file not found: %s', db_path)
 		return None
 	dst = out / f"attendance_{ts}.db"
-	shutil.copy2(src, dst)
+	# Copying the file alone would miss rows still in the -wal file; the
+	# online backup API reads a consistent snapshot including them
+	with closing(sqlite3.connect(src)) as source, closing(sqlite3.connect(dst)) as target:
+		source.backup(target)
 	logger.info('Database backed up to %s', dst)
 	return dst
 
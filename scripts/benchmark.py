@@ -1,18 +1,23 @@
+import argparse
+import tempfile
 import time
 import cv2
 import numpy as np
+from pathlib import Path
 from app.services.face_recognition import FaceRecognitionService
+from app.services.face_tracker import box_iou
 
 
 def benchmark_face_recognition():
 	"""Benchmark face recognition performance"""
+	gallery_dir = tempfile.TemporaryDirectory(prefix='benchmark-gallery-')
 	config = {
 		'face_recognition': {
 			'model_backend': 'face_recognition',
 			'detection_model': 'hog',
 			'tolerance': 0.6,
 			'num_jitters': 1,
-			'known_faces_path': 'data/known_faces/'
+			'known_faces_path': gallery_dir.name
 		}
 	}
     
@@ -39,7 +44,69 @@ def benchmark_face_recognition():
         
 		print(f"Average face encoding time: {encoding_time:.4f}s")
 		print(f"Encoding FPS: {1/encoding_time:.2f}")
+	gallery_dir.cleanup()
+
+
+def benchmark_detection_scales(image_dir: str, scales, grayscale: bool = False, upsample: int = 1):
+	"""Throughput/accuracy curve of downscaled detection.
+
+	Full-resolution detections are the reference; a face counts as found at a
+	given scale when a rescaled box overlaps it with IoU >= 0.5.
+	"""
+	paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+	images = [img for img in (cv2.imread(str(p)) for p in paths) if img is not None]
+	if not images:
+		print(f"No images found in {image_dir}")
+		return
+
+	# Services get an empty scratch gallery so a run never touches real enrollments
+	gallery_dir = tempfile.TemporaryDirectory(prefix='benchmark-gallery-')
+
+	def make_service(scale):
+		return FaceRecognitionService({
+			'face_recognition': {
+				'model_backend': 'face_recognition',
+				'detection_model': 'hog',
+				'detection_scale': scale,
+				'detection_grayscale': grayscale and scale < 1.0,
+				'detection_upsample': upsample,
+				'tolerance': 0.6,
+				'num_jitters': 1,
+				'known_faces_path': gallery_dir.name
+			}
+		})
+
+	reference = [make_service(1.0).detect_faces(img) for img in images]
+	total_faces = sum(len(r) for r in reference)
+	print(f"{len(images)} images, {total_faces} reference faces at full resolution")
+	print(f"{'scale':>6} {'ms/frame':>10} {'fps':>8} {'recall':>8} {'extra':>6}")
+
+	for scale in scales:
+		service = make_service(scale)
+		found = extra = 0
+		start_time = time.time()
+		detections = [service.detect_faces(img) for img in images]
+		elapsed = (time.time() - start_time) / len(images)
+
+		for ref_boxes, boxes in zip(reference, detections):
+			matched = sum(1 for r in ref_boxes if any(box_iou(r, b) >= 0.5 for b in boxes))
+			found += matched
+			extra += max(0, len(boxes) - matched)
+
+		recall = found / total_faces if total_faces else 1.0
+		print(f"{scale:>6.2f} {elapsed * 1000:>10.1f} {1 / elapsed:>8.1f} {recall:>8.3f} {extra:>6d}")
+	gallery_dir.cleanup()
 
 
 if __name__ == "__main__":
-	benchmark_face_recognition()
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--images', help='directory of frames with faces for the detection-scale sweep')
+	parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25])
+	parser.add_argument('--grayscale', action='store_true')
+	parser.add_argument('--upsample', type=int, default=1)
+	args = parser.parse_args()
+
+	if args.images:
+		benchmark_detection_scales(args.images, args.scales, args.grayscale, args.upsample)
+	else:
+		benchmark_face_recognition()
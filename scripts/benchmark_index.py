@@ -0,0 +1,91 @@
+"""Recall-vs-latency benchmark for the exact and ANN (IVF) face indexes.
+
+Builds a synthetic gallery of identities, queries it with noisy re-captures
+of enrolled faces and compares the ANN result against the exact scan.
+
+Usage:
+    python scripts/benchmark_index.py --size 200000 --nprobe 4 8 16 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.face_index import FaceIndex, IVFFaceIndex
+
+
+def make_gallery(size: int, dim: int, seed: int = 0):
+    """Random identities scaled so typical inter-person distance is ~1.0."""
+    rng = np.random.default_rng(seed)
+    gallery = rng.normal(scale=1.0 / np.sqrt(2 * dim), size=(size, dim)).astype(np.float32)
+    ids = [f'S{i:07d}' for i in range(size)]
+    return gallery, ids
+
+
+def make_queries(gallery: np.ndarray, count: int, noise: float, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(gallery), count, replace=False)
+    jitter = rng.normal(scale=noise / np.sqrt(gallery.shape[1]), size=(count, gallery.shape[1]))
+    return picks, (gallery[picks] + jitter).astype(np.float32)
+
+
+def timed_search(index, queries: np.ndarray, batch: int):
+    best, dist = [], []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        b, d = index.search(queries[i:i + batch])
+        best.append(b)
+        dist.append(d)
+    elapsed = time.perf_counter() - start
+    return np.concatenate(best), np.concatenate(dist), elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=8, help='faces matched per search call')
+    parser.add_argument('--noise', type=float, default=0.35, help='query distance from its enrolled face')
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--nlist', type=int, default=0)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    gallery, ids = make_gallery(args.size, args.dim)
+    _, queries = make_queries(gallery, args.queries, args.noise)
+
+    exact = FaceIndex(gallery, ids)
+    exact_best, exact_dist, exact_latency = timed_search(exact, queries, args.batch)
+    exact_ids = exact.student_ids[exact_best]
+    matched = exact_dist < args.tolerance
+
+    print(f"Gallery: {args.size} x {args.dim}, queries: {args.queries}, tolerance: {args.tolerance}")
+    print(f"exact      latency {exact_latency * 1000:8.3f} ms/face  matched {matched.mean():.3f}")
+
+    start = time.perf_counter()
+    ann = IVFFaceIndex(gallery, ids, nlist=args.nlist, nprobe=1)
+    print(f"IVF build: {len(ann.centroids)} cells in {time.perf_counter() - start:.2f}s")
+
+    for nprobe in args.nprobe:
+        ann.nprobe = nprobe
+        ann_best, ann_dist, ann_latency = timed_search(ann, queries, args.batch)
+        ann_ids = np.where(ann_best >= 0, ann.student_ids[np.maximum(ann_best, 0)], None)
+        ann_matched = ann_dist < args.tolerance
+
+        # Recall: the ANN decision (identity or unknown) agrees with the exact scan.
+        agree = np.where(matched, ann_matched & (ann_ids == exact_ids), ~ann_matched)
+        print(
+            f"ann p={nprobe:<4d} latency {ann_latency * 1000:8.3f} ms/face  "
+            f"recall {agree.mean():.4f}  "
+            f"speedup {exact_latency / ann_latency:6.1f}x  "
+            f"max dist gap {float(np.max(ann_dist - exact_dist)):.4f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
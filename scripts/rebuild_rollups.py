@@ -0,0 +1,40 @@
+"""Recompute the daily attendance rollup tables from raw attendance records.
+
+The rollups are maintained by triggers on every insert and delete; run this
+after editing attendance_records in place or restoring rows by hand.
+
+Usage:
+	python scripts/rebuild_rollups.py --config config.yaml
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+import yaml
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.database import DatabaseManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(config_path: str):
+	cfg = yaml.safe_load(Path(config_path).read_text(encoding='utf-8'))
+	db_path = cfg.get('database', {}).get('path', 'data/attendance.db')
+	if not Path(db_path).exists():
+		logger.error('Database file not found: %s', db_path)
+		return 1
+	days, records = DatabaseManager(db_path).rebuild_rollups()
+	print(f"Rebuilt rollups for {days} days ({records} records)")
+	return 0
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--config', '-c', default='config.yaml')
+	args = parser.parse_args()
+	sys.exit(main(args.config))
@@ -29,8 +29,8 @@ def main(config_path: str):
     Path('data/backups').mkdir(parents=True, exist_ok=True)
 
     # Initialize DB
-    DatabaseManager(db_path, schema_path='data/schema.sql')
-    logger.info('Database initialized at %s', db_path)
+    db = DatabaseManager(db_path, schema_path='data/schema.sql')
+    logger.info('Database initialized at %s (schema version %d)', db_path, db.migrate())
 
 
 if __name__ == '__main__':
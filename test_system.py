@@ -78,10 +78,10 @@ print("\n[TEST 5] Checking known faces storage...")
 try:
     from pathlib import Path
     known_faces_path = Path(config['face_recognition']['known_faces_path'])
-    encodings_file = known_faces_path / "encodings.pkl"
+    encodings_file = known_faces_path / "embeddings.f32"
     
     if encodings_file.exists():
-        print(f"✓ Encodings file exists: {encodings_file}")
+        print(f"✓ Gallery store exists: {encodings_file}")
         print(f"  - File size: {encodings_file.stat().st_size} bytes")
     else:
         print(f"⚠ Encodings file not found (no students registered yet)")